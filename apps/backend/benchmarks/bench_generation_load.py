@@ -0,0 +1,163 @@
+"""
+End-to-end load test of POST /api/llm/gen-question-paper.
+
+Point it at a backend started with the offline stand-in provider so no real
+quota is used, e.g.:
+
+    LLM_PROVIDER=standin LLM_STANDIN_SEED=42 \
+    LLM_STANDIN_LATENCY='{"distribution": "lognormal", "median": 4, "sigma": 0.4}' \
+    LLM_STANDIN_ERROR_RATES='{"rate_limit": 0.05, "timeout": 0.01}' \
+    uvicorn src.main:app --port 8000
+
+then, from apps/backend (the user behind the token needs a high enough
+MAX_COUNT_FOR_USER / MAX_COUNT_FOR_PREVILEGED):
+
+    python -m benchmarks.bench_generation_load --token <access token> \
+        --concurrency 8 --requests 64
+
+Reports throughput, status codes and p50/p95/p99 of the client-observed
+latency and of every stage the server reports in its Server-Timing header
+(embedding, retrieval, generate_a/generate_b, parse, assemble, ...).
+
+With --metrics it also diffs the server's /metrics around the run and reports
+the section retry rate per output mode; run it once with
+LLM_STRUCTURED_OUTPUT=False and once with True to compare the two modes.
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """'retrieval;dur=12.3, total;dur=40' -> {'retrieval': 12.3, 'total': 40.0} (ms)"""
+    stages = {}
+    for metric in filter(None, (m.strip() for m in header.split(","))):
+        name, *params = metric.split(";")
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                stages[name.strip()] = float(value)
+    return stages
+
+
+_ATTEMPT_SAMPLE = re.compile(
+    r'^section_generation_attempts_(count|sum|bucket)\{(?:le="([^"]+)",)?mode="([^"]+)"(?:,le="([^"]+)")?\}\s+(\S+)$'
+)
+
+
+async def scrape_section_attempts(client: httpx.AsyncClient) -> Dict[str, Dict[str, float]]:
+    """{mode: {"count", "sum", "first_try"}} from the section_generation_attempts histogram"""
+    response = await client.get("/metrics")
+    response.raise_for_status()
+    modes: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0.0, "sum": 0.0, "first_try": 0.0})
+    for line in response.text.splitlines():
+        match = _ATTEMPT_SAMPLE.match(line)
+        if not match:
+            continue
+        kind, le_before, mode, le_after, value = match.groups()
+        le = le_before or le_after
+        if kind == "bucket":
+            if le is not None and float(le) == 1.0:
+                modes[mode]["first_try"] += float(value)
+        else:
+            modes[mode][kind] += float(value)
+    return modes
+
+
+def report_retry_rate(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n{'mode':<12}{'sections':>10}{'attempts':>10}{'retry rate':>12}{'first try':>11}")
+    for mode, totals in sorted(after.items()):
+        previous = before.get(mode, {"count": 0.0, "sum": 0.0, "first_try": 0.0})
+        sections = totals["count"] - previous["count"]
+        if sections <= 0:
+            continue
+        attempts = totals["sum"] - previous["sum"]
+        first_try = totals["first_try"] - previous["first_try"]
+        print(f"{mode:<12}{sections:>10.0f}{attempts:>10.0f}{(attempts - sections) / sections:>12.1%}"
+              f"{first_try / sections:>11.1%}")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def run(args) -> None:
+    payload = {
+        "subject": args.subject,
+        "board": args.board,
+        "paper": args.paper,
+        "code": args.code,
+        "year": args.year,
+    }
+    cookies = {"access_token": args.token} if args.token else {}
+
+    statuses: Counter = Counter()
+    stages: Dict[str, List[float]] = defaultdict(list)
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(base_url=args.url, cookies=cookies, timeout=args.timeout) as client:
+        async def worker():
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/llm/gen-question-paper", json=payload)
+                    statuses[response.status_code] += 1
+                    stages["client"].append((time.perf_counter() - start) * 1000)
+                    for name, ms in parse_server_timing(response.headers.get("server-timing", "")).items():
+                        stages[name].append(ms)
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+
+        attempts_before = await scrape_section_attempts(client) if args.metrics else None
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        attempts_after = await scrape_section_attempts(client) if args.metrics else None
+
+    ok = statuses.get(200, 0)
+    print(f"requests: {args.requests}  concurrency: {args.concurrency}  wall: {elapsed:.1f}s")
+    print(f"throughput: {args.requests / elapsed:.2f} req/s ({ok / elapsed:.2f} successful req/s)")
+    print(f"status: {dict(statuses)}")
+    print(f"\n{'stage (ms)':<16}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}")
+    for name, values in sorted(stages.items(), key=lambda item: -statistics.mean(item[1])):
+        print(f"{name:<16}{len(values):>6}{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+              f"{percentile(values, 99):>10.1f}{statistics.mean(values):>10.1f}")
+    if args.metrics:
+        report_retry_rate(attempts_before, attempts_after)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default=None, help="access_token cookie of a logged-in user")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--subject", default="Physics")
+    parser.add_argument("--board", default="ICSE")
+    parser.add_argument("--paper", default="Science Paper 1")
+    parser.add_argument("--code", default="PHY")
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--metrics", action="store_true",
+                        help="report the section retry rate from /metrics (single worker or PROMETHEUS_MULTIPROC_DIR)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
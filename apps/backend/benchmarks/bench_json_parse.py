@@ -0,0 +1,75 @@
+"""
+Decode cost of LLM section output: legacy `safe_json_parse` vs. `decode_llm_json`.
+
+Runs both over the corpus in benchmarks/data/malformed_outputs.json (section
+payloads wrapped in fences/prose, with the faults models actually produce:
+trailing commas, single quotes, raw newlines, Python literals, comments,
+truncation):
+
+  * legacy - regex fence strip, json.loads, then repair_json on the whole text
+  * fast   - decode_llm_json (orjson when installed, element-local repair)
+
+Run from apps/backend:
+
+    python -m benchmarks.bench_json_parse --repeat 50
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+
+from json_repair import repair_json
+
+from src.LLMs import json_decode
+from src.LLMs.json_decode import decode_llm_json
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "malformed_outputs.json")
+
+
+def legacy_parse(raw_output: str):
+    """The pre-change safe_json_parse body"""
+    cleaned = raw_output.strip()
+    cleaned = re.sub(r"^```(json)?", "", cleaned, flags=re.IGNORECASE).strip()
+    cleaned = re.sub(r"```$", "", cleaned).strip()
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        return json.loads(repair_json(cleaned))
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            fn(text)
+        except Exception:
+            pass
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        cases = json.load(f)["cases"]
+
+    print(f"orjson available: {json_decode._ORJSON_AVAILABLE}")
+    print(f"{'case':<24}{'bytes':>8}{'legacy ms':>12}{'fast ms':>10}{'speedup':>10}")
+    totals = [0.0, 0.0]
+    for name, text in cases.items():
+        legacy = _time(legacy_parse, text, args.repeat)
+        fast = _time(decode_llm_json, text, args.repeat)
+        totals[0] += legacy
+        totals[1] += fast
+        print(f"{name:<24}{len(text):>8}{legacy:>12.3f}{fast:>10.3f}{legacy / fast:>9.1f}x")
+    print(f"{'total':<24}{'':>8}{totals[0]:>12.3f}{totals[1]:>10.3f}{totals[0] / totals[1]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
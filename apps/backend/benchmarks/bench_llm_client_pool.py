@@ -0,0 +1,113 @@
+"""
+Per-call overhead of rebuilding LLM clients vs. reusing pooled ones.
+
+Spins up a local OpenAI-compatible stand-in endpoint (no real quota is used)
+and times `ainvoke` through `ChatOpenAI`:
+
+  * rebuild - a new client per call, which is what `get_llm_chain()` used to do
+  * pooled  - clients handed out by `LLMClientPool`, connections kept alive
+
+Run from apps/backend:
+
+    python -m benchmarks.bench_llm_client_pool --calls 200
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_openai import ChatOpenAI
+
+from src.LLMs.client_pool import LLMClientPool
+
+RESPONSE_BODY = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench-model",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": "{\"ok\": true}"},
+        "finish_reason": "stop",
+    }],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+}
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real providers
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps(RESPONSE_BODY).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_stand_in() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _build(base_url: str) -> ChatOpenAI:
+    return ChatOpenAI(model="bench-model", api_key="bench-key", base_url=base_url, max_retries=0)
+
+
+async def _run(calls: int, factory) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        llm = factory()
+        await llm.ainvoke("ping")
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list[float]) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{label:<8} mean={statistics.mean(timings):7.2f}ms "
+        f"p50={statistics.median(timings):7.2f}ms p95={p95:7.2f}ms"
+    )
+
+
+async def main(calls: int) -> None:
+    server = _start_stand_in()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    pool = LLMClientPool()
+
+    try:
+        # Warm the interpreter/import caches so both runs start equal
+        await _run(5, lambda: _build(base_url))
+
+        rebuild = await _run(calls, lambda: _build(base_url))
+        pooled = await _run(
+            calls, lambda: pool.get("openrouter", "bench-model", "bench-key", lambda: _build(base_url))
+        )
+    finally:
+        server.shutdown()
+
+    print(f"{calls} calls against local stand-in endpoint")
+    _report("rebuild", rebuild)
+    _report("pooled", pooled)
+    saved = statistics.mean(rebuild) - statistics.mean(pooled)
+    print(f"per-call overhead saved: {saved:.2f}ms  pool={pool.get_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls))
@@ -1,15 +1,31 @@
 import re
 import json
+import time
+import hashlib
+import asyncio
 import logging
-from typing import Dict, List, Tuple, Callable, Optional, Any
+import threading
+from collections import deque
+from typing import AsyncIterator, Dict, List, Tuple, Callable, Optional, Any, NamedTuple, Set
 from fastapi import HTTPException
-from json_repair import repair_json
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI  
 from langchain_huggingface import HuggingFaceEndpoint
 
 from ..config.config import settings
+from ..utils.tiered_cache import TieredCache
+from ..utils.deadline import Deadline
+from ..utils.metrics import LLM_CALLS_SKIPPED, LLM_STRUCTURED_FALLBACKS, observe_llm_call
+from .client_pool import LLMClientPool, fingerprint_key, get_client_pool
+from .circuit_breaker import CircuitBreaker
+from .provider_health import ProviderHealth
+from .rate_limiter import KeyRateLimiter
+from .concurrency import ConcurrencyLimiter, ConcurrencyPermit
+from .ollama_balancer import OllamaBalancer
+from .json_decode import decode_llm_json
+from .standin import StandInLLM, load_fixtures
+from .usage import UsageRecorder, estimate_tokens, extract_token_usage, token_cost
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +37,24 @@ except ImportError:
     _OLLAMA_AVAILABLE = False
     logger.info("Ollama LLM not available - this is expected in production")
 
+
+class LLMChainEntry(NamedTuple):
+    """One (provider, model, key) combination in the fallback chain"""
+    name: str
+    provider: str
+    model: str
+    key: Optional[str]
+    factory: Callable[[], Any]
+
 class LLMProviderManager:
-    def __init__(self):
+    def __init__(self, client_pool: Optional[LLMClientPool] = None,
+                 usage_recorder: Optional[UsageRecorder] = None):
+        # Warm clients shared by every manager in the process
+        self.client_pool = client_pool or get_client_pool()
+
+        # Token/cost rows per successful call; None disables accounting
+        self.usage_recorder = usage_recorder
+
         # ---------------- Gemini Configuration ---------------- #
         # FIX: Updated to valid Gemini model names
         self.gemini_models: List[str] = self._parse_array_env(
@@ -71,6 +103,19 @@ class LLMProviderManager:
             "OLLAMA_URL"
         )
         self.current_ollama_index = 0
+        self.ollama_instances: List[Tuple[str, str]] = []
+        for i in range(max(len(self.ollama_models), len(self.ollama_urls))):
+            model = self.ollama_models[min(i, len(self.ollama_models) - 1)] if self.ollama_models else "mistral:7b-instruct"
+            url = self.ollama_urls[min(i, len(self.ollama_urls) - 1)] if self.ollama_urls else "http://localhost:11434"
+            self.ollama_instances.append((url, model))
+
+        # Least-outstanding ordering, warm-up and health probes across instances
+        self.ollama_balancer = OllamaBalancer(
+            self.ollama_instances,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE,
+            probe_interval=settings.OLLAMA_PROBE_INTERVAL_SECONDS,
+            probe_timeout=settings.OLLAMA_PROBE_TIMEOUT_SECONDS
+        )
 
         # ---------------- HuggingFace Configuration ---------------- #
         self.hf_models: List[str] = self._parse_array_env(
@@ -84,12 +129,56 @@ class LLMProviderManager:
 
         # ---------------- Provider Configuration ---------------- #
         self.provider = getattr(settings, "LLM_PROVIDER", "auto")
+        self.standin_fixtures = None
+        if self.provider == "standin":
+            logger.warning("LLM_PROVIDER=standin: replaying recorded responses, no real provider is called")
+            self.standin_fixtures = load_fixtures(settings.LLM_STANDIN_FIXTURES_PATH)
         self.allow_paid_models = getattr(settings, "ALLOW_PAID_MODELS", False)
         
         # Performance tracking
         self.provider_success_count = {}
         self.provider_failure_count = {}
 
+        # One manager is shared by every request in the worker (see
+        # get_llm_manager), and Section A/B generate concurrently, so every
+        # read-modify-write of the rotation/health state goes through this lock.
+        self._lock = threading.RLock()
+
+        # Circuit breaker per chain entry, keyed by entry name
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+        # Per-key RPM/TPM token buckets, shared by all coroutines in the worker
+        self.rate_limiter = KeyRateLimiter(getattr(settings, "LLM_RATE_LIMITS", {}) or {})
+
+        # (provider, model) pairs that rejected JSON/schema output parameters
+        self.structured_unsupported = set()
+
+        # In-flight call caps per provider/key with a FIFO queue per provider
+        self.concurrency_limiter = ConcurrencyLimiter(
+            settings.LLM_CONCURRENCY_LIMITS or {},
+            prior_hold_seconds=settings.LLM_ADAPTIVE_PRIOR_LATENCY_SECONDS
+        )
+
+        # Optional response cache in front of safe_generate
+        self.response_cache: Optional[TieredCache] = None
+        if settings.LLM_CACHE_ENABLED:
+            self.response_cache = TieredCache(
+                namespace="llm_responses",
+                max_memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+                sqlite_path=settings.LLM_CACHE_SQLITE_PATH or None,
+                max_disk_entries=settings.LLM_CACHE_MAX_DISK_ENTRIES,
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+            )
+
+        # Rolling latency/success health per chain entry, used for adaptive ordering
+        self.health: Dict[str, ProviderHealth] = {}
+
+        # Hedging: recent successful latencies (for the p95 delay) and budget
+        self._recent_latencies = deque(maxlen=200)
+        self._hedge_tokens = float(settings.LLM_HEDGE_BUDGET_BURST)
+        self.hedges_launched = 0
+        self.hedge_wins = 0
+
     def _validate_gemini_models(self, models: List[str]) -> List[str]:
         """Validate and correct Gemini model names"""
         # Map of potentially incorrect names to correct ones
@@ -132,13 +221,6 @@ class LLMProviderManager:
         return []
 
     # ---------------- JSON Helpers ---------------- #
-    def _clean_json_output(self, raw_output: str) -> str:
-        """Clean LLM output to extract valid JSON"""
-        raw_output = raw_output.strip()
-        raw_output = re.sub(r"^```(json)?", "", raw_output, flags=re.IGNORECASE).strip()
-        raw_output = re.sub(r"```$", "", raw_output).strip()
-        return raw_output
-
     def safe_json_parse(self, raw_output: Any) -> Dict:
         """Safely parse JSON from LLM output with repair fallback"""
         if hasattr(raw_output, "content"):
@@ -150,20 +232,14 @@ class LLMProviderManager:
                 detail=f"Expected string output, got {type(raw_output)}"
             )
         
-        cleaned = self._clean_json_output(raw_output)
-        
         try:
-            return json.loads(cleaned)
-        except json.JSONDecodeError:
-            try:
-                fixed = repair_json(cleaned)
-                return json.loads(fixed)
-            except Exception as e:
-                logger.error(f"Failed to parse JSON: {e}\nRaw output: {cleaned[:500]}")
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Failed to parse JSON: {str(e)}"
-                )
+            return decode_llm_json(raw_output)
+        except Exception as e:
+            logger.error(f"Failed to parse JSON: {e}\nRaw output: {raw_output[:500]}")
+            raise HTTPException(
+                status_code=500, 
+                detail=f"Failed to parse JSON: {str(e)}"
+            )
 
     def normalize_exam_json(self, data: Dict) -> Dict:
         """Normalize exam JSON structure"""
@@ -175,6 +251,16 @@ class LLMProviderManager:
         return data
 
     # ---------------- Rotation Logic ---------------- #
+    def _rotated_combinations(self, models: List[str], keys: List[Optional[str]], model_index: int,
+                              key_index: int, failed: set) -> List[Tuple[str, Optional[str]]]:
+        """(model, key) pairs starting at the current rotation position, known-bad pairs last"""
+        combos = [(model, key) for model in models for key in keys]
+        if not combos:
+            return []
+        start = (model_index * len(keys) + key_index) % len(combos)
+        rotated = combos[start:] + combos[:start]
+        return [c for c in rotated if c not in failed] + [c for c in rotated if c in failed]
+
     def _rotate_gemini(self):
         """Rotate to next Gemini model/key combination"""
         if self.gemini_keys:
@@ -202,6 +288,113 @@ class LLMProviderManager:
         if self.current_hf_key_index == 0:
             self.current_hf_model_index = (self.current_hf_model_index + 1) % len(self.hf_models)
 
+    # ---------------- Client Builders ---------------- #
+    def _build_gemini(self, model: str, api_key: str, **overrides) -> ChatGoogleGenerativeAI:
+        params = {"temperature": 0.7, "max_output_tokens": 8192}
+        params.update(overrides)
+        return ChatGoogleGenerativeAI(model=model, google_api_key=api_key, **params)
+
+    def _build_openrouter(self, model: str, api_key: Optional[str], **overrides) -> ChatOpenAI:
+        params = {"temperature": 0.7, "max_tokens": 4096}
+        params.update(overrides)
+        return ChatOpenAI(model=model, api_key=api_key, base_url=self.openrouter_base_url, **params)
+
+    def _build_hf(self, model: str, api_key: str) -> HuggingFaceEndpoint:
+        return HuggingFaceEndpoint(
+            repo_id=model,
+            huggingfacehub_api_token=api_key,
+            task="text-generation",
+            max_new_tokens=4096,
+            temperature=0.7
+        )
+
+    def _build_standin(self, model: str) -> StandInLLM:
+        return StandInLLM(
+            model=model,
+            fixtures=self.standin_fixtures,
+            latency=settings.LLM_STANDIN_LATENCY,
+            error_rates=settings.LLM_STANDIN_ERROR_RATES,
+            malformed_rate=settings.LLM_STANDIN_MALFORMED_RATE,
+            hang_seconds=settings.LLM_ATTEMPT_TIMEOUT_SECONDS * 2,
+            seed=settings.LLM_STANDIN_SEED
+        )
+
+    def _build_ollama(self, model: str, url: str, **overrides):
+        return OllamaLLM(base_url=url, model=model, keep_alive=settings.OLLAMA_KEEP_ALIVE, **overrides)
+
+    def _pooled(self, provider: str, model: str, key: Optional[str], builder: Callable[[], Any],
+                variant: str = "") -> Any:
+        """Fetch a warm client from the process-wide pool, building it on first use"""
+        return self.client_pool.get(provider, model, key, builder, variant=variant)
+
+    # ---------------- Structured Output ---------------- #
+    @property
+    def structured_output(self) -> bool:
+        return settings.LLM_STRUCTURED_OUTPUT
+
+    @staticmethod
+    def _schema_id(schema: Dict) -> str:
+        return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:12]
+
+    def _output_mode(self, entry: LLMChainEntry, response_schema: Optional[Dict]) -> str:
+        """'json:<schema id>' when `entry` would be asked for structured output, else 'plain'"""
+        if response_schema is None or not settings.LLM_STRUCTURED_OUTPUT:
+            return "plain"
+        if entry.provider not in ("gemini", "openrouter", "ollama"):
+            return "plain"
+        with self._lock:
+            if (entry.provider, entry.model) in self.structured_unsupported:
+                return "plain"
+        return f"json:{self._schema_id(response_schema)}"
+
+    def _structured_client(self, entry: LLMChainEntry, schema: Dict) -> Optional[Any]:
+        """
+        Client for `entry` that asks the provider for JSON output: a JSON schema
+        response_format on OpenRouter, JSON mime type on Gemini, format=json on
+        Ollama. None when the provider has no such mode (or rejected it before).
+        """
+        with self._lock:
+            if (entry.provider, entry.model) in self.structured_unsupported:
+                return None
+        model, key = entry.model, entry.key
+        if entry.provider == "gemini":
+            builder = lambda: self._build_gemini(model, key, response_mime_type="application/json")
+        elif entry.provider == "openrouter":
+            response_format = {
+                "type": "json_schema",
+                "json_schema": {"name": schema.get("title", "response"), "schema": schema, "strict": False}
+            }
+            builder = lambda: self._build_openrouter(model, key, model_kwargs={"response_format": response_format})
+        elif entry.provider == "ollama":
+            builder = lambda: self._build_ollama(model, key, format="json")
+        else:
+            return None
+        return self._pooled(entry.provider, model, key, builder, variant=f"json:{self._schema_id(schema)}")
+
+    def _client_for(self, entry: LLMChainEntry, response_schema: Optional[Dict]) -> Tuple[Any, bool]:
+        """(client, structured) for one attempt"""
+        if response_schema is not None and settings.LLM_STRUCTURED_OUTPUT:
+            client = self._structured_client(entry, response_schema)
+            if client is not None:
+                return client, True
+        return entry.factory(), False
+
+    def _is_structured_unsupported(self, error: Exception) -> bool:
+        """The provider/model rejected the JSON output parameters themselves"""
+        err_str = str(error).lower()
+        if not any(code in err_str for code in ["400", "422", "invalid_argument", "bad request"]):
+            return False
+        return any(keyword in err_str for keyword in [
+            "response_format", "json_schema", "json mode", "response_mime_type",
+            "structured output", "not supported", "unsupported"
+        ])
+
+    def _mark_structured_unsupported(self, entry: LLMChainEntry, error: Exception) -> None:
+        with self._lock:
+            self.structured_unsupported.add((entry.provider, entry.model))
+        LLM_STRUCTURED_FALLBACKS.labels(entry.provider, entry.model).inc()
+        logger.warning(f"{entry.provider}:{entry.model} rejected structured output, using plain mode: {str(error)[:200]}")
+
     # ---------------- LLM Getters ---------------- #
     def get_gemini(self) -> ChatGoogleGenerativeAI:
         """Get Gemini LLM instance with current model and key"""
@@ -216,12 +409,7 @@ class LLMProviderManager:
         
         logger.info(f"Using Gemini model: {model} (key index: {self.current_gemini_key_index})")
         
-        return ChatGoogleGenerativeAI(
-            model=model, 
-            google_api_key=api_key,
-            temperature=0.7,
-            max_output_tokens=8192
-        )
+        return self._pooled("gemini", model, api_key, lambda: self._build_gemini(model, api_key))
 
     def get_openrouter(self) -> ChatOpenAI:
         """Get OpenRouter LLM instance"""
@@ -230,13 +418,7 @@ class LLMProviderManager:
         
         logger.info(f"Using OpenRouter model: {model}")
         
-        return ChatOpenAI(
-            model=model,
-            api_key=api_key,
-            base_url=self.openrouter_base_url,
-            temperature=0.7,
-            max_tokens=4096
-        )
+        return self._pooled("openrouter", model, api_key, lambda: self._build_openrouter(model, api_key))
 
     def get_ollama(self):
         """Get Ollama LLM instance"""
@@ -254,7 +436,7 @@ class LLMProviderManager:
         
         logger.info(f"Using Ollama model: {model} at {url}")
         
-        return OllamaLLM(base_url=url, model=model)
+        return self._pooled("ollama", model, url, lambda: self._build_ollama(model, url))
 
     def get_hf(self) -> HuggingFaceEndpoint:
         """Get HuggingFace LLM instance"""
@@ -269,100 +451,103 @@ class LLMProviderManager:
         
         logger.info(f"Using HuggingFace model: {model}")
         
-        return HuggingFaceEndpoint(
-            repo_id=model,
-            huggingfacehub_api_token=api_key,
-            task="text-generation",
-            max_new_tokens=4096,
-            temperature=0.7
+        return self._pooled("huggingface", model, api_key, lambda: self._build_hf(model, api_key))
+
+    def _entry_name(self, provider: str, model: str, key: Optional[str]) -> str:
+        return f"{provider}:{model}:{key[:10]}..." if key else f"{provider}:{model}"
+
+    def _entry(self, name: str, provider: str, model: str, key: Optional[str],
+               builder: Callable[[], Any]) -> LLMChainEntry:
+        return LLMChainEntry(
+            name=name,
+            provider=provider,
+            model=model,
+            key=key,
+            factory=lambda: self._pooled(provider, model, key, builder),
         )
 
-    def get_llm_chain(self) -> List[Tuple[str, Callable]]:
-        """FIX: Properly capture variables in closures"""
+    def get_llm_chain(self) -> List[LLMChainEntry]:
+        """Build the ordered fallback chain; each factory hands out a pooled client"""
         chain = []
 
+        # ---------------- Offline stand-in (load tests) ---------------- #
+        if self.provider == "standin":
+            for model in settings.LLM_STANDIN_MODELS:
+                chain.append(self._entry(
+                    f"standin:{model}", "standin", model, None,
+                    lambda m=model: self._build_standin(m)
+                ))
+            return chain
+
+        with self._lock:
+            gemini_combinations = self._rotated_combinations(
+                self.gemini_models, self.gemini_keys,
+                self.current_gemini_model_index, self.current_gemini_key_index,
+                self.failed_gemini_combinations
+            )
+            openrouter_combinations = self._rotated_combinations(
+                self.free_openrouter_models, self.openrouter_keys or [None],
+                self.current_openrouter_model_index, self.current_openrouter_key_index,
+                self.failed_openrouter_combinations
+            )
+
         # ---------------- Gemini (priority 1) ---------------- #
         if self.gemini_models and self.gemini_keys:
-            for model in self.gemini_models:
-                for key in self.gemini_keys:
-                    # FIX: Use functools.partial or default arguments for proper closure
-                    chain.append((
-                        f"gemini:{model}:{key[:10]}...",
-                        lambda m=model, k=key: ChatGoogleGenerativeAI(
-                            model=m,
-                            google_api_key=k,
-                            temperature=0.7,
-                            max_output_tokens=8192
-                        )
-                    ))
+            for model, key in gemini_combinations:
+                chain.append(self._entry(
+                    self._entry_name("gemini", model, key), "gemini", model, key,
+                    lambda m=model, k=key: self._build_gemini(m, k)
+                ))
 
         # ---------------- OpenRouter (priority 2 - before HF for better reliability) ---------------- #
         if self.openrouter_keys or True:  # has free tier
-            for model in self.free_openrouter_models:
-                for key in (self.openrouter_keys or [None]):
-                    chain.append((
-                        f"openrouter:{model}",
-                        lambda m=model, k=key: ChatOpenAI(
-                            model=m,
-                            api_key=k,
-                            base_url=self.openrouter_base_url,
-                            temperature=0.7,
-                            max_tokens=4096
-                        )
-                    ))
+            for model, key in openrouter_combinations:
+                chain.append(self._entry(
+                    self._entry_name("openrouter", model, key), "openrouter", model, key,
+                    lambda m=model, k=key: self._build_openrouter(m, k)
+                ))
 
         # ---------------- HuggingFace (priority 3) ---------------- #
         if self.hf_models and self.hf_keys:
             for model in self.hf_models:
                 for key in self.hf_keys:
-                    chain.append((
-                        f"huggingface:{model}",
-                        lambda m=model, k=key: HuggingFaceEndpoint(
-                            repo_id=m,
-                            huggingfacehub_api_token=k,
-                            task="text-generation",
-                            max_new_tokens=4096,
-                            temperature=0.7
-                        )
+                    chain.append(self._entry(
+                        self._entry_name("huggingface", model, key), "huggingface", model, key,
+                        lambda m=model, k=key: self._build_hf(m, k)
                     ))
 
         # ---------------- Ollama (priority 4) ---------------- #
-        if _OLLAMA_AVAILABLE and (self.ollama_models or self.ollama_urls):
-            max_instances = max(len(self.ollama_models), len(self.ollama_urls))
-            for i in range(max_instances):
-                model_idx = min(i, len(self.ollama_models) - 1) if self.ollama_models else 0
-                url_idx = min(i, len(self.ollama_urls) - 1) if self.ollama_urls else 0
-                
-                model = self.ollama_models[model_idx] if self.ollama_models else "mistral:7b-instruct"
-                url = self.ollama_urls[url_idx] if self.ollama_urls else "http://localhost:11434"
-                
-                chain.append((
-                    f"ollama:{model}@{url}",
-                    lambda m=model, u=url: OllamaLLM(base_url=u, model=m)
-                ))
+        if _OLLAMA_AVAILABLE and self.ollama_instances:
+            # The instance URL plays the role of the "key" for pooling
+            ollama_entries = [
+                self._entry(
+                    f"ollama:{model}@{url}", "ollama", model, url,
+                    lambda m=model, u=url: self._build_ollama(m, u)
+                )
+                for url, model in self.ollama_instances
+            ]
+            # Least busy healthy instance first, instead of always the first URL
+            chain.extend(self.ollama_balancer.order(ollama_entries))
 
         # ---------------- Paid models (optional) ---------------- #
         if self.allow_paid_models:
             if self.gemini_keys:
                 for key in self.gemini_keys:
-                    chain.append((
-                        "gemini_paid:gemini-2.0-flash-thinking-exp",
-                        lambda k=key: ChatGoogleGenerativeAI(
-                            model="gemini-2.0-flash-thinking-exp",
-                            google_api_key=k,
-                            temperature=0.7
+                    chain.append(self._entry(
+                        self._entry_name("gemini_paid", "gemini-2.0-flash-thinking-exp", key), "gemini_paid",
+                        "gemini-2.0-flash-thinking-exp", key,
+                        lambda k=key: self._build_gemini(
+                            "gemini-2.0-flash-thinking-exp", k, max_output_tokens=None
                         )
                     ))
 
             if self.openrouter_keys:
                 for key in self.openrouter_keys:
-                    chain.append((
-                        "openrouter_paid:anthropic/claude-3-5-sonnet",
-                        lambda k=key: ChatOpenAI(
-                            model="anthropic/claude-3-5-sonnet",
-                            api_key=k,
-                            base_url=self.openrouter_base_url,
-                            temperature=0.7
+                    chain.append(self._entry(
+                        self._entry_name("openrouter_paid", "anthropic/claude-3-5-sonnet", key), "openrouter_paid",
+                        "anthropic/claude-3-5-sonnet", key,
+                        lambda k=key: self._build_openrouter(
+                            "anthropic/claude-3-5-sonnet", k, max_tokens=None
                         )
                     ))
 
@@ -392,88 +577,385 @@ class LLMProviderManager:
             "404", "not found", "model not found", "is not found for api version"
         ])
 
-    def _handle_provider_error(self, provider_name: str, error: Exception):
+    def _classify_error(self, error: Exception) -> str:
+        if isinstance(error, asyncio.TimeoutError):
+            return "timeout"
+        if self._is_rate_limit_error(error):
+            return "rate_limit"
+        if self._is_auth_error(error):
+            return "auth"
+        if self._is_model_not_found_error(error):
+            return "model_not_found"
+        return "other"
+
+    def _extract_retry_after(self, error: Exception) -> Optional[float]:
+        """Read a Retry-After hint (seconds) from the error's HTTP response or message"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers is not None:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+            if value is not None:
+                try:
+                    return float(value)
+                except (TypeError, ValueError):
+                    pass
+
+        # e.g. Gemini: "Please retry in 38.5s" / "retry_delay { seconds: 38 }"
+        match = re.search(
+            r"retry(?:[_ -]?after|[_ ]delay| in)[^0-9]{0,20}(\d+(?:\.\d+)?)\s*(ms)?",
+            str(error),
+            re.IGNORECASE
+        )
+        if match:
+            seconds = float(match.group(1))
+            return seconds / 1000 if match.group(2) else seconds
+        return None
+
+    def _breaker_cooldown(self, error: Exception, category: str) -> Optional[float]:
+        """Cooldown that trips the breaker immediately, or None to count towards the threshold"""
+        if category == "rate_limit":
+            cooldown = self._extract_retry_after(error) or settings.LLM_BREAKER_RATE_LIMIT_COOLDOWN
+        elif category == "auth":
+            cooldown = settings.LLM_BREAKER_AUTH_COOLDOWN
+        elif category == "model_not_found":
+            cooldown = settings.LLM_BREAKER_MODEL_NOT_FOUND_COOLDOWN
+        else:
+            return None
+        return min(cooldown, settings.LLM_BREAKER_MAX_COOLDOWN)
+
+    def _get_breaker(self, entry: LLMChainEntry) -> CircuitBreaker:
+        with self._lock:
+            breaker = self.breakers.get(entry.name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+                    default_cooldown=settings.LLM_BREAKER_DEFAULT_COOLDOWN
+                )
+                self.breakers[entry.name] = breaker
+            return breaker
+
+    def _allow_request(self, entry: LLMChainEntry) -> bool:
+        breaker = self._get_breaker(entry)
+        with self._lock:
+            return breaker.allow_request()
+
+    def _get_health(self, entry: LLMChainEntry) -> ProviderHealth:
+        with self._lock:
+            health = self.health.get(entry.name)
+            if health is None:
+                health = ProviderHealth(alpha=settings.LLM_ADAPTIVE_EWMA_ALPHA)
+                self.health[entry.name] = health
+            return health
+
+    def _estimate_tokens(self, prompt: str) -> int:
+        # ~4 characters per token, plus the output we expect to get back
+        return len(prompt) // 4 + settings.LLM_RATE_LIMIT_OUTPUT_TOKEN_ESTIMATE
+
+    def _attempt_timeout(self, deadline: Optional[Deadline]) -> float:
+        """Timeout for the next provider call; 504 when the request budget can't cover one"""
+        if deadline is None:
+            return settings.LLM_ATTEMPT_TIMEOUT_SECONDS
+        deadline.check(settings.LLM_MIN_ATTEMPT_SECONDS, "LLM generation")
+        return deadline.timeout(settings.LLM_ATTEMPT_TIMEOUT_SECONDS)
+
+    def _wait_budget(self, max_wait: float, deadline: Optional[Deadline]) -> float:
+        if deadline is None:
+            return max_wait
+        return max(0.0, min(max_wait, deadline.remaining() - settings.LLM_MIN_ATTEMPT_SECONDS))
+
+    async def _admit(self, entry: LLMChainEntry, prompt: str, errors_by_type: Dict[str, List[str]],
+                     deadline: Optional[Deadline] = None,
+                     spill: bool = True) -> Optional[ConcurrencyPermit]:
+        """
+        Gate an attempt: skip open breakers, take a concurrency slot, then wait
+        briefly for the key's rate-limit budget. Returns the slot to release
+        once the call is over, or None to move on to the next entry. With
+        spill=False (last entry in the chain) the slot queue is waited out.
+        """
+        # Open breakers are skipped without a network call
+        if not self._allow_request(entry):
+            LLM_CALLS_SKIPPED.labels(entry.provider, "circuit_open").inc()
+            errors_by_type['circuit_open'].append(entry.name)
+            logger.info(f"Skipping {entry.name}: circuit open")
+            return None
+        
+        bucket_id = f"{entry.provider}:{fingerprint_key(entry.key)}"
+        queue_wait = settings.LLM_CONCURRENCY_MAX_WAIT_SECONDS if spill else settings.LLM_ATTEMPT_TIMEOUT_SECONDS
+        permit = await self.concurrency_limiter.acquire(
+            entry.provider, bucket_id, self._wait_budget(queue_wait, deadline), spill=spill
+        )
+        if permit is None:
+            self._release_probe(entry)
+            LLM_CALLS_SKIPPED.labels(entry.provider, "saturated").inc()
+            errors_by_type['saturated'].append(entry.name)
+            logger.info(f"Skipping {entry.name}: concurrency limit reached")
+            return None
+        
+        admitted = await self.rate_limiter.acquire(
+            bucket_id,
+            entry.provider,
+            self._estimate_tokens(prompt),
+            self._wait_budget(settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS, deadline)
+        )
+        if not admitted:
+            permit.release()
+            self._release_probe(entry)
+            LLM_CALLS_SKIPPED.labels(entry.provider, "throttled").inc()
+            errors_by_type['throttled'].append(entry.name)
+            logger.info(f"Skipping {entry.name}: local rate limit budget exhausted")
+            return None
+        return permit
+
+    def _release_probe(self, entry: LLMChainEntry) -> None:
+        # Give back a half-open probe slot; the provider was never called
+        breaker = self._get_breaker(entry)
+        with self._lock:
+            breaker.release()
+
+    def _handle_provider_error(self, entry: LLMChainEntry, error: Exception, latency: Optional[float] = None):
         """Handle provider-specific errors and rotation"""
+        provider_name = entry.name
         logger.warning(f"{provider_name} error: {str(error)}")
         
-        # Track failure
-        self.provider_failure_count[provider_name] = self.provider_failure_count.get(provider_name, 0) + 1
+        # Permanent failures are remembered for the lifetime of the worker
+        category = self._classify_error(error)
+        permanent = category in ("auth", "model_not_found")
+        breaker = self._get_breaker(entry)
+        health = self._get_health(entry)
         
-        # Rotate based on provider
-        if provider_name.startswith("gemini"):
-            self._rotate_gemini()
-        elif provider_name.startswith("openrouter"):
-            self._rotate_openrouter()
-        elif provider_name.startswith("ollama"):
-            self._rotate_ollama()
-        elif provider_name.startswith("huggingface"):
-            self._rotate_hf()
+        with self._lock:
+            breaker.record_failure(self._breaker_cooldown(error, category), reason=category)
+            health.record_failure(latency, rate_limited=category == "rate_limit")
+            
+            # Track failure
+            self.provider_failure_count[provider_name] = self.provider_failure_count.get(provider_name, 0) + 1
+            
+            # Rotate based on provider
+            if entry.provider == "gemini":
+                if permanent:
+                    self.failed_gemini_combinations.add((entry.model, entry.key))
+                self._rotate_gemini()
+            elif entry.provider == "openrouter":
+                if permanent:
+                    self.failed_openrouter_combinations.add((entry.model, entry.key))
+                self._rotate_openrouter()
+            elif provider_name.startswith("gemini"):
+                self._rotate_gemini()
+            elif provider_name.startswith("openrouter"):
+                self._rotate_openrouter()
+            elif provider_name.startswith("ollama"):
+                self._rotate_ollama()
+            elif provider_name.startswith("huggingface"):
+                self._rotate_hf()
 
-    # ---------------- Safe Generation ---------------- #
-    async def safe_generate(self, prompt: str, **kwargs) -> Any:
-        """Generate response with automatic fallback across providers"""
+    def _record_usage(self, entry: LLMChainEntry, prompt: str, result: Any, latency: Optional[float] = None):
+        """Token usage from provider metadata, estimated from text length when missing"""
+        if self.usage_recorder is None:
+            return
+        reported = extract_token_usage(result)
+        if reported is not None:
+            prompt_tokens, completion_tokens = reported
+        else:
+            prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(self._chunk_text(result))
+        self.usage_recorder.record(
+            provider=entry.provider,
+            model=entry.model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            estimated=reported is None,
+            cost_usd=token_cost(settings.LLM_TOKEN_PRICES, entry.provider, entry.model,
+                                prompt_tokens, completion_tokens),
+            latency_seconds=latency
+        )
+
+    def _record_success(self, entry: LLMChainEntry, latency: Optional[float] = None):
+        breaker = self._get_breaker(entry)
+        health = self._get_health(entry)
+        with self._lock:
+            breaker.record_success()
+            health.record_success(latency)
+            if latency is not None:
+                self._recent_latencies.append(latency)
+            self.provider_success_count[entry.name] = self.provider_success_count.get(entry.name, 0) + 1
+            if entry.provider == "gemini":
+                self.failed_gemini_combinations.discard((entry.model, entry.key))
+            elif entry.provider == "openrouter":
+                self.failed_openrouter_combinations.discard((entry.model, entry.key))
+
+    # ---------------- Adaptive Ordering ---------------- #
+    def _expected_seconds(self, entry: LLMChainEntry) -> float:
+        return self._get_health(entry).expected_seconds(
+            prior_latency=settings.LLM_ADAPTIVE_PRIOR_LATENCY_SECONDS,
+            rate_limit_penalty=settings.LLM_ADAPTIVE_RATE_LIMIT_PENALTY_SECONDS,
+            rate_limit_window=settings.LLM_ADAPTIVE_RATE_LIMIT_WINDOW_SECONDS
+        )
+
+    def _order_chain(self, chain: List[LLMChainEntry]) -> List[LLMChainEntry]:
+        """
+        Reorder the chain by expected time to a valid answer. Scores are
+        bucketed to LLM_ADAPTIVE_SCORE_RESOLUTION seconds so near-equal entries
+        keep their static priority (the position from get_llm_chain).
+        """
+        if not settings.LLM_ADAPTIVE_ORDERING:
+            return chain
+        resolution = max(settings.LLM_ADAPTIVE_SCORE_RESOLUTION, 1e-6)
+        with self._lock:
+            scored = [
+                (int(self._expected_seconds(entry) / resolution), static_rank, entry)
+                for static_rank, entry in enumerate(chain)
+            ]
+        scored.sort(key=lambda item: (item[0], item[1]))
+        return [entry for _, _, entry in scored]
+
+    def get_chain_scores(self) -> List[Dict[str, Any]]:
+        """Current chain in pick order, with the numbers behind each position"""
         chain = self.get_llm_chain()
-        
-        if not chain:
-            raise HTTPException(
-                status_code=500, 
-                detail="No LLM providers configured"
+        static_ranks = {entry.name: rank for rank, entry in enumerate(chain)}
+        scores = []
+        with self._lock:
+            for rank, entry in enumerate(self._order_chain(chain)):
+                scores.append({
+                    "entry": entry.name,
+                    "rank": rank,
+                    "static_rank": static_ranks[entry.name],
+                    "expected_seconds": round(self._expected_seconds(entry), 3),
+                    **self._get_health(entry).snapshot(),
+                })
+        return scores
+
+    # ---------------- Response Cache ---------------- #
+    def _cache_key(self, entry: LLMChainEntry, prompt: str, output_mode: str) -> str:
+        # output_mode ("plain" or "json:<schema id>") keeps plain and structured answers apart
+        payload = json.dumps(
+            {"model": f"{entry.provider}:{entry.model}", "prompt": prompt, "output": output_mode},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _cache_lookup(self, chain: List[LLMChainEntry], prompt: str,
+                      response_schema: Optional[Dict] = None) -> Optional[str]:
+        """Return a cached answer from the first chain model (in pick order) that has one"""
+        seen_models = set()
+        for entry in chain:
+            model_id = (entry.provider, entry.model)
+            if model_id in seen_models:
+                continue
+            seen_models.add(model_id)
+            cached = self.response_cache.get(
+                self._cache_key(entry, prompt, self._output_mode(entry, response_schema))
             )
+            if cached is not None:
+                logger.info(f"Response cache hit for {entry.provider}:{entry.model}")
+                return cached
+        return None
+
+    def _cache_store(self, entry: LLMChainEntry, prompt: str, output_mode: str, result: Any) -> None:
+        text = self._chunk_text(result)
+        if text.strip():
+            self.response_cache.set(self._cache_key(entry, prompt, output_mode), text)
+
+    def forget_cached(self, prompt: str, response_schema: Optional[Dict] = None) -> None:
+        """Drop cached answers for a prompt (e.g. the answer failed validation)"""
+        if self.response_cache is None:
+            return
+        for entry in self.get_llm_chain():
+            # Plain too: the entry may have fallen back to it after rejecting structured output
+            for output_mode in {"plain", self._output_mode(entry, response_schema)}:
+                self.response_cache.delete(self._cache_key(entry, prompt, output_mode))
+
+    # ---------------- Safe Generation ---------------- #
+    async def _invoke(self, llm: Any, prompt: str, provider_name: str) -> Any:
+        if hasattr(llm, "ainvoke"):
+            return await llm.ainvoke(prompt)
+        elif hasattr(llm, "invoke"):
+            return llm.invoke(prompt)
+        raise HTTPException(
+            status_code=500, 
+            detail=f"LLM {provider_name} does not support invoke or ainvoke"
+        )
+
+    async def _attempt(self, entry: LLMChainEntry, prompt: str, use_cache: bool = False,
+                       timeout: Optional[float] = None, permit: Optional[ConcurrencyPermit] = None,
+                       response_schema: Optional[Dict] = None) -> Any:
+        """
+        One call to one chain entry, with breaker/health bookkeeping. Raises on
+        failure (asyncio.TimeoutError after `timeout` seconds). With use_cache
+        the response is written to the response cache under the output mode
+        actually used. `permit` (from _admit) is released when the call is
+        over. With `response_schema` (and LLM_STRUCTURED_OUTPUT on) the
+        provider's JSON mode is used; if the provider rejects it, the same
+        entry is retried in plain mode.
+        """
+        logger.info(f"Attempting generation with {entry.name}")
+        start = time.perf_counter()
+        if entry.provider == "ollama":
+            self.ollama_balancer.begin(entry.key)
+        try:
+            llm, structured = self._client_for(entry, response_schema)
+            try:
+                result = await asyncio.wait_for(self._invoke(llm, prompt, entry.name), timeout)
+            except Exception as e:
+                if not (structured and self._is_structured_unsupported(e)):
+                    raise
+                self._mark_structured_unsupported(entry, e)
+                structured = False
+                result = await asyncio.wait_for(self._invoke(entry.factory(), prompt, entry.name), timeout)
+        except asyncio.CancelledError:
+            # Lost a hedge race: no verdict on the provider
+            observe_llm_call(entry.provider, entry.model, "cancelled", time.perf_counter() - start)
+            self._release_probe(entry)
+            raise
+        except Exception as e:
+            latency = time.perf_counter() - start
+            observe_llm_call(entry.provider, entry.model, self._classify_error(e), latency)
+            self._handle_provider_error(entry, e, latency)
+            raise
+        finally:
+            if permit is not None:
+                permit.release()
+            if entry.provider == "ollama":
+                self.ollama_balancer.end(entry.key)
         
-        last_error = None
-        errors_by_type = {
+        # Track success
+        latency = time.perf_counter() - start
+        observe_llm_call(entry.provider, entry.model, "success", latency)
+        self._record_success(entry, latency)
+        self._record_usage(entry, prompt, result, latency)
+        logger.info(f"✓ Successfully generated response using {entry.name}")
+        if use_cache:
+            output_mode = f"json:{self._schema_id(response_schema)}" if structured else "plain"
+            self._cache_store(entry, prompt, output_mode, result)
+        return result
+
+    def _log_attempt_error(self, entry: LLMChainEntry, error: Exception, errors_by_type: Dict[str, List[str]]):
+        # Categorize error
+        category = self._classify_error(error)
+        errors_by_type[category].append(entry.name)
+        if category == "rate_limit":
+            logger.warning(f"✗ Rate limit hit on {entry.name}")
+        elif category == "auth":
+            logger.error(f"✗ Auth error on {entry.name}")
+        elif category == "model_not_found":
+            logger.error(f"✗ Model not found on {entry.name}")
+        elif category == "timeout":
+            logger.warning(f"✗ Timed out waiting for {entry.name}")
+        else:
+            logger.error(f"✗ Error on {entry.name}: {str(error)[:200]}")
+
+    def _new_error_summary(self) -> Dict[str, List[str]]:
+        return {
             'rate_limit': [],
             'auth': [],
             'model_not_found': [],
-            'other': []
+            'timeout': [],
+            'other': [],
+            'circuit_open': [],
+            'throttled': [],
+            'saturated': []
         }
-        
-        for provider_name, llm_func in chain:
-            try:
-                logger.info(f"Attempting generation with {provider_name}")
-                llm = llm_func()
-                
-                # Generate response
-                if hasattr(llm, "ainvoke"):
-                    result = await llm.ainvoke(prompt)
-                elif hasattr(llm, "invoke"):
-                    result = llm.invoke(prompt)
-                else:
-                    raise HTTPException(
-                        status_code=500, 
-                        detail=f"LLM {provider_name} does not support invoke or ainvoke"
-                    )
-                
-                # Track success
-                self.provider_success_count[provider_name] = \
-                    self.provider_success_count.get(provider_name, 0) + 1
-                logger.info(f"✓ Successfully generated response using {provider_name}")
-                
-                return result
-                
-            except Exception as e:
-                last_error = e
-                error_msg = str(e)
-                
-                # Categorize error
-                if self._is_rate_limit_error(e):
-                    errors_by_type['rate_limit'].append(provider_name)
-                    logger.warning(f"✗ Rate limit hit on {provider_name}")
-                elif self._is_auth_error(e):
-                    errors_by_type['auth'].append(provider_name)
-                    logger.error(f"✗ Auth error on {provider_name}")
-                elif self._is_model_not_found_error(e):
-                    errors_by_type['model_not_found'].append(provider_name)
-                    logger.error(f"✗ Model not found on {provider_name}")
-                else:
-                    errors_by_type['other'].append(provider_name)
-                    logger.error(f"✗ Error on {provider_name}: {error_msg[:200]}")
-                
-                self._handle_provider_error(provider_name, e)
-                
-                # Continue to next provider
-                continue
-        
+
+    def _raise_all_failed(self, errors_by_type: Dict[str, List[str]], last_error: Optional[Exception]):
         # All providers failed - provide detailed error
         error_summary = []
         if errors_by_type['rate_limit']:
@@ -482,8 +964,16 @@ class LLMProviderManager:
             error_summary.append(f"Auth failed: {', '.join(errors_by_type['auth'])}")
         if errors_by_type['model_not_found']:
             error_summary.append(f"Model not found: {', '.join(errors_by_type['model_not_found'])}")
+        if errors_by_type['timeout']:
+            error_summary.append(f"Timed out: {', '.join(errors_by_type['timeout'])}")
         if errors_by_type['other']:
             error_summary.append(f"Other errors: {', '.join(errors_by_type['other'])}")
+        if errors_by_type['circuit_open']:
+            error_summary.append(f"Circuit open: {', '.join(errors_by_type['circuit_open'])}")
+        if errors_by_type['throttled']:
+            error_summary.append(f"Throttled locally: {', '.join(errors_by_type['throttled'])}")
+        if errors_by_type['saturated']:
+            error_summary.append(f"Concurrency limit: {', '.join(errors_by_type['saturated'])}")
         
         logger.error(f"All LLM providers failed. {' | '.join(error_summary)}")
         
@@ -492,6 +982,309 @@ class LLMProviderManager:
             detail=f"All LLM providers failed. {' | '.join(error_summary)}. Last error: {str(last_error)[:200]}"
         )
 
+    async def safe_generate(self, prompt: str, hedge: Optional[bool] = None,
+                            bypass_cache: bool = False, deadline: Optional[Deadline] = None,
+                            response_schema: Optional[Dict] = None) -> Any:
+        """
+        Generate response with automatic fallback across providers.
+
+        hedge: race the next chain entry when the current one is slow
+        (defaults to settings.LLM_HEDGE_ENABLED).
+        bypass_cache: skip the response-cache lookup (the fresh answer is still cached).
+        deadline: request budget; every call is capped by what is left of it and a
+        GatewayTimeoutException (504) is raised once too little remains.
+        response_schema: JSON schema of the expected answer; with
+        LLM_STRUCTURED_OUTPUT on, providers that support it are asked for
+        JSON/schema-constrained output; plain and structured answers are cached apart.
+        """
+        chain = self._order_chain(self.get_llm_chain())
+        
+        if not chain:
+            raise HTTPException(
+                status_code=500, 
+                detail="No LLM providers configured"
+            )
+        
+        errors_by_type = self._new_error_summary()
+        
+        use_cache = self.response_cache is not None
+        if use_cache and not bypass_cache:
+            cached = self._cache_lookup(chain, prompt, response_schema)
+            if cached is not None:
+                return cached
+        
+        if hedge is None:
+            hedge = settings.LLM_HEDGE_ENABLED
+        if hedge:
+            return await self._hedged_generate(prompt, chain, errors_by_type, use_cache, deadline, response_schema)
+        
+        last_error = None
+        for entry in chain:
+            self._attempt_timeout(deadline)
+            permit = await self._admit(entry, prompt, errors_by_type, deadline, spill=entry is not chain[-1])
+            if permit is None:
+                continue
+            
+            try:
+                return await self._attempt(
+                    entry, prompt, use_cache, self._attempt_timeout(deadline), permit, response_schema
+                )
+            except Exception as e:
+                last_error = e
+                self._log_attempt_error(entry, e, errors_by_type)
+                # Continue to next provider
+                continue
+        
+        self._raise_all_failed(errors_by_type, last_error)
+
+    def _chunk_text(self, chunk: Any) -> str:
+        content = getattr(chunk, "content", chunk)
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+        return str(content or "")
+
+    async def safe_stream(self, prompt: str, deadline: Optional[Deadline] = None,
+                          response_schema: Optional[Dict] = None) -> AsyncIterator[str]:
+        """
+        Stream text chunks from the first chain entry that starts answering.
+
+        Entries that fail before producing any output fall through to the next
+        one, like safe_generate; a failure after output has been yielded is
+        raised, since the caller has already consumed part of the answer. The
+        wait for each chunk is capped like one safe_generate attempt.
+        response_schema works as in safe_generate; an entry that rejects JSON
+        mode is retried in plain mode without counting against its breaker.
+        """
+        chain = self._order_chain(self.get_llm_chain())
+        
+        if not chain:
+            raise HTTPException(
+                status_code=500, 
+                detail="No LLM providers configured"
+            )
+        
+        errors_by_type = self._new_error_summary()
+        last_error = None
+        remaining = list(chain)
+        
+        while remaining:
+            entry = remaining.pop(0)
+            self._attempt_timeout(deadline)
+            permit = await self._admit(entry, prompt, errors_by_type, deadline, spill=entry is not chain[-1])
+            if permit is None:
+                continue
+            
+            logger.info(f"Attempting streamed generation with {entry.name}")
+            start = time.perf_counter()
+            started = False
+            streamed: List[str] = []
+            usage_chunk = None
+            if entry.provider == "ollama":
+                self.ollama_balancer.begin(entry.key)
+            structured = False
+            try:
+                llm, structured = self._client_for(entry, response_schema)
+                if hasattr(llm, "astream"):
+                    stream = llm.astream(prompt).__aiter__()
+                    while True:
+                        timeout = settings.LLM_ATTEMPT_TIMEOUT_SECONDS
+                        if deadline is not None:
+                            timeout = deadline.timeout(timeout)
+                        try:
+                            chunk = await asyncio.wait_for(stream.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            break
+                        if getattr(chunk, "usage_metadata", None):
+                            usage_chunk = chunk
+                        text = self._chunk_text(chunk)
+                        if text:
+                            started = True
+                            streamed.append(text)
+                            yield text
+                else:
+                    # No streaming support: deliver the whole answer as one chunk
+                    result = await asyncio.wait_for(
+                        self._invoke(llm, prompt, entry.name), self._attempt_timeout(deadline)
+                    )
+                    started = True
+                    usage_chunk = result
+                    streamed.append(self._chunk_text(result))
+                    yield streamed[-1]
+            except asyncio.CancelledError:
+                observe_llm_call(entry.provider, entry.model, "cancelled", time.perf_counter() - start)
+                self._release_probe(entry)
+                raise
+            except Exception as e:
+                latency = time.perf_counter() - start
+                if structured and not started and self._is_structured_unsupported(e):
+                    # Retry the same entry in plain mode
+                    self._mark_structured_unsupported(entry, e)
+                    self._release_probe(entry)
+                    remaining.insert(0, entry)
+                    continue
+                observe_llm_call(entry.provider, entry.model, self._classify_error(e), latency)
+                self._handle_provider_error(entry, e, latency)
+                if started:
+                    raise
+                last_error = e
+                self._log_attempt_error(entry, e, errors_by_type)
+                continue
+            finally:
+                permit.release()
+                if entry.provider == "ollama":
+                    self.ollama_balancer.end(entry.key)
+            
+            latency = time.perf_counter() - start
+            observe_llm_call(entry.provider, entry.model, "success", latency)
+            self._record_success(entry, latency)
+            if usage_chunk is not None and extract_token_usage(usage_chunk) is not None:
+                self._record_usage(entry, prompt, usage_chunk, latency)
+            else:
+                self._record_usage(entry, prompt, "".join(streamed), latency)
+            return
+        
+        self._raise_all_failed(errors_by_type, last_error)
+
+    # ---------------- Hedged Generation ---------------- #
+    def _hedge_delay(self) -> float:
+        """Configured hedge delay, or p95 of recent successful latencies"""
+        if settings.LLM_HEDGE_DELAY_SECONDS:
+            return settings.LLM_HEDGE_DELAY_SECONDS
+        with self._lock:
+            samples = sorted(self._recent_latencies)
+        if len(samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return max(p95, settings.LLM_HEDGE_MIN_DELAY_SECONDS)
+
+    def _take_hedge_token(self) -> bool:
+        """Spend one unit of the process-wide hedge budget, if any is left"""
+        with self._lock:
+            if self._hedge_tokens < 1:
+                return False
+            self._hedge_tokens -= 1
+            return True
+
+    def _refund_hedge_token(self) -> None:
+        """Give back a token whose hedge could not be launched"""
+        with self._lock:
+            self._hedge_tokens = min(self._hedge_tokens + 1, float(settings.LLM_HEDGE_BUDGET_BURST))
+
+    def _is_valid_response(self, result: Any) -> bool:
+        content = getattr(result, "content", result)
+        return bool(content.strip()) if isinstance(content, str) else result is not None
+
+    async def _hedged_generate(self, prompt: str, chain: List[LLMChainEntry],
+                               errors_by_type: Dict[str, List[str]],
+                               use_cache: bool = False,
+                               deadline: Optional[Deadline] = None,
+                               response_schema: Optional[Dict] = None) -> Any:
+        """
+        Start the first entry; if it hasn't answered within the hedge delay,
+        start the next one in parallel. The first valid response wins and the
+        other tasks are cancelled. Failures fail over immediately (not counted
+        as hedges); hedges are capped per call and by a process-wide budget
+        that refills at LLM_HEDGE_BUDGET_RATIO per hedged call.
+        """
+        with self._lock:
+            self._hedge_tokens = min(
+                self._hedge_tokens + settings.LLM_HEDGE_BUDGET_RATIO,
+                float(settings.LLM_HEDGE_BUDGET_BURST)
+            )
+        
+        candidates = iter(chain)
+        pending: Dict[asyncio.Task, LLMChainEntry] = {}
+        permits: List[ConcurrencyPermit] = []
+        # Tasks started by the hedge delay; failover tasks don't count as hedge wins
+        hedge_tasks: Set[asyncio.Task] = set()
+        hedges_left = settings.LLM_HEDGE_MAX_EXTRA_REQUESTS
+        last_error = None
+        out_of_time = False
+
+        async def launch_next() -> Optional[asyncio.Task]:
+            nonlocal out_of_time
+            for entry in candidates:
+                if deadline is not None and deadline.expired(settings.LLM_MIN_ATTEMPT_SECONDS):
+                    # Calls already in flight may still answer; just don't start new ones
+                    out_of_time = True
+                    return None
+                permit = await self._admit(entry, prompt, errors_by_type, deadline, spill=entry is not chain[-1])
+                if permit is None:
+                    continue
+                permits.append(permit)
+                task = asyncio.create_task(
+                    self._attempt(
+                        entry, prompt, use_cache, self._attempt_timeout(deadline), permit, response_schema
+                    )
+                )
+                pending[task] = entry
+                return task
+            return None
+
+        try:
+            await launch_next()
+            while pending:
+                can_hedge = hedges_left > 0 and len(pending) < settings.LLM_HEDGE_MAX_PARALLEL
+                wait_for = self._hedge_delay() if can_hedge else None
+                if deadline is not None:
+                    wait_for = deadline.timeout(wait_for)
+                done, _ = await asyncio.wait(
+                    list(pending),
+                    timeout=wait_for,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                if not done:
+                    if deadline is not None:
+                        deadline.check(what="LLM generation")
+                    # Slow provider: hedge with the next entry if the budget allows
+                    hedges_left -= 1
+                    if self._take_hedge_token():
+                        hedge_task = await launch_next()
+                        if hedge_task is None:
+                            # No entry left to hedge with: the token goes back, the rest waits
+                            self._refund_hedge_token()
+                            hedges_left = 0
+                        else:
+                            hedge_tasks.add(hedge_task)
+                            with self._lock:
+                                self.hedges_launched += 1
+                            logger.info("Hedging slow LLM call with next chain entry")
+                    else:
+                        hedges_left = 0
+                    continue
+                
+                for task in done:
+                    entry = pending.pop(task)
+                    error = task.exception()
+                    if error is None and self._is_valid_response(task.result()):
+                        if task in hedge_tasks:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return task.result()
+                    
+                    last_error = error or ValueError(f"Empty response from {entry.name}")
+                    if error is None:
+                        errors_by_type['other'].append(entry.name)
+                    else:
+                        self._log_attempt_error(entry, error, errors_by_type)
+                    # Fail over right away
+                    await launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            # A task cancelled before it ever ran never reached its own release
+            for permit in permits:
+                permit.release()
+        
+        if out_of_time:
+            deadline.check(settings.LLM_MIN_ATTEMPT_SECONDS, "LLM generation")
+        self._raise_all_failed(errors_by_type, last_error)
+
     def get_llm(self):
         """Get a single LLM instance"""
         if self.provider == "auto":
@@ -501,8 +1294,7 @@ class LLMProviderManager:
                     status_code=500, 
                     detail="No LLM providers configured"
                 )
-            _, llm_func = chain[0]
-            return llm_func()
+            return chain[0].factory()
         
         provider_map = {
             "gemini": self.get_gemini,
@@ -510,6 +1302,9 @@ class LLMProviderManager:
             "huggingface": self.get_hf,
         }
         
+        if self.provider == "standin":
+            provider_map["standin"] = lambda: self.get_llm_chain()[0].factory()
+
         # Only add ollama to provider map if available
         if _OLLAMA_AVAILABLE:
             provider_map["ollama"] = self.get_ollama
@@ -523,19 +1318,63 @@ class LLMProviderManager:
         
         return provider_map[self.provider]()
 
+    def has_headroom(self) -> bool:
+        """
+        False while live calls are queueing for a concurrency slot or a chain
+        entry is cooling down after a rate limit; background generation waits
+        for the next round instead of competing with users for the quota.
+        """
+        with self._lock:
+            if any(breaker.last_reason == "rate_limit" and breaker.remaining_cooldown() > 0
+                   for breaker in self.breakers.values()):
+                return False
+        providers = self.concurrency_limiter.snapshot()["providers"]
+        return not any(provider["queued"] for provider in providers.values())
+
     def get_stats(self) -> Dict[str, Any]:
         """Get provider usage statistics"""
+        with self._lock:
+            return self._build_stats()
+
+    def _build_stats(self) -> Dict[str, Any]:
         return {
-            "success_count": self.provider_success_count,
-            "failure_count": self.provider_failure_count,
+            "success_count": dict(self.provider_success_count),
+            "failure_count": dict(self.provider_failure_count),
+            "failed_combinations": {
+                "gemini": len(self.failed_gemini_combinations),
+                "openrouter": len(self.failed_openrouter_combinations),
+            },
             "ollama_available": _OLLAMA_AVAILABLE,
+            "ollama_instances": self.ollama_balancer.snapshot(),
+            "client_pool": self.client_pool.get_stats(),
+            "circuit_breakers": {
+                name: breaker.snapshot() for name, breaker in self.breakers.items()
+            },
+            "adaptive_ordering": {
+                "enabled": settings.LLM_ADAPTIVE_ORDERING,
+                "chain": self.get_chain_scores(),
+            },
+            "rate_limits": self.rate_limiter.snapshot(),
+            "structured_output": {
+                "enabled": settings.LLM_STRUCTURED_OUTPUT,
+                "unsupported": sorted(f"{provider}:{model}" for provider, model in self.structured_unsupported),
+            },
+            "concurrency": self.concurrency_limiter.snapshot(),
+            "response_cache": self.response_cache.get_stats() if self.response_cache else {"enabled": False},
+            "usage": self.usage_recorder.get_stats() if self.usage_recorder else {"enabled": False},
+            "hedging": {
+                "enabled": settings.LLM_HEDGE_ENABLED,
+                "launched": self.hedges_launched,
+                "wins": self.hedge_wins,
+                "budget_tokens": round(self._hedge_tokens, 2),
+            },
             "configured_providers": {
                 "gemini_models": len(self.gemini_models),
                 "gemini_keys": len(self.gemini_keys),
                 "openrouter_keys": len(self.openrouter_keys),
                 "hf_models": len(self.hf_models),
                 "hf_keys": len(self.hf_keys),
-                "ollama_instances": max(len(self.ollama_models), len(self.ollama_urls))
+                "ollama_instances": len(self.ollama_instances)
             },
             "current_indices": {
                 "gemini_model": self.current_gemini_model_index,
@@ -546,4 +1385,16 @@ class LLMProviderManager:
                 "hf_model": self.current_hf_model_index,
                 "hf_key": self.current_hf_key_index
             }
-        }
\ No newline at end of file
+        }
+
+    # ---------------- Background tasks ---------------- #
+    def uses_ollama(self) -> bool:
+        return _OLLAMA_AVAILABLE and self.provider in ("auto", "ollama") and bool(self.ollama_instances)
+
+    def start_background_tasks(self) -> None:
+        """Ollama warm-up and health probes; call from the app lifespan"""
+        if self.uses_ollama():
+            self.ollama_balancer.start(warm_up=settings.OLLAMA_WARMUP)
+
+    async def stop_background_tasks(self) -> None:
+        await self.ollama_balancer.close()
@@ -0,0 +1,101 @@
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for a single fallback-chain entry.
+
+    CLOSED    - calls flow normally; consecutive failures are counted.
+    OPEN      - calls are skipped without touching the network until the
+                cooldown expires.
+    HALF_OPEN - one probe call is let through; success closes the breaker,
+                failure re-opens it.
+
+    Not thread-safe on its own: LLMProviderManager mutates breakers under its lock.
+    """
+
+    def __init__(self, failure_threshold: int = 3, default_cooldown: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.default_cooldown = default_cooldown
+        self._clock = clock
+
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.cooldown = 0.0
+        self.last_reason: Optional[str] = None
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def remaining_cooldown(self) -> float:
+        if self.state != BreakerState.OPEN or self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - self._clock())
+
+    def allow_request(self) -> bool:
+        """True if a call may go out now (moves OPEN -> HALF_OPEN once cooled down)"""
+        if self.state == BreakerState.CLOSED:
+            return True
+
+        if self.state == BreakerState.OPEN:
+            if self.remaining_cooldown() > 0:
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self._probe_in_flight = False
+
+        # HALF_OPEN: only a single probe at a time
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.cooldown = 0.0
+        self._probe_in_flight = False
+
+    def record_failure(self, cooldown: Optional[float] = None, reason: Optional[str] = None) -> None:
+        """
+        Register a failed call.
+
+        An explicit ``cooldown`` (rate limit, auth, model not found) trips the
+        breaker immediately; other errors only trip it after
+        ``failure_threshold`` consecutive failures or during a half-open probe.
+        """
+        self.consecutive_failures += 1
+        self.last_reason = reason
+        probe_failed = self.state == BreakerState.HALF_OPEN
+        self._probe_in_flight = False
+
+        if cooldown is not None or probe_failed or self.consecutive_failures >= self.failure_threshold:
+            self._open(cooldown if cooldown is not None else self.default_cooldown)
+
+    def release(self) -> None:
+        """Give back a half-open probe slot without a verdict (e.g. the call was cancelled)"""
+        self._probe_in_flight = False
+
+    def _open(self, cooldown: float) -> None:
+        self.state = BreakerState.OPEN
+        self.opened_at = self._clock()
+        self.cooldown = max(0.0, cooldown)
+        self.times_opened += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "cooldown_remaining": round(self.remaining_cooldown(), 1),
+            "times_opened": self.times_opened,
+            "last_reason": self.last_reason,
+        }
@@ -0,0 +1,97 @@
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str, str]
+
+
+def fingerprint_key(api_key: Optional[str]) -> str:
+    """Stable, non-reversible identifier for an API key (safe for logs and dict keys)"""
+    if not api_key:
+        return "anonymous"
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+class LLMClientPool:
+    """
+    Process-wide pool of warm LLM clients keyed by (provider, model, key).
+
+    LangChain chat/LLM objects own their HTTP (or gRPC) clients, so keeping one
+    instance per (provider, model, key) alive keeps its connections alive too:
+    repeated calls reuse the same kept-alive sockets instead of paying a new
+    client setup and TLS handshake on every attempt.
+
+    Client construction happens under a lock, so concurrent coroutines (and
+    threads running sync ``invoke``) never build the same client twice.
+    """
+
+    def __init__(self):
+        self._clients: Dict[PoolKey, Any] = {}
+        self._lock = threading.Lock()
+        # Separate from _lock so counting a hit never waits on a client being built
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _make_key(self, provider: str, model: str, api_key: Optional[str], variant: str = "") -> PoolKey:
+        model_id = f"{model}#{variant}" if variant else model
+        return (provider, model_id, fingerprint_key(api_key))
+
+    def get(
+        self,
+        provider: str,
+        model: str,
+        api_key: Optional[str],
+        factory: Callable[[], Any],
+        variant: str = "",
+    ) -> Any:
+        """Return the pooled client for (provider, model, key), building it once if missing"""
+        pool_key = self._make_key(provider, model, api_key, variant)
+
+        client = self._clients.get(pool_key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(pool_key)
+                if client is None:
+                    logger.info(f"Creating pooled LLM client for {provider}:{model}")
+                    client = factory()
+                    self._clients[pool_key] = client
+                    self._count(miss=True)
+                    return client
+        self._count(miss=False)
+        return client
+
+    def _count(self, miss: bool) -> None:
+        with self._stats_lock:
+            if miss:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def evict(self, provider: str, model: str, api_key: Optional[str], variant: str = "") -> None:
+        """Drop a client (e.g. after its key was revoked) so the next call rebuilds it"""
+        with self._lock:
+            self._clients.pop(self._make_key(provider, model, api_key, variant), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "size": len(self._clients),
+            "hits": hits,
+            "misses": misses,
+        }
+
+
+_client_pool = LLMClientPool()
+
+
+def get_client_pool() -> LLMClientPool:
+    return _client_pool
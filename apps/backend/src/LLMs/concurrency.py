@@ -0,0 +1,179 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from ..utils.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS
+
+
+class ConcurrencyPermit:
+    """One in-flight call slot; release() is idempotent."""
+
+    def __init__(self, limiter: Optional["ConcurrencyLimiter"], provider: str, key_id: str):
+        self._limiter = limiter
+        self.provider = provider
+        self.key_id = key_id
+        self.acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        if self._limiter is not None:
+            self._limiter._release(self, time.monotonic() - self.acquired_at)
+
+
+class _Waiter:
+    __slots__ = ("key_id", "future", "enqueued_at")
+
+    def __init__(self, key_id: str, future: asyncio.Future, enqueued_at: float):
+        self.key_id = key_id
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight LLM calls per provider and per API key.
+
+    Limits come from settings.LLM_CONCURRENCY_LIMITS, e.g.
+    {"gemini": {"provider": 8, "key": 2}}; providers without an entry are not
+    limited. Each provider has one FIFO queue. A waiter is granted a slot once
+    both its key and its provider have room, in arrival order; a waiter whose
+    key is full doesn't hold up waiters for other keys.
+
+    Callers that have somewhere else to go (a later chain entry) ask for the
+    expected wait first and spill over instead of queueing when it is too long.
+    The estimate is (waiters ahead + 1) * average hold time / limit, using an
+    EWMA of how long slots of that provider are held.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, int]], prior_hold_seconds: float = 10.0,
+                 alpha: float = 0.2, clock: Callable[[], float] = time.monotonic):
+        self.limits = limits or {}
+        self.prior_hold_seconds = prior_hold_seconds
+        self.alpha = alpha
+        self._clock = clock
+        self._provider_in_flight: Dict[str, int] = {}
+        self._key_in_flight: Dict[str, int] = {}
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._hold_seconds: Dict[str, float] = {}
+        self.spilled: Dict[str, int] = {}
+        self.timed_out: Dict[str, int] = {}
+
+    def _has_capacity(self, provider: str, key_id: str) -> bool:
+        limits = self.limits.get(provider, {})
+        provider_limit = limits.get("provider")
+        key_limit = limits.get("key")
+        if provider_limit and self._provider_in_flight.get(provider, 0) >= provider_limit:
+            return False
+        if key_limit and self._key_in_flight.get(key_id, 0) >= key_limit:
+            return False
+        return True
+
+    def _grant(self, provider: str, key_id: str) -> ConcurrencyPermit:
+        self._provider_in_flight[provider] = self._provider_in_flight.get(provider, 0) + 1
+        self._key_in_flight[key_id] = self._key_in_flight.get(key_id, 0) + 1
+        return ConcurrencyPermit(self, provider, key_id)
+
+    def _dispatch(self, provider: str) -> None:
+        """Hand free slots to queued waiters in arrival order"""
+        queue = self._queues.get(provider)
+        if not queue:
+            return
+        provider_limit = self.limits.get(provider, {}).get("provider")
+        for waiter in list(queue):
+            if provider_limit and self._provider_in_flight.get(provider, 0) >= provider_limit:
+                break
+            if waiter.future.done():
+                queue.remove(waiter)
+                continue
+            if self._has_capacity(provider, waiter.key_id):
+                queue.remove(waiter)
+                waiter.future.set_result(self._grant(provider, waiter.key_id))
+        LLM_QUEUE_DEPTH.labels(provider).set(len(queue))
+
+    def _release(self, permit: ConcurrencyPermit, held_seconds: float) -> None:
+        provider, key_id = permit.provider, permit.key_id
+        self._provider_in_flight[provider] = max(0, self._provider_in_flight.get(provider, 0) - 1)
+        self._key_in_flight[key_id] = max(0, self._key_in_flight.get(key_id, 0) - 1)
+        previous = self._hold_seconds.get(provider, self.prior_hold_seconds)
+        self._hold_seconds[provider] = self.alpha * held_seconds + (1 - self.alpha) * previous
+        self._dispatch(provider)
+
+    def expected_wait(self, provider: str, key_id: str) -> float:
+        """Estimated seconds until a new caller for this key would get a slot"""
+        limits = self.limits.get(provider)
+        if not limits:
+            return 0.0
+        queue = self._queues.get(provider, ())
+        hold = self._hold_seconds.get(provider, self.prior_hold_seconds)
+        wait = 0.0
+        provider_limit = limits.get("provider")
+        if provider_limit and self._provider_in_flight.get(provider, 0) >= provider_limit:
+            wait = max(wait, (len(queue) + 1) * hold / provider_limit)
+        key_limit = limits.get("key")
+        if key_limit:
+            key_ahead = sum(1 for waiter in queue if waiter.key_id == key_id)
+            if key_ahead or self._key_in_flight.get(key_id, 0) >= key_limit:
+                wait = max(wait, (key_ahead + 1) * hold / key_limit)
+        return wait
+
+    async def acquire(self, provider: str, key_id: str, max_wait: float,
+                      spill: bool = True) -> Optional[ConcurrencyPermit]:
+        """
+        Get a slot, waiting up to `max_wait` seconds in the provider's FIFO queue.
+        With `spill`, give up right away when the expected wait exceeds `max_wait`.
+        None means route elsewhere.
+        """
+        if provider not in self.limits:
+            return ConcurrencyPermit(None, provider, key_id)
+
+        if spill and self.expected_wait(provider, key_id) > max_wait:
+            self.spilled[provider] = self.spilled.get(provider, 0) + 1
+            LLM_QUEUE_WAIT_SECONDS.labels(provider, "spilled").observe(0)
+            return None
+
+        queue = self._queues.setdefault(provider, deque())
+        waiter = _Waiter(key_id, asyncio.get_running_loop().create_future(), self._clock())
+        queue.append(waiter)
+        self._dispatch(provider)
+
+        try:
+            permit = await asyncio.wait_for(asyncio.shield(waiter.future), max_wait)
+        except asyncio.TimeoutError:
+            permit = None
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                waiter.future.result().release()
+            else:
+                waiter.future.cancel()
+            self._dispatch(provider)
+            raise
+
+        if permit is None:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted right as the wait ran out
+                permit = waiter.future.result()
+            else:
+                waiter.future.cancel()
+                self._dispatch(provider)
+                self.timed_out[provider] = self.timed_out.get(provider, 0) + 1
+                LLM_QUEUE_WAIT_SECONDS.labels(provider, "timed_out").observe(self._clock() - waiter.enqueued_at)
+                return None
+
+        LLM_QUEUE_WAIT_SECONDS.labels(provider, "admitted").observe(self._clock() - waiter.enqueued_at)
+        return permit
+
+    def snapshot(self) -> Dict[str, Any]:
+        providers = {}
+        for provider in self.limits:
+            providers[provider] = {
+                "in_flight": self._provider_in_flight.get(provider, 0),
+                "queued": len(self._queues.get(provider, ())),
+                "avg_hold_seconds": round(self._hold_seconds.get(provider, self.prior_hold_seconds), 3),
+                "spilled": self.spilled.get(provider, 0),
+                "timed_out": self.timed_out.get(provider, 0),
+            }
+        return {"limits": self.limits, "providers": providers}
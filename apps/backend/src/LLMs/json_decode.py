@@ -0,0 +1,142 @@
+import re
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+from json_repair import repair_json
+
+logger = logging.getLogger(__name__)
+
+# orjson is a faster drop-in for json.loads; fall back to the stdlib without it
+try:
+    import orjson
+    _ORJSON_AVAILABLE = True
+except ImportError:
+    _ORJSON_AVAILABLE = False
+
+MAX_LOCAL_REPAIRS = 5
+_STRUCTURAL = re.compile(r'["\\{}\[\]]')
+
+
+def loads(text: str) -> Any:
+    """Decode with orjson when installed. Raises json.JSONDecodeError either way."""
+    if _ORJSON_AVAILABLE:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, so .pos is kept
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _scan(text: str, start: int) -> Tuple[int, List[Tuple[int, Optional[int]]]]:
+    """
+    Walk the JSON value starting at `start` once.
+
+    Returns the end offset of the root value (exclusive, or len(text) when it
+    is never closed) and the spans of every element of an array nested
+    directly in the root - e.g. each question of a section. An unterminated
+    element has end None.
+    """
+    stack: List[str] = []
+    elements: List[Tuple[int, Optional[int]]] = []
+    element_start: Optional[int] = None
+    in_string = False
+    escaped_at = -1
+
+    # Only quotes, backslashes and brackets matter; let the regex skip the rest
+    for match in _STRUCTURAL.finditer(text, start):
+        i = match.start()
+        ch = text[i]
+        if in_string:
+            if i == escaped_at:
+                continue
+            if ch == "\\":
+                escaped_at = i + 1
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            if len(stack) == 2 and stack[1] == "[" and element_start is None:
+                element_start = i
+            stack.append(ch)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if len(stack) == 2 and element_start is not None:
+                elements.append((element_start, i + 1))
+                element_start = None
+            elif not stack:
+                return i + 1, elements
+
+    if element_start is not None:
+        elements.append((element_start, None))
+    return len(text), elements
+
+
+def _root_start(text: str) -> int:
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return min(starts) if starts else -1
+
+
+def _repair_locally(candidate: str, elements: List[Tuple[int, Optional[int]]]) -> Optional[Any]:
+    """Repair only the array element holding each decode error; None if that isn't enough"""
+    for _ in range(MAX_LOCAL_REPAIRS):
+        try:
+            return loads(candidate)
+        except json.JSONDecodeError as e:
+            pos = e.pos
+        span = next(
+            ((s, end) for s, end in elements if end is not None and s <= pos < end),
+            None,
+        )
+        if span is None:
+            return None
+
+        s, end = span
+        fixed = repair_json(candidate[s:end])
+        if not fixed or not fixed.lstrip().startswith("{"):
+            return None
+        candidate = candidate[:s] + fixed + candidate[end:]
+        shift = len(fixed) - (end - s)
+        elements = [
+            (es + shift, ee + shift) if es > s else (es, ee)
+            for es, ee in elements
+            if (es, ee) != span and ee is not None
+        ]
+    return None
+
+
+def decode_llm_json(text: str) -> Any:
+    """
+    Decode the JSON value embedded in LLM output.
+
+    Fast path: slice from the first bracket to the last closing bracket
+    (drops prose and code fences) and decode once. On failure the value is
+    scanned once to find its exact bounds and the spans of its array elements;
+    only the element that holds the error is passed to `repair_json`. Whole
+    document repair is the last resort (e.g. truncated output).
+    """
+    start = _root_start(text)
+    if start == -1:
+        return loads(repair_json(text))
+
+    closer = "}" if text[start] == "{" else "]"
+    end = text.rfind(closer) + 1
+    if end > start:
+        try:
+            return loads(text[start:end])
+        except json.JSONDecodeError:
+            pass
+
+    end, elements = _scan(text, start)
+    candidate = text[start:end]
+    elements = [(s - start, e - start if e is not None else None) for s, e in elements]
+    truncated = bool(elements) and elements[-1][1] is None
+    if not truncated:
+        repaired = _repair_locally(candidate, elements)
+        if repaired is not None:
+            return repaired
+
+    logger.debug("Local JSON repair failed, repairing whole document")
+    return loads(repair_json(candidate))
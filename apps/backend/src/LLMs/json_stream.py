@@ -0,0 +1,72 @@
+from typing import List, Optional
+
+
+class StreamingArrayExtractor:
+    """
+    Incrementally pulls complete elements out of one array in a streamed JSON object.
+
+    Feed it raw LLM text chunks as they arrive; every call returns the raw text
+    of the array elements (under ``array_key`` in the root object) that were
+    completed by that chunk. Prose or code fences before the root object are
+    ignored. Only the elements are returned - callers decode them.
+    """
+
+    def __init__(self, array_key: str = "questions"):
+        self.array_key = array_key
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = None
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._element_start: Optional[int] = None
+        self._text = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        self._text += chunk
+        completed = []
+        text = self._text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._string_start is not None:
+                        self._last_string = text[self._string_start + 1:i]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif ch in "{[":
+                if ch == "[" and self._depth == 1 and self._current_key == self.array_key:
+                    self._array_depth = 2
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._element_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth = max(0, self._depth - 1)
+                if self._array_depth is not None:
+                    if ch == "}" and self._depth == self._array_depth and self._element_start is not None:
+                        completed.append(text[self._element_start:i + 1])
+                        self._element_start = None
+                    elif ch == "]" and self._depth == self._array_depth - 1:
+                        self._array_depth = None
+
+        self._pos = len(text)
+        return completed
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far"""
+        return self._text
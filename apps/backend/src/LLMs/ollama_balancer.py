@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class OllamaBalancer:
+    """
+    Spreads Ollama calls over the configured instances.
+
+    Instances are ordered by outstanding requests (least first, configured
+    order breaks ties), so concurrent generations land on different boxes
+    instead of queueing on the first one. A background task loads each
+    instance's model once at startup (empty prompt + keep_alive) and then
+    probes /api/tags every `probe_interval` seconds; instances failing the
+    probe drop out of the order until they answer again.
+    """
+
+    def __init__(self, instances: Sequence[Tuple[str, str]], keep_alive: str = "30m",
+                 probe_interval: float = 30.0, probe_timeout: float = 3.0,
+                 warmup_timeout: float = 300.0):
+        # (url, model) pairs, in configured order
+        self.instances = list(instances)
+        self.keep_alive = keep_alive
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.warmup_timeout = warmup_timeout
+        self._outstanding: Dict[str, int] = {url: 0 for url, _ in self.instances}
+        self._healthy: Dict[str, bool] = {url: True for url, _ in self.instances}
+        self._last_probe: Dict[str, float] = {}
+        self._warmed: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------------- Balancing ---------------- #
+    def begin(self, url: str) -> None:
+        with self._lock:
+            self._outstanding[url] = self._outstanding.get(url, 0) + 1
+
+    def end(self, url: str) -> None:
+        with self._lock:
+            self._outstanding[url] = max(0, self._outstanding.get(url, 0) - 1)
+
+    def order(self, entries: List[Any]) -> List[Any]:
+        """
+        Chain entries (key = instance URL) by least outstanding requests.
+        Unhealthy instances are left out unless none is healthy.
+        """
+        with self._lock:
+            healthy = [entry for entry in entries if self._healthy.get(entry.key, True)]
+            candidates = healthy or entries
+            ranked = sorted(
+                enumerate(candidates),
+                key=lambda item: (self._outstanding.get(item[1].key, 0), item[0])
+            )
+        return [entry for _, entry in ranked]
+
+    # ---------------- Health ---------------- #
+    async def _probe(self, client: httpx.AsyncClient, url: str, model: str) -> None:
+        try:
+            response = await client.get(f"{url.rstrip('/')}/api/tags", timeout=self.probe_timeout)
+            response.raise_for_status()
+            names = {tag.get("name") for tag in response.json().get("models", [])}
+            healthy = True
+            if model not in names and f"{model}:latest" not in names:
+                logger.warning(f"Ollama at {url} is up but has no {model} pulled")
+                healthy = False
+        except Exception as e:
+            logger.warning(f"Ollama health probe failed for {url}: {e}")
+            healthy = False
+
+        with self._lock:
+            if self._healthy.get(url) != healthy:
+                logger.info(f"Ollama at {url} is now {'healthy' if healthy else 'unhealthy'}")
+            self._healthy[url] = healthy
+            self._last_probe[url] = time.time()
+
+    async def probe_all(self, client: httpx.AsyncClient) -> None:
+        await asyncio.gather(*(self._probe(client, url, model) for url, model in self.instances))
+
+    async def _warm_up(self, client: httpx.AsyncClient, url: str, model: str) -> None:
+        """An empty prompt makes Ollama load the model; keep_alive keeps it resident"""
+        start = time.perf_counter()
+        try:
+            response = await client.post(
+                f"{url.rstrip('/')}/api/generate",
+                json={"model": model, "prompt": "", "keep_alive": self.keep_alive},
+                timeout=self.warmup_timeout
+            )
+            response.raise_for_status()
+            self._warmed[url] = True
+            logger.info(f"Loaded {model} on {url} in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            self._warmed[url] = False
+            logger.warning(f"Ollama warm-up failed for {model} on {url}: {e}")
+
+    async def _run(self, warm_up: bool) -> None:
+        async with httpx.AsyncClient() as client:
+            await self.probe_all(client)
+            if warm_up:
+                await asyncio.gather(*(
+                    self._warm_up(client, url, model)
+                    for url, model in self.instances if self._healthy.get(url)
+                ))
+            while True:
+                await asyncio.sleep(self.probe_interval)
+                await self.probe_all(client)
+
+    def start(self, warm_up: bool = True) -> None:
+        """Start warm-up and periodic probing in the background (needs a running loop)"""
+        if self._task is None and self.instances:
+            self._task = asyncio.create_task(self._run(warm_up))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                url: {
+                    "model": model,
+                    "healthy": self._healthy.get(url, True),
+                    "outstanding": self._outstanding.get(url, 0),
+                    "warmed": self._warmed.get(url),
+                    "last_probe": self._last_probe.get(url),
+                }
+                for url, model in self.instances
+            }
@@ -0,0 +1,71 @@
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class ProviderHealth:
+    """
+    Rolling health of one (provider, model, key) chain entry.
+
+    Keeps an EWMA of call latency, an EWMA of the success rate and the time of
+    the last rate-limit error, and turns them into an expected time to a valid
+    answer used to order the fallback chain.
+    """
+
+    def __init__(self, alpha: float = 0.3, clock: Callable[[], float] = time.monotonic):
+        self.alpha = alpha
+        self._clock = clock
+
+        self.ewma_latency: Optional[float] = None
+        self.success_rate = 1.0  # optimistic prior so new entries get tried
+        self.samples = 0
+        self.last_rate_limit_at: Optional[float] = None
+
+    def _observe_latency(self, latency: Optional[float]) -> None:
+        if latency is None:
+            return
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+
+    def record_success(self, latency: Optional[float]) -> None:
+        self.samples += 1
+        self._observe_latency(latency)
+        self.success_rate = self.alpha + (1 - self.alpha) * self.success_rate
+
+    def record_failure(self, latency: Optional[float], rate_limited: bool = False) -> None:
+        self.samples += 1
+        # Fast failures (e.g. an instant 429) say nothing about answer latency
+        if not rate_limited:
+            self._observe_latency(latency)
+        self.success_rate = (1 - self.alpha) * self.success_rate
+        if rate_limited:
+            self.last_rate_limit_at = self._clock()
+
+    def seconds_since_rate_limit(self) -> Optional[float]:
+        if self.last_rate_limit_at is None:
+            return None
+        return self._clock() - self.last_rate_limit_at
+
+    def expected_seconds(self, prior_latency: float, rate_limit_penalty: float,
+                         rate_limit_window: float) -> float:
+        """
+        Expected time to a valid answer: latency / success probability, plus a
+        penalty for a recent 429 that decays linearly over the window.
+        """
+        latency = self.ewma_latency if self.ewma_latency is not None else prior_latency
+        expected = latency / max(self.success_rate, 0.05)
+
+        since_429 = self.seconds_since_rate_limit()
+        if since_429 is not None and since_429 < rate_limit_window:
+            expected += rate_limit_penalty * (1 - since_429 / rate_limit_window)
+        return expected
+
+    def snapshot(self) -> Dict[str, Any]:
+        since_429 = self.seconds_since_rate_limit()
+        return {
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "success_rate": round(self.success_rate, 3),
+            "samples": self.samples,
+            "seconds_since_rate_limit": round(since_429, 1) if since_429 is not None else None,
+        }
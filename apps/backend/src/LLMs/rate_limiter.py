@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Classic token bucket: holds up to `capacity` tokens, refilled continuously."""
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._clock = clock
+        self.tokens = float(capacity)
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.refill_per_second)
+        self._updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (requests above capacity wait for a full bucket)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.refill_per_second
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class KeyRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets for every API key.
+
+    Limits are configured per provider (settings.LLM_RATE_LIMITS, e.g.
+    {"gemini": {"rpm": 15, "tpm": 1000000}}) and applied to each key of that
+    provider separately. One limiter lives on the shared LLMProviderManager, so
+    every coroutine in the worker draws from the same buckets.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, float]], clock: Callable[[], float] = time.monotonic):
+        self.limits = limits or {}
+        self._clock = clock
+        self._buckets: Dict[str, Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._lock = threading.Lock()
+        self.rejections: Dict[str, int] = {}
+
+    def _get_buckets(self, bucket_id: str, provider: str) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        buckets = self._buckets.get(bucket_id)
+        if buckets is None:
+            limits = self.limits.get(provider, {})
+            rpm = limits.get("rpm")
+            tpm = limits.get("tpm")
+            buckets = (
+                TokenBucket(rpm, rpm / 60.0, self._clock) if rpm else None,
+                TokenBucket(tpm, tpm / 60.0, self._clock) if tpm else None,
+            )
+            self._buckets[bucket_id] = buckets
+        return buckets
+
+    def _wait_time(self, buckets, tokens: float) -> float:
+        request_bucket, token_bucket = buckets
+        wait = 0.0
+        if request_bucket is not None:
+            wait = max(wait, request_bucket.wait_time(1))
+        if token_bucket is not None:
+            wait = max(wait, token_bucket.wait_time(tokens))
+        return wait
+
+    def try_acquire(self, bucket_id: str, provider: str, tokens: float) -> float:
+        """Take one request + `tokens` if available now; otherwise return the seconds to wait"""
+        with self._lock:
+            buckets = self._get_buckets(bucket_id, provider)
+            wait = self._wait_time(buckets, tokens)
+            if wait == 0:
+                request_bucket, token_bucket = buckets
+                if request_bucket is not None:
+                    request_bucket.consume(1)
+                if token_bucket is not None:
+                    token_bucket.consume(tokens)
+            return wait
+
+    async def acquire(self, bucket_id: str, provider: str, tokens: float, max_wait: float) -> bool:
+        """Wait up to `max_wait` seconds for capacity; False means route elsewhere"""
+        if provider not in self.limits:
+            return True
+        deadline = self._clock() + max_wait
+        while True:
+            wait = self.try_acquire(bucket_id, provider, tokens)
+            if wait == 0:
+                return True
+            if self._clock() + wait > deadline:
+                with self._lock:
+                    self.rejections[provider] = self.rejections.get(provider, 0) + 1
+                return False
+            await asyncio.sleep(wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = {}
+            for bucket_id, (request_bucket, token_bucket) in self._buckets.items():
+                buckets[bucket_id] = {
+                    "requests_available": round(request_bucket.available(), 2) if request_bucket else None,
+                    "tokens_available": round(token_bucket.available()) if token_bucket else None,
+                }
+            return {"limits": self.limits, "buckets": buckets, "rejections": dict(self.rejections)}
@@ -0,0 +1,126 @@
+import os
+import json
+import random
+import asyncio
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "standin_responses.json")
+
+
+class StandInMessage:
+    """Minimal stand-in for a LangChain AIMessage/AIMessageChunk"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class StandInError(Exception):
+    """Error shaped like a provider SDK error so the manager classifies it the same way"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)} if retry_after else {}})()
+
+
+def load_fixtures(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    with open(path or FIXTURES_PATH, encoding="utf-8") as f:
+        return json.load(f)["responses"]
+
+
+class StandInLLM:
+    """
+    Offline replacement for a chat model, for load tests without provider quota.
+
+    Replays recorded responses (the first fixture whose "match" string occurs
+    in the prompt) after a sampled latency, and injects failures at the
+    configured rates:
+
+      latency: {"distribution": "fixed", "seconds": 2}
+               {"distribution": "uniform", "min": 1, "max": 5}
+               {"distribution": "lognormal", "median": 8, "sigma": 0.5}
+      error_rates: {"rate_limit": 0.05, "auth": 0.0, "model_not_found": 0.0, "timeout": 0.01}
+      malformed_rate: share of answers with broken JSON (repairable or truncated)
+
+    An injected timeout hangs for `hang_seconds` (the manager's per-attempt
+    timeout normally cuts it short) and then raises asyncio.TimeoutError.
+
+    Draws come from a Random seeded with `seed` and the model name, so a run
+    with the same settings replays the same sequence per instance.
+    """
+
+    def __init__(self, model: str, fixtures: List[Dict[str, Any]], latency: Dict[str, Any],
+                 error_rates: Dict[str, float], malformed_rate: float = 0.0,
+                 hang_seconds: float = 600, seed: Optional[int] = None, chunks: int = 20):
+        self.model = model
+        self.fixtures = fixtures
+        self.latency = latency or {"distribution": "fixed", "seconds": 0}
+        self.error_rates = error_rates or {}
+        self.malformed_rate = malformed_rate
+        self.hang_seconds = hang_seconds
+        self.chunks = chunks
+        self._random = random.Random(None if seed is None else seed + zlib.crc32(model.encode()))
+
+    def _sample_latency(self) -> float:
+        spec = self.latency
+        distribution = spec.get("distribution", "fixed")
+        if distribution == "uniform":
+            return self._random.uniform(spec.get("min", 0), spec.get("max", 0))
+        if distribution == "lognormal":
+            return self._random.lognormvariate(0, spec.get("sigma", 0.5)) * spec.get("median", 1)
+        return float(spec.get("seconds", 0))
+
+    def _pick_error(self) -> Optional[str]:
+        roll = self._random.random()
+        for kind in ("rate_limit", "auth", "model_not_found", "timeout"):
+            rate = self.error_rates.get(kind, 0)
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+    def _raise(self, kind: str):
+        if kind == "rate_limit":
+            raise StandInError(f"429 Resource exhausted for {self.model}. Please retry in 5s.", 429, retry_after=5)
+        if kind == "auth":
+            raise StandInError(f"401 Unauthorized: invalid API key for {self.model}", 401)
+        raise StandInError(f"404 Model {self.model} not found", 404)
+
+    def _answer(self, prompt: str) -> str:
+        fixture = next((f for f in self.fixtures if f.get("match", "") in prompt), self.fixtures[0])
+        text = json.dumps(fixture["content"], indent=2, ensure_ascii=False)
+        if self._random.random() < self.malformed_rate:
+            if self._random.random() < 0.5:
+                # Cut off mid-answer, like a max-token stop
+                return text[: int(len(text) * self._random.uniform(0.5, 0.95))]
+            # Repairable: fenced with a trailing comma
+            return "```json\n" + text.replace('"diagram": null\n', '"diagram": null,\n', 1) + "\n```"
+        return text
+
+    async def _prepare(self, prompt: str) -> Tuple[str, float]:
+        """Draw the outcome for one call: raises injected errors, else (answer, latency)"""
+        error = self._pick_error()
+        latency = self._sample_latency()
+        if error == "timeout":
+            await asyncio.sleep(self.hang_seconds)
+            raise asyncio.TimeoutError(f"Read timed out waiting for {self.model}")
+        if error is not None:
+            # Providers reject quickly; don't pay the full answer latency
+            await asyncio.sleep(min(latency, 0.2))
+            self._raise(error)
+        return self._answer(prompt), latency
+
+    async def ainvoke(self, prompt: str, **kwargs) -> StandInMessage:
+        text, latency = await self._prepare(prompt)
+        await asyncio.sleep(latency)
+        return StandInMessage(text)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[StandInMessage]:
+        text, latency = await self._prepare(prompt)
+        # First token after ~20% of the latency, the rest spread over the chunks
+        await asyncio.sleep(latency * 0.2)
+        step = max(1, len(text) // self.chunks)
+        for i in range(0, len(text), step):
+            yield StandInMessage(text[i:i + step])
+            await asyncio.sleep(latency * 0.8 / self.chunks)
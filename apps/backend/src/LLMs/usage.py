@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_usage_tags: ContextVar[Dict[str, Any]] = ContextVar("llm_usage_tags", default={})
+
+
+@contextmanager
+def usage_tags(**tags) -> Iterator[None]:
+    """Tag every LLM call made inside the block (user_id, subject, section, attempt)"""
+    token = _usage_tags.set({**_usage_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _usage_tags.reset(token)
+
+
+def current_usage_tags() -> Dict[str, Any]:
+    return dict(_usage_tags.get())
+
+
+def extract_token_usage(result: Any) -> Optional[Tuple[int, int]]:
+    """
+    (prompt_tokens, completion_tokens) reported by the provider, or None.
+
+    Reads LangChain's normalised `usage_metadata` first, then the raw
+    OpenAI-style `token_usage` / Gemini-style `usage_metadata` in
+    `response_metadata`.
+    """
+    usage = getattr(result, "usage_metadata", None)
+    if isinstance(usage, dict) and usage.get("input_tokens") is not None:
+        return int(usage.get("input_tokens") or 0), int(usage.get("output_tokens") or 0)
+
+    metadata = getattr(result, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or metadata.get("usage")
+    if isinstance(token_usage, dict) and token_usage.get("prompt_tokens") is not None:
+        return int(token_usage.get("prompt_tokens") or 0), int(token_usage.get("completion_tokens") or 0)
+
+    gemini_usage = metadata.get("usage_metadata")
+    if isinstance(gemini_usage, dict) and gemini_usage.get("prompt_token_count") is not None:
+        return (int(gemini_usage.get("prompt_token_count") or 0),
+                int(gemini_usage.get("candidates_token_count") or 0))
+    return None
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token, the same rule of thumb the rate limiter uses"""
+    return max(1, len(text or "") // 4)
+
+
+def token_cost(prices: Dict[str, Dict[str, float]], provider: str, model: str,
+               prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost from per-million-token prices keyed by "provider:model" or provider"""
+    price = prices.get(f"{provider}:{model}") or prices.get(provider) or {}
+    return (prompt_tokens * price.get("input", 0.0) + completion_tokens * price.get("output", 0.0)) / 1_000_000
+
+
+class UsageRecorder:
+    """
+    Buffers one usage row per LLM call and hands them to `writer` in batches.
+
+    `writer` is a blocking callable (a DB insert) and runs in a worker thread,
+    either when the buffer reaches `batch_size` or every `flush_interval`
+    seconds from the background task started with `start()`.
+    """
+
+    def __init__(self, writer: Callable[[List[Dict[str, Any]]], None], batch_size: int = 50,
+                 flush_interval: float = 10.0, max_buffer: int = 10000):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, **row) -> None:
+        row = {**current_usage_tags(), **row, "created_at": datetime.now(timezone.utc)}
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                # The writer is failing; keep memory bounded rather than the rows
+                self._buffer.pop(0)
+                self.dropped += 1
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.flush())
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self.writer, batch)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} LLM usage rows: {e}")
+            with self._lock:
+                self._buffer = batch + self._buffer
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        # Let size-triggered flushes that already took their batch finish first
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"buffered": len(self._buffer), "written": self.written, "dropped": self.dropped}
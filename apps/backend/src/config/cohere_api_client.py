@@ -3,8 +3,10 @@ import cohere
 import numpy as np
 import time
 import logging
+import threading
 from typing import List, Union, Optional
 from .config import settings
+from ..utils.metrics import EMBEDDING_FALLBACKS
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +39,8 @@ class CohereEmbeddingClient:
         
         # Fallback: random embeddings when all else fails
         self.fallback_enabled = True
+        # Whether this thread's last encode() returned fallback embeddings
+        self._local = threading.local()
         
         logger.info(f"🔑 Initialized with {len(self.api_keys)} API key(s)")
     
@@ -109,6 +113,7 @@ class CohereEmbeddingClient:
         """
         is_single_text = isinstance(texts, str)
         text_list = [texts] if is_single_text else texts
+        self._local.used_fallback = False
         
         # Handle empty input
         if not text_list or all(not t.strip() for t in text_list):
@@ -225,6 +230,8 @@ class CohereEmbeddingClient:
         
         # If we reach here, all keys failed - use fallback
         if self.fallback_enabled:
+            EMBEDDING_FALLBACKS.inc(len(text_list))
+            self._local.used_fallback = True
             embeddings = self._generate_fallback_embeddings(text_list)
             
             if is_single_text:
@@ -237,6 +244,10 @@ class CohereEmbeddingClient:
                 f"Last error: {str(last_error)}"
             )
     
+    def used_fallback(self) -> bool:
+        """True if the last encode() on this thread fell back to hash embeddings"""
+        return getattr(self._local, "used_fallback", False)
+    
     async def encode_async(
         self, 
         texts: Union[str, List[str]], 
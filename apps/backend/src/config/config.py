@@ -1,5 +1,5 @@
 import json
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -38,10 +38,30 @@ class Settings(BaseSettings):
     LLM_PROVIDER: str
     OLLAMA_URL: str
     OLLAMA_MODEL: str
+    OLLAMA_KEEP_ALIVE: str = "30m"
+    OLLAMA_WARMUP: bool = True
+    OLLAMA_PROBE_INTERVAL_SECONDS: float = 30
+    OLLAMA_PROBE_TIMEOUT_SECONDS: float = 3
 
     VECTOR_MODEL: str
     COHERE_API_KEY : Optional[str] = None
 
+    # Query embedding cache for retrieval (empty SQLite path = memory only)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 128
+    EMBEDDING_CACHE_SQLITE_PATH: Optional[str] = None
+    EMBEDDING_CACHE_TTL_SECONDS: Optional[float] = 604800
+
+    # ANN index on retrieval_subparts.embedding ("hnsw", "ivfflat" or "none") and per-query tuning
+    VECTOR_INDEX_TYPE: str = "hnsw"
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 64
+    VECTOR_HNSW_EF_SEARCH: int = 100
+    VECTOR_IVFFLAT_LISTS: int = 100
+    VECTOR_IVFFLAT_PROBES: int = 10
+    # pgvector >= 0.8 iterative index scans: "relaxed_order", "strict_order" or "off"
+    VECTOR_ITERATIVE_SCAN: str = "relaxed_order"
+
     # Gemini
     GEMINI_KEYS: Optional[List[str]] = None
 
@@ -59,6 +79,105 @@ class Settings(BaseSettings):
     # Paid model toggle
     ALLOW_PAID_MODELS: bool = False
 
+    # LLM circuit breaker (cooldowns in seconds)
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 3
+    LLM_BREAKER_DEFAULT_COOLDOWN: float = 30
+    LLM_BREAKER_RATE_LIMIT_COOLDOWN: float = 60
+    LLM_BREAKER_AUTH_COOLDOWN: float = 1800
+    LLM_BREAKER_MODEL_NOT_FOUND_COOLDOWN: float = 3600
+    LLM_BREAKER_MAX_COOLDOWN: float = 3600
+
+    # LLM request hedging (opt-in); delay defaults to p95 of recent latency
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_DELAY_SECONDS: Optional[float] = None
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 15
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 2
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_MAX_PARALLEL: int = 2
+    LLM_HEDGE_MAX_EXTRA_REQUESTS: int = 1
+    LLM_HEDGE_BUDGET_RATIO: float = 0.2
+    LLM_HEDGE_BUDGET_BURST: int = 5
+
+    # Adaptive chain ordering by expected time to a valid answer
+    LLM_ADAPTIVE_ORDERING: bool = True
+    LLM_ADAPTIVE_EWMA_ALPHA: float = 0.3
+    LLM_ADAPTIVE_PRIOR_LATENCY_SECONDS: float = 10
+    LLM_ADAPTIVE_RATE_LIMIT_PENALTY_SECONDS: float = 60
+    LLM_ADAPTIVE_RATE_LIMIT_WINDOW_SECONDS: float = 300
+    LLM_ADAPTIVE_SCORE_RESOLUTION: float = 2
+
+    # Per-key rate limits by provider ({"provider": {"rpm": .., "tpm": ..}})
+    LLM_RATE_LIMITS: Dict[str, Dict[str, float]] = {
+        "gemini": {"rpm": 15, "tpm": 1000000},
+        "openrouter": {"rpm": 20},
+        "huggingface": {"rpm": 30},
+    }
+    LLM_RATE_LIMIT_MAX_WAIT_SECONDS: float = 2
+    LLM_RATE_LIMIT_OUTPUT_TOKEN_ESTIMATE: int = 2048
+
+    # In-flight call caps by provider ({"provider": {"provider": .., "key": ..}})
+    LLM_CONCURRENCY_LIMITS: Dict[str, Dict[str, int]] = {
+        "gemini": {"provider": 8, "key": 2},
+        "openrouter": {"provider": 6, "key": 2},
+        "huggingface": {"key": 2},
+        "ollama": {"key": 1},
+    }
+    LLM_CONCURRENCY_MAX_WAIT_SECONDS: float = 5
+
+    # safe_generate response cache (memory LRU + optional SQLite file)
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_MEMORY_ENTRIES: int = 256
+    LLM_CACHE_SQLITE_PATH: Optional[str] = ".cache/llm_responses.sqlite3"
+    LLM_CACHE_MAX_DISK_ENTRIES: int = 5000
+    LLM_CACHE_TTL_SECONDS: float = 86400
+
+    # Provider-native JSON / schema-constrained output for section generation
+    LLM_STRUCTURED_OUTPUT: bool = False
+
+    # Section generation: "section" (one call per section) or "question" (one concurrent call per question)
+    LLM_SECTION_GENERATION_MODE: str = "section"
+
+    # LLM time budgets
+    LLM_REQUEST_BUDGET_SECONDS: float = 240
+    LLM_ATTEMPT_TIMEOUT_SECONDS: float = 90
+    LLM_MIN_ATTEMPT_SECONDS: float = 5
+
+    # Batch generation (several variants from one retrieval)
+    LLM_BATCH_MAX_VARIANTS: int = 20
+    LLM_BATCH_CONCURRENCY: int = 3
+
+    # Background generation jobs ("db": generation_jobs table, shared by all
+    # workers; "memory": per process, single-worker deployments only)
+    LLM_JOB_BACKEND: str = "db"
+    LLM_JOB_WORKERS: int = 2
+    LLM_JOB_POLL_SECONDS: float = 1.0
+    LLM_JOB_LEASE_SECONDS: float = 60
+    LLM_JOB_MAX_ATTEMPTS: int = 2
+
+    # Save generated papers (deduplicated by content hash) to each user's history
+    LLM_PERSIST_GENERATED_PAPERS: bool = True
+
+    # Pre-generated paper pool served by /llm/gen-question-paper before live generation
+    # (targets: [{"board": "ICSE", "subject": "physics", "paper": "Physics", "code": "PHY"}])
+    LLM_POOL_TARGETS: List[Dict[str, Any]] = []
+    LLM_POOL_SIZE: int = 5
+    LLM_POOL_REFILL_HOURS: List[int] = [18, 19, 20, 21, 22, 23]
+    LLM_POOL_REFILL_INTERVAL_SECONDS: float = 60
+
+    # LLM token/cost accounting (prices in USD per million tokens)
+    LLM_USAGE_TRACKING: bool = True
+    LLM_USAGE_BATCH_SIZE: int = 50
+    LLM_USAGE_FLUSH_SECONDS: float = 10
+    LLM_TOKEN_PRICES: Dict[str, Dict[str, float]] = {}
+
+    # Offline stand-in provider (LLM_PROVIDER=standin, load tests only)
+    LLM_STANDIN_MODELS: List[str] = ["standin-1", "standin-2"]
+    LLM_STANDIN_FIXTURES_PATH: Optional[str] = None
+    LLM_STANDIN_LATENCY: Dict[str, Any] = {"distribution": "lognormal", "median": 8, "sigma": 0.5}
+    LLM_STANDIN_ERROR_RATES: Dict[str, float] = {}
+    LLM_STANDIN_MALFORMED_RATE: float = 0.0
+    LLM_STANDIN_SEED: Optional[int] = None
+
     PORT: int = 8000  
 
     @classmethod
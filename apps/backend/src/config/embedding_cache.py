@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from .config import settings
+from .cohere_api_client import CohereEmbeddingClient
+from ..utils.tiered_cache import TieredCache
+from ..utils.metrics import EMBEDDING_CACHE_LOOKUPS
+
+# Cache entry recording which embedding model the persistent tier was filled with
+_MODEL_MARKER = "__embedding_model__"
+
+
+def embedding_model_id(model) -> str:
+    """Identity of the model behind a query vector; part of every cache key"""
+    if isinstance(model, CohereEmbeddingClient):
+        return f"cohere:{model.model}:{model.embedding_dim}"
+    return f"local:{settings.VECTOR_MODEL}"
+
+
+def normalize_query(text: str) -> str:
+    # "Physics  exam questions" and "physics exam questions" share one entry
+    return " ".join(text.split()).casefold()
+
+
+class QueryEmbeddingCache:
+    """
+    Memoized query embeddings keyed by (embedding model, input_type,
+    normalized text), in a TieredCache (memory LRU, optional SQLite tier).
+
+    Retrieval queries come from a handful of subjects, so after warm-up the
+    embedding call disappears from generation requests. Vectors from another
+    model never match because the model is part of the key; the first lookup
+    for a model that differs from the one recorded in the persistent tier
+    also clears that tier so stale vectors don't linger on disk.
+    """
+
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+        self._checked_models = set()
+        self._lock = threading.Lock()
+
+    def _check_model(self, model_id: str) -> None:
+        with self._lock:
+            if model_id in self._checked_models:
+                return
+            if self.cache.get(_MODEL_MARKER) != model_id:
+                self.cache.clear()
+                self.cache.set(_MODEL_MARKER, model_id)
+            self._checked_models.add(model_id)
+
+    @staticmethod
+    def _key(model_id: str, input_type: str, text: str) -> str:
+        raw = "\x1f".join((model_id, input_type, normalize_query(text)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_or_embed(self, model_id: str, input_type: str, text: str,
+                     embed: Callable[[], Tuple[List[float], bool]]) -> List[float]:
+        """
+        Cached vector, or the one `embed()` returns with whether it may be cached
+        (False for stand-in vectors, e.g. Cohere's hash fallback)
+        """
+        self._check_model(model_id)
+        key = self._key(model_id, input_type, text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            EMBEDDING_CACHE_LOOKUPS.labels("hit").inc()
+            return cached
+        EMBEDDING_CACHE_LOOKUPS.labels("miss").inc()
+        embedding, cacheable = embed()
+        if cacheable:
+            self.cache.set(key, embedding)
+        return embedding
+
+
+_query_cache: Optional[QueryEmbeddingCache] = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> Optional[QueryEmbeddingCache]:
+    global _query_cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryEmbeddingCache(TieredCache(
+                namespace="query_embeddings",
+                max_memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+                sqlite_path=settings.EMBEDDING_CACHE_SQLITE_PATH or None,
+                ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS
+            ))
+    return _query_cache
@@ -10,6 +10,14 @@ class Subject(str, Enum):
     BIOLOGY = "biology"
     MATHEMATICS = "mathematics"
 
+def normalize_subject(subject: str) -> str:
+    """The Subject value a subject string names ("ICSE Physics" -> "physics"), else the string lower-cased"""
+    lowered = subject.strip().lower()
+    for value in Subject:
+        if value.value in lowered:
+            return value.value
+    return lowered
+
 class Diagram(BaseModel):
     type: str
     description: str
@@ -125,3 +133,17 @@ class ExamPaper(BaseModel):
 
     class Config:
         from_attributes = True
+
+class GeneratedPaperSummary(BaseModel):
+    id: UUID
+    exam_id: UUID
+    subject: Subject
+    board: str
+    paper_name: str
+    paper_code: str
+    year: int
+    maximum_marks: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+from uuid import UUID
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# queued -> running -> succeeded | failed; a running job whose lease runs out
+# goes back to queued (or to failed after LLM_JOB_MAX_ATTEMPTS)
+JOB_STATUSES = ["queued", "running", "succeeded", "failed"]
+
+
+class GenerationJobCreate(BaseModel):
+    user_id: UUID
+    subject: str
+    board: str
+    paper: str
+    code: str
+    year: int
+
+
+class GenerationJob(BaseModel):
+    id: UUID
+    user_id: UUID
+    subject: str
+    board: str
+    paper: str
+    code: str
+    year: int
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    worker_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class GenerationJobResult(BaseModel):
+    id: UUID
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
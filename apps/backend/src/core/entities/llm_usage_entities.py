@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from uuid import UUID
+from datetime import datetime
+from typing import Optional
+
+
+class LLMUsageCreate(BaseModel):
+    user_id: Optional[UUID] = None
+    subject: Optional[str] = None
+    section: Optional[str] = None
+    attempt: Optional[int] = None
+    provider: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    estimated: bool = False
+    cost_usd: float = 0.0
+    latency_seconds: Optional[float] = None
+    created_at: Optional[datetime] = None
+
+
+class LLMUsageSummary(BaseModel):
+    group: dict
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    estimated_calls: int
+    cost_usd: float
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Optional, Tuple
+
+
+def pool_key(board: str, subject: str, code: str) -> Tuple[str, str, str]:
+    # "ICSE"/"Physics"/"PHY" from a request finds papers pooled as "icse"/"physics"/"phy"
+    return (board.strip().lower(), subject.strip().lower(), code.strip().lower())
+
+
+class PaperPoolTarget(BaseModel):
+    """One (board, subject, paper code) the pool keeps stocked"""
+    board: str = "ICSE"
+    subject: str
+    paper: str
+    code: str
+    # None: the current year when the paper is generated
+    year: Optional[int] = None
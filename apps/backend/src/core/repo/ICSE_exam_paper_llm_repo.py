@@ -3,5 +3,23 @@ from abc import ABC, abstractmethod
 
 class LLMRepo(ABC):
     @abstractmethod
-    async def gen_new_exam_paper(self,llm , query_embedding,subject:str,board:str,paper:str,code:str,year:int):
-        ...
\ No newline at end of file
+    async def gen_new_exam_paper(self,llm , query_embedding,subject:str,board:str,paper:str,code:str,year:int,deadline=None):
+        ...
+
+    @abstractmethod
+    async def get_section_contexts(self, subject: str):
+        ...
+
+    @abstractmethod
+    def stream_new_exam_paper(self, subject: str, board: str, paper: str, code: str, year: int, section_contexts=None,
+                              deadline=None):
+        ...
+
+    @abstractmethod
+    async def get_context_pool(self, subject: str):
+        ...
+
+    @abstractmethod
+    def stream_batch_exam_papers(self, subject: str, board: str, paper: str, code: str, year: int, variants: int,
+                                 context_pool=None, seed=None, concurrency: int = 3, variant_budget=None):
+        ...
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from ..entities.exam_paper_entities import ExamPaperCreate, ExamPaper
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from ..entities.exam_paper_entities import ExamPaperCreate, ExamPaper, GeneratedPaperSummary
 
 class ExamPaperRepo(ABC):
     @abstractmethod
@@ -24,4 +26,16 @@ class ExamPaperRepo(ABC):
 
     @abstractmethod
     async def get_prev_year_exam_paper(self, subject: str, year: int) -> ExamPaper:
-        ...
\ No newline at end of file
+        ...
+
+    @abstractmethod
+    def save_generated_papers(self, user_id: UUID, papers: List[Dict[str, Any]]) -> List[UUID]:
+        ...
+
+    @abstractmethod
+    async def get_generated_papers(self, user_id: UUID, skip: int, limit: int) -> Tuple[int, List[GeneratedPaperSummary]]:
+        ...
+
+    @abstractmethod
+    async def get_generated_paper(self, user_id: UUID, generated_paper_id: UUID) -> Optional[ExamPaper]:
+        ...
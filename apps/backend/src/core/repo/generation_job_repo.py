@@ -0,0 +1,36 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from ...core.entities.generation_job_entities import GenerationJob, GenerationJobCreate, GenerationJobResult
+
+class GenerationJobRepo(ABC):
+    @abstractmethod
+    async def enqueue(self, job: GenerationJobCreate) -> GenerationJob:
+        ...
+    @abstractmethod
+    async def get_job(self, job_id: UUID) -> Optional[GenerationJob]:
+        ...
+    @abstractmethod
+    async def get_result(self, job_id: UUID) -> Optional[GenerationJobResult]:
+        ...
+    @abstractmethod
+    async def claim_next(self, worker_id: str, lease_seconds: float) -> Optional[GenerationJob]:
+        """Oldest queued job, marked running for this worker until the lease runs out"""
+        ...
+    @abstractmethod
+    async def extend_leases(self, job_ids: List[UUID], worker_id: str, lease_seconds: float) -> None:
+        ...
+    @abstractmethod
+    async def complete(self, job_id: UUID, worker_id: str, result: Dict[str, Any]) -> None:
+        ...
+    @abstractmethod
+    async def fail(self, job_id: UUID, worker_id: str, error: str) -> None:
+        ...
+    @abstractmethod
+    async def release(self, job_id: UUID, worker_id: str) -> None:
+        """Give a running job back to the queue (worker shutting down)"""
+        ...
+    @abstractmethod
+    async def requeue_expired(self, max_attempts: int) -> int:
+        """Running jobs whose lease ran out go back to the queue, or fail after max_attempts"""
+        ...
@@ -0,0 +1,13 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+from ...core.entities.llm_usage_entities import LLMUsageCreate, LLMUsageSummary
+
+class LLMUsageRepo(ABC):
+    @abstractmethod
+    def add_usage_batch(self, records: List[LLMUsageCreate]) -> int:
+        ...
+    @abstractmethod
+    async def get_usage_summary(self, group_by: List[str], since: Optional[datetime] = None,
+                                until: Optional[datetime] = None) -> List[LLMUsageSummary]:
+        ...
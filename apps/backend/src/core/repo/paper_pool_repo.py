@@ -0,0 +1,16 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+class PaperPoolRepo(ABC):
+    @abstractmethod
+    async def stock(self) -> Dict[Tuple[str, str, str], int]:
+        """Unclaimed papers per normalized (board, subject, paper code)"""
+        ...
+    @abstractmethod
+    async def add(self, board: str, subject: str, code: str, paper: Dict[str, Any]) -> None:
+        ...
+    @abstractmethod
+    async def claim(self, board: str, subject: str, code: str, user_id: UUID) -> Optional[Dict[str, Any]]:
+        """Oldest unclaimed paper for the key, marked as handed out to the user"""
+        ...
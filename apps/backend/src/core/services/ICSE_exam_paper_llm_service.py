@@ -1,6 +1,9 @@
+from typing import AsyncIterator, Dict, Optional
 from fastapi import HTTPException
 from ..repo.ICSE_exam_paper_llm_repo import LLMRepo
 from ..repo.exam_paper_repo import ExamPaperRepo
+from ...utils.deadline import Deadline
+from ...utils.exceptions import GatewayTimeoutException
 
 class LLMService:
     def __init__(self, subject: str, llm_repo: LLMRepo, exam_paper_repo: ExamPaperRepo):
@@ -8,15 +11,65 @@ class LLMService:
         self.llm_repo = llm_repo
         self.exam_paper_repo = exam_paper_repo
 
-    async def gen_question_paper(self, subject:str, board:str, paper:str, code:str, year:int):
+    async def gen_question_paper(self, subject:str, board:str, paper:str, code:str, year:int,
+                                 deadline: Deadline = None):
         try:
             exam_paper_create = await self.llm_repo.gen_new_exam_paper(
                 subject=subject,
                 board=board,
                 paper=paper,
                 code=code,
-                year=year
+                year=year,
+                deadline=deadline
             )
             return exam_paper_create
+        except GatewayTimeoutException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Invalid Exam Paper JSON: {e}")
+
+    async def get_section_contexts(self, subject: str):
+        return await self.llm_repo.get_section_contexts(subject=subject)
+
+    async def stream_question_paper(self, subject:str, board:str, paper:str, code:str, year:int,
+                                    section_contexts=None, deadline: Deadline = None) -> AsyncIterator[Dict]:
+        try:
+            async for event in self.llm_repo.stream_new_exam_paper(
+                subject=subject,
+                board=board,
+                paper=paper,
+                code=code,
+                year=year,
+                section_contexts=section_contexts,
+                deadline=deadline
+            ):
+                yield event
+        except Exception as e:
+            # Headers are already sent, so failures travel as a final event
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield {"event": "error", "detail": f"Invalid Exam Paper JSON: {detail}"}
+
+    async def get_context_pool(self, subject: str):
+        return await self.llm_repo.get_context_pool(subject=subject)
+
+    async def stream_batch_question_papers(self, subject:str, board:str, paper:str, code:str, year:int,
+                                           variants: int, context_pool=None, seed: Optional[int] = None,
+                                           concurrency: int = 3, variant_budget: float = None) -> AsyncIterator[Dict]:
+        try:
+            async for event in self.llm_repo.stream_batch_exam_papers(
+                subject=subject,
+                board=board,
+                paper=paper,
+                code=code,
+                year=year,
+                variants=variants,
+                context_pool=context_pool,
+                seed=seed,
+                concurrency=concurrency,
+                variant_budget=variant_budget
+            ):
+                yield event
+        except Exception as e:
+            # Headers are already sent, so failures travel as a final event
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            yield {"event": "error", "detail": f"Batch generation failed: {detail}"}
@@ -1,5 +1,7 @@
+from typing import List, Optional, Tuple
+from uuid import UUID
 from ..repo.exam_paper_repo import ExamPaperRepo
-from ..entities.exam_paper_entities import ExamPaperCreate, ExamPaper
+from ..entities.exam_paper_entities import ExamPaperCreate, ExamPaper, GeneratedPaperSummary
 
 class ExamPaperService:
     def __init__(self, exam_paper_repo = ExamPaperRepo):
@@ -25,3 +27,9 @@ class ExamPaperService:
 
     async def get_prev_year_paper(self, subject: str, year: int) -> ExamPaper:
         return await self.exam_paper_repo.get_prev_year_exam_paper(subject=subject, year=year)
+
+    async def get_generated_papers(self, user_id: UUID, skip: int, limit: int) -> Tuple[int, List[GeneratedPaperSummary]]:
+        return await self.exam_paper_repo.get_generated_papers(user_id=user_id, skip=skip, limit=limit)
+
+    async def get_generated_paper(self, user_id: UUID, generated_paper_id: UUID) -> Optional[ExamPaper]:
+        return await self.exam_paper_repo.get_generated_paper(user_id=user_id, generated_paper_id=generated_paper_id)
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from uuid import UUID, uuid4
+from fastapi import HTTPException
+from ..repo.generation_job_repo import GenerationJobRepo
+from ..entities.generation_job_entities import GenerationJob, GenerationJobCreate
+from ...utils.metrics import GENERATION_JOBS, GENERATION_JOB_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJobService:
+    def __init__(self, job_repo: GenerationJobRepo):
+        self.job_repo = job_repo
+
+    async def enqueue(self, job: GenerationJobCreate) -> GenerationJob:
+        queued = await self.job_repo.enqueue(job)
+        GENERATION_JOBS.labels("enqueued").inc()
+        return queued
+
+    async def get_job(self, job_id: UUID, user_id: UUID, is_admin: bool = False) -> GenerationJob:
+        job = await self.job_repo.get_job(job_id)
+        # Other users' jobs look the same as missing ones
+        if job is None or (job.user_id != user_id and not is_admin):
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    async def get_result(self, job_id: UUID, user_id: UUID, is_admin: bool = False) -> Dict[str, Any]:
+        await self.get_job(job_id, user_id, is_admin)
+        job_result = await self.job_repo.get_result(job_id)
+        if job_result.status == "failed":
+            raise HTTPException(status_code=409, detail=f"Job failed: {job_result.error}")
+        if job_result.status != "succeeded":
+            raise HTTPException(status_code=409, detail=f"Job is {job_result.status}")
+        return job_result.result
+
+
+class GenerationWorkerPool:
+    """
+    Runs queued generation jobs on `workers` concurrent tasks in this process.
+
+    Workers claim jobs from the repo (in-memory, or generation_jobs with the
+    DB backend) under a lease that a maintenance task renews while the job
+    runs. When a process dies its leases run out and any live pool puts those
+    jobs back in the queue, up to `max_attempts` claims per job; on a clean
+    shutdown running jobs are handed back right away. `run_job` gets the job
+    and returns the JSON-ready result.
+    """
+
+    def __init__(self, job_repo: GenerationJobRepo,
+                 run_job: Callable[[GenerationJob], Awaitable[Dict[str, Any]]],
+                 workers: int = 2, poll_interval: float = 1.0, lease_seconds: float = 60.0,
+                 max_attempts: int = 2):
+        self.job_repo = job_repo
+        self.run_job = run_job
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self._running: Set[UUID] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._wake: Optional[asyncio.Event] = None
+
+    def notify(self) -> None:
+        """Wake an idle worker now instead of at its next poll (a job was enqueued here)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _idle(self) -> None:
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                job = await self.job_repo.claim_next(self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.warning(f"Claiming a generation job failed: {e}")
+                job = None
+            if job is None:
+                await self._idle()
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Recording the outcome failed; the lease runs out and the job is requeued
+                logger.warning(f"Finishing generation job {job.id} failed: {e}")
+
+    async def _run(self, job: GenerationJob) -> None:
+        self._running.add(job.id)
+        outcome = "failed"
+        try:
+            result = await self.run_job(job)
+            await self.job_repo.complete(job.id, self.worker_id, result)
+            outcome = "succeeded"
+        except asyncio.CancelledError:
+            # Shutting down: let another worker (or the next start) pick it up
+            outcome = None
+            try:
+                await asyncio.shield(self.job_repo.release(job.id, self.worker_id))
+            except Exception as e:
+                logger.warning(f"Releasing generation job {job.id} failed: {e}")
+            raise
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.warning(f"Generation job {job.id} failed: {detail}")
+            await self.job_repo.fail(job.id, self.worker_id, detail)
+        finally:
+            self._running.discard(job.id)
+            if outcome is not None:
+                GENERATION_JOBS.labels(outcome).inc()
+                if job.created_at is not None:
+                    created_at = job.created_at.replace(tzinfo=job.created_at.tzinfo or timezone.utc)
+                    GENERATION_JOB_SECONDS.labels(outcome).observe(
+                        (datetime.now(timezone.utc) - created_at).total_seconds()
+                    )
+
+    async def _requeue_expired(self) -> None:
+        try:
+            requeued = await self.job_repo.requeue_expired(self.max_attempts)
+        except Exception as e:
+            logger.warning(f"Requeueing expired generation jobs failed: {e}")
+            return
+        if requeued:
+            logger.info(f"Requeued {requeued} generation job(s) whose worker went away")
+            GENERATION_JOBS.labels("requeued").inc(requeued)
+            self.notify()
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.job_repo.extend_leases(list(self._running), self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.warning(f"Extending generation job leases failed: {e}")
+            await self._requeue_expired()
+
+    async def start(self) -> None:
+        """Requeue jobs left behind by dead workers, then start the workers (needs a running loop)"""
+        if self._tasks:
+            return
+        self._wake = asyncio.Event()
+        await self._requeue_expired()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
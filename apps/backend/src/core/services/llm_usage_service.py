@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException
+from ..repo.llm_usage_repo import LLMUsageRepo
+from ..entities.llm_usage_entities import LLMUsageSummary
+
+USAGE_GROUPS = ["user", "subject", "section", "attempt", "provider", "model", "day"]
+
+
+class LLMUsageService:
+    def __init__(self, usage_repo: LLMUsageRepo):
+        self.usage_repo = usage_repo
+
+    async def get_usage_summary(self, group_by: List[str], since: Optional[datetime] = None,
+                                until: Optional[datetime] = None) -> List[LLMUsageSummary]:
+        unknown = [name for name in group_by if name not in USAGE_GROUPS]
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown group_by {unknown}. Allowed: {', '.join(USAGE_GROUPS)}"
+            )
+        return await self.usage_repo.get_usage_summary(group_by=group_by, since=since, until=until)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
+from ..repo.paper_pool_repo import PaperPoolRepo
+from ..entities.paper_pool_entities import PaperPoolTarget, pool_key
+from ...utils.metrics import PAPER_POOL_REFILLS, PAPER_POOL_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class PaperPoolService:
+    def __init__(self, pool_repo: PaperPoolRepo):
+        self.pool_repo = pool_repo
+
+    async def claim(self, board: str, subject: str, paper: str, code: str, year: int,
+                    user_id: UUID) -> Optional[Dict[str, Any]]:
+        """
+        An unused pre-generated paper for the request, or None when the pool has
+        none (or can't be reached) and the caller should generate one live.
+        """
+        try:
+            exam_paper = await self.pool_repo.claim(board, subject, code, user_id)
+        except Exception as e:
+            logger.warning(f"Claiming a pooled paper failed: {e}")
+            PAPER_POOL_REQUESTS.labels("error").inc()
+            return None
+        if exam_paper is None:
+            PAPER_POOL_REQUESTS.labels("miss").inc()
+            return None
+        PAPER_POOL_REQUESTS.labels("hit").inc()
+        # Questions don't depend on these; stamp the caller's own
+        exam_paper["exam"]["paper_name"] = paper
+        exam_paper["exam"]["year"] = year
+        return exam_paper
+
+
+class PaperPoolRefiller:
+    """
+    Keeps `stock_size` unclaimed papers per target in the pool.
+
+    Every `interval` seconds during `refill_hours` (UTC hours; empty means any
+    hour) it counts the stock and generates at most one paper per target that
+    is short, one at a time, so a round never bursts against the provider
+    quotas. A round stops early when `has_headroom` says live traffic needs
+    the providers. `generate` returns the JSON-ready paper, or None when it
+    didn't pass validation.
+
+    Every worker process runs a refiller; they may overshoot a target by one
+    paper each in the same round, which the next claims absorb.
+    """
+
+    def __init__(self, pool_repo: PaperPoolRepo,
+                 generate: Callable[[PaperPoolTarget], Awaitable[Optional[Dict[str, Any]]]],
+                 targets: List[PaperPoolTarget], stock_size: int = 5,
+                 refill_hours: Optional[List[int]] = None, interval: float = 60.0,
+                 has_headroom: Optional[Callable[[], bool]] = None):
+        self.pool_repo = pool_repo
+        self.generate = generate
+        self.targets = targets
+        self.stock_size = stock_size
+        self.refill_hours = set(refill_hours or [])
+        self.interval = interval
+        self.has_headroom = has_headroom
+        self._task: Optional[asyncio.Task] = None
+
+    def _off_peak(self) -> bool:
+        return not self.refill_hours or datetime.now(timezone.utc).hour in self.refill_hours
+
+    async def refill_once(self) -> int:
+        """One refill round; returns the number of papers added"""
+        stock = await self.pool_repo.stock()
+        stocked = 0
+        for target in self.targets:
+            if stock.get(pool_key(target.board, target.subject, target.code), 0) >= self.stock_size:
+                continue
+            if self.has_headroom is not None and not self.has_headroom():
+                PAPER_POOL_REFILLS.labels("deferred").inc()
+                break
+            try:
+                exam_paper = await self.generate(target)
+            except Exception as e:
+                logger.warning(f"Pre-generating a {target.board}/{target.subject}/{target.code} paper failed: {e}")
+                PAPER_POOL_REFILLS.labels("failed").inc()
+                continue
+            if exam_paper is None:
+                PAPER_POOL_REFILLS.labels("rejected").inc()
+                continue
+            await self.pool_repo.add(target.board, target.subject, target.code, exam_paper)
+            PAPER_POOL_REFILLS.labels("stocked").inc()
+            stocked += 1
+        return stocked
+
+    async def _run(self) -> None:
+        while True:
+            if self._off_peak():
+                try:
+                    await self.refill_once()
+                except Exception as e:
+                    logger.warning(f"Paper pool refill failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start refilling in the background (needs a running loop); no-op without targets"""
+        if self._task is None and self.targets:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
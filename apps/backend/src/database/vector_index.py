@@ -0,0 +1,191 @@
+"""
+ANN index on retrieval_subparts.embedding and the per-query knobs that go with it.
+
+The index is created in the background at startup (ensure_vector_index,
+one worker at a time under an advisory lock) with the type from
+VECTOR_INDEX_TYPE: "hnsw" (default, good recall without training data),
+"ivfflat" (cheaper to build, create it once the bank is loaded) or "none".
+Retrieval calls apply_search_settings in its transaction so ef_search/probes
+and pgvector's iterative index scans apply to that query only; iterative
+scans keep a selective subject filter from starving the result of rows.
+
+Admin command, run from apps/backend:
+
+    python -m src.database.vector_index status
+    python -m src.database.vector_index backfill  # rows for papers saved before retrieval_subparts
+    python -m src.database.vector_index create
+    python -m src.database.vector_index rebuild   # REINDEX CONCURRENTLY
+"""
+import logging
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from ..config.config import settings
+from .database import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+TABLE = "retrieval_subparts"
+INDEX_NAMES = {
+    "hnsw": "ix_retrieval_subparts_embedding_hnsw",
+    "ivfflat": "ix_retrieval_subparts_embedding_ivfflat",
+}
+
+# Advisory lock serializing index builds across workers and the admin command
+_LOCK_NAME = "retrieval_subparts_vector_index"
+
+# pgvector version of the connected database, looked up once per process
+_pgvector_version: Optional[tuple] = None
+
+
+def _create_index_sql(index_type: str) -> str:
+    name = INDEX_NAMES[index_type]
+    if index_type == "hnsw":
+        options = f"m = {int(settings.VECTOR_HNSW_M)}, ef_construction = {int(settings.VECTOR_HNSW_EF_CONSTRUCTION)}"
+    else:
+        options = f"lists = {int(settings.VECTOR_IVFFLAT_LISTS)}"
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {TABLE} "
+        f"USING {index_type} (embedding vector_cosine_ops) WITH ({options})"
+    )
+
+
+def index_status(engine: Engine = default_engine) -> List[Dict[str, Any]]:
+    """
+    Vector indexes on the retrieval table: name, method, valid, building
+    (a CREATE INDEX CONCURRENTLY is still running on it), size
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT c.relname AS name, am.amname AS method, i.indisvalid AS valid, "
+            "EXISTS (SELECT 1 FROM pg_stat_progress_create_index p WHERE p.index_relid = c.oid) AS building, "
+            "pg_size_pretty(pg_relation_size(c.oid)) AS size "
+            "FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_am am ON am.oid = c.relam "
+            "WHERE i.indrelid = CAST(:table AS regclass) AND am.amname IN ('hnsw', 'ivfflat')"
+        ), {"table": TABLE}).mappings().all()
+        return [dict(row) for row in rows]
+
+
+@contextmanager
+def _index_lock(engine: Engine, wait: bool) -> Iterator[Optional[Connection]]:
+    """
+    AUTOCOMMIT connection holding the session-level advisory lock, or None
+    when `wait` is off and another process holds it. CREATE/DROP INDEX
+    CONCURRENTLY refuse to run inside a transaction block.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if wait:
+            conn.execute(text("SELECT pg_advisory_lock(hashtext(:name))"), {"name": _LOCK_NAME})
+        elif not conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": _LOCK_NAME}).scalar():
+            yield None
+            return
+        try:
+            yield conn
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": _LOCK_NAME})
+
+
+def ensure_vector_index(engine: Engine = default_engine, wait: bool = False) -> None:
+    """
+    Create the configured index if it is missing, replacing one of the other
+    type or one left invalid by an interrupted concurrent build. Builds run
+    CONCURRENTLY, so inserts carry on meanwhile. Indexes another session is
+    still building are left alone. Without `wait`, returns at once when
+    another worker is already at it.
+    """
+    index_type = settings.VECTOR_INDEX_TYPE
+    if index_type not in INDEX_NAMES:
+        return
+    with _index_lock(engine, wait) as conn:
+        if conn is None:
+            logger.info("Another process is managing the vector index; skipping")
+            return
+        for existing in index_status(engine):
+            if existing["building"]:
+                logger.info(f"Vector index {existing['name']} is still being built; leaving it")
+                continue
+            if existing["name"] == INDEX_NAMES[index_type] and existing["valid"]:
+                continue
+            logger.info(f"Dropping vector index {existing['name']} ({existing['method']}, valid={existing['valid']})")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {existing['name']}"))
+        conn.execute(text(_create_index_sql(index_type)))
+
+
+def rebuild_vector_index(engine: Engine = default_engine) -> None:
+    """REINDEX CONCURRENTLY the configured index (after bulk loads or a lot of churn)"""
+    index_type = settings.VECTOR_INDEX_TYPE
+    if index_type not in INDEX_NAMES:
+        raise ValueError(f"VECTOR_INDEX_TYPE={index_type!r} has no index to rebuild")
+    with _index_lock(engine, wait=True) as conn:
+        conn.execute(text(f"REINDEX INDEX CONCURRENTLY {INDEX_NAMES[index_type]}"))
+
+
+def _pgvector_at_least(db: Session, version: tuple) -> bool:
+    global _pgvector_version
+    if _pgvector_version is None:
+        installed = db.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+        _pgvector_version = tuple(int(p) for p in (installed or "0").split(".") if p.isdigit())
+    return _pgvector_version >= version
+
+
+def apply_search_settings(db: Session, limit: int) -> None:
+    """
+    Set ef_search/probes and iterative scans for the rest of the current
+    transaction (set_config(..., is_local => true)); call right before the
+    vector query. Without iterative scans (pgvector < 0.8) ef_search is
+    raised to `limit`, since HNSW never returns more rows than that.
+    """
+    index_type = settings.VECTOR_INDEX_TYPE
+    if index_type not in INDEX_NAMES:
+        return
+    iterative = settings.VECTOR_ITERATIVE_SCAN != "off" and _pgvector_at_least(db, (0, 8))
+    values = {}
+    if index_type == "hnsw":
+        ef_search = settings.VECTOR_HNSW_EF_SEARCH if iterative else max(settings.VECTOR_HNSW_EF_SEARCH, limit)
+        values["hnsw.ef_search"] = str(ef_search)
+        if iterative:
+            values["hnsw.iterative_scan"] = settings.VECTOR_ITERATIVE_SCAN
+    else:
+        values["ivfflat.probes"] = str(settings.VECTOR_IVFFLAT_PROBES)
+        if iterative:
+            # ivfflat only supports relaxed ordering
+            values["ivfflat.iterative_scan"] = "relaxed_order"
+    assignments = ", ".join(f"set_config(:name_{i}, :value_{i}, true)" for i in range(len(values)))
+    params = {}
+    for i, (name, value) in enumerate(values.items()):
+        params[f"name_{i}"] = name
+        params[f"value_{i}"] = value
+    db.execute(text(f"SELECT {assignments}"), params)
+
+
+def main(argv: List[str]) -> int:
+    logging.basicConfig(level=logging.INFO)
+    command = argv[0] if argv else "status"
+    if command == "backfill":
+        # Imported here: it pulls in the repo layer, which the rest of this module doesn't need
+        from ..infrastructure.providers.llm_provider import backfill_retrieval_subparts
+        print(f"Backfilled {backfill_retrieval_subparts()} row(s) into {TABLE}")
+    elif command == "create":
+        ensure_vector_index(wait=True)
+    elif command == "rebuild":
+        rebuild_vector_index()
+    elif command != "status":
+        print("usage: python -m src.database.vector_index [status|backfill|create|rebuild]")
+        return 2
+    for index in index_status():
+        print(
+            f"{index['name']}: {index['method']}, valid={index['valid']}, "
+            f"building={index['building']}, size={index['size']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from uuid import uuid4
 from sqlalchemy import (
-    Column, String, Integer, DateTime, ForeignKey, Text, Boolean, JSON
+    Column, String, Integer, DateTime, ForeignKey, Text, Boolean, JSON, Index, UniqueConstraint
 )
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.orm import relationship
@@ -126,3 +126,63 @@ class SubPartModel(Base):
     embedding = Column(Vector(384))
 
     part = relationship("QuestionPartModel", back_populates="sub_parts")
+
+
+class GeneratedPaperModel(Base):
+    """An AI-generated paper stored in exam_papers, identified by a hash of its content"""
+    __tablename__ = "generated_papers"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    exam_id = Column(UUID(as_uuid=True), ForeignKey("exam_papers.id", ondelete="CASCADE"), nullable=False, unique=True)
+    content_hash = Column(String(64), nullable=False, unique=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    exam = relationship("ExamPaperModel")
+
+
+class UserGeneratedPaperModel(Base):
+    """A user's generation history; identical papers are stored once and linked"""
+    __tablename__ = "user_generated_papers"
+    __table_args__ = (
+        UniqueConstraint("user_id", "generated_paper_id", name="uq_user_generated_papers_user_paper"),
+        # History pages are read newest first per user
+        Index("ix_user_generated_papers_user_created_at", "user_id", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    generated_paper_id = Column(
+        UUID(as_uuid=True), ForeignKey("generated_papers.id", ondelete="CASCADE"), nullable=False
+    )
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class RetrievalSubPartModel(Base):
+    """
+    Embedded sub-parts with the paper, question and part attributes retrieval
+    needs copied alongside, so similar-question search is a single filtered
+    vector query instead of a five-table join. Written with the sub-parts in
+    create_exam_paper; rows go away with their sub-part or paper.
+    """
+    __tablename__ = "retrieval_subparts"
+    __table_args__ = (
+        # Retrieval filters on the normalized subject (and optionally board)
+        Index("ix_retrieval_subparts_subject_board", "subject", "board"),
+    )
+
+    sub_part_id = Column(UUID(as_uuid=True), ForeignKey("sub_parts.id", ondelete="CASCADE"), primary_key=True)
+    exam_id = Column(UUID(as_uuid=True), ForeignKey("exam_papers.id", ondelete="CASCADE"), nullable=False, index=True)
+    # normalize_subject() of the paper's subject, so retrieval filters with equality
+    subject = Column(String, nullable=False)
+    board = Column(String, nullable=False)
+    year = Column(Integer, nullable=False)
+    question_type = Column(String, nullable=True)
+    question_title = Column(String, nullable=True)
+    part_type = Column(String, nullable=True)
+    part_marks = Column(Integer, nullable=True)
+    question_text = Column(Text, nullable=False)
+    marks = Column(Integer, nullable=True)
+    choices_given = Column(ARRAY(String), nullable=True)
+    formula_given = Column(String, nullable=True)
+    constants_given = Column(JSON, nullable=True)
+    embedding = Column(Vector(384), nullable=False)
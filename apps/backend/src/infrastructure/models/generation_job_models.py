@@ -0,0 +1,31 @@
+import uuid
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, JSON, Index
+from datetime import datetime, timezone
+from ...database.database import Base
+
+
+class GenerationJobModel(Base):
+    __tablename__ = "generation_jobs"
+    # Workers claim the oldest queued job
+    __table_args__ = (Index("ix_generation_jobs_status_created_at", "status", "created_at"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    subject = Column(String, nullable=False)
+    board = Column(String, nullable=False)
+    paper = Column(String, nullable=False)
+    code = Column(String, nullable=False)
+    year = Column(Integer, nullable=False)
+
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True)
+    worker_id = Column(String, nullable=True)
+    # timestamptz: lease expiry is compared with the repo's tz-aware UTC now
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,25 @@
+import uuid
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Float, Integer, Boolean, DateTime, ForeignKey
+from datetime import datetime, timezone
+from ...database.database import Base
+
+
+class LLMUsageModel(Base):
+    __tablename__ = "llm_usage"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    subject = Column(String, nullable=True, index=True)
+    section = Column(String, nullable=True)
+    attempt = Column(Integer, nullable=True)
+
+    provider = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    estimated = Column(Boolean, nullable=False, default=False)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    latency_seconds = Column(Float, nullable=True)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
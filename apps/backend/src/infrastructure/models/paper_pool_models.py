@@ -0,0 +1,27 @@
+import uuid
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Index, text
+from datetime import datetime, timezone
+from ...database.database import Base
+
+
+class PooledPaperModel(Base):
+    __tablename__ = "pooled_papers"
+    # Claims and stock counts only look at papers nobody has been given yet
+    __table_args__ = (
+        Index(
+            "ix_pooled_papers_available",
+            "board", "subject", "paper_code", "created_at",
+            postgresql_where=text("claimed_at IS NULL")
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    board = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    paper_code = Column(String, nullable=False)
+    paper = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    claimed_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    claimed_at = Column(DateTime, nullable=True)
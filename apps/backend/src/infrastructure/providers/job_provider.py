@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict
+
+from ...config.config import settings
+from ...config.model import get_embedding_model
+from ...database.database import SessionLocal
+from ...core.entities.generation_job_entities import GenerationJob
+from ...core.repo.generation_job_repo import GenerationJobRepo
+from ...core.services.ICSE_exam_paper_llm_service import LLMService
+from ...core.services.generation_job_service import GenerationWorkerPool
+from ...LLMs.usage import usage_tags
+from ...utils.deadline import Deadline
+from ..repo.generation_job_repo import InMemoryGenerationJobRepo, SQLGenerationJobRepo
+from ..repo.ICSE_exam_paper_llm_repo import SQLLMRepo
+from ..repo.exam_paper_repo import SQLExamPaperRepo
+from .llm_provider import get_llm_manager, persist_generated_papers
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_generation_job(job: GenerationJob) -> Dict[str, Any]:
+    # Runs in the worker pool outside any request, so it opens its own session
+    db = SessionLocal()
+    try:
+        local_model = get_embedding_model()
+        if settings.VECTOR_MODEL == False:
+            llm_repo = SQLLMRepo(db=db, model=None, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=get_llm_manager())
+            exam_paper_repo = SQLExamPaperRepo(db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
+        else:
+            llm_repo = SQLLMRepo(db=db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=get_llm_manager())
+            exam_paper_repo = SQLExamPaperRepo(db, model=settings.VECTOR_MODEL, cohere_api_keys=settings.COHERE_API_KEY)
+
+        llm_service = LLMService(llm_repo=llm_repo, subject=job.subject, exam_paper_repo=exam_paper_repo)
+        with usage_tags(user_id=job.user_id, subject=job.subject):
+            exam_paper = await llm_service.gen_question_paper(
+                subject=job.subject,
+                board=job.board,
+                paper=job.paper,
+                code=job.code,
+                year=job.year,
+                deadline=Deadline(settings.LLM_REQUEST_BUDGET_SECONDS)
+            )
+    finally:
+        db.close()
+    
+    await asyncio.to_thread(persist_generated_papers, job.user_id, [exam_paper.model_dump()])
+    return exam_paper.model_dump(mode="json")
+
+
+@lru_cache()
+def get_job_repo() -> GenerationJobRepo:
+    # "db" keeps jobs in generation_jobs (shared by all workers, survives restarts)
+    if settings.LLM_JOB_BACKEND == "db":
+        return SQLGenerationJobRepo(SessionLocal)
+    # uvicorn takes its default worker count from WEB_CONCURRENCY
+    if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+        logger.warning(
+            "LLM_JOB_BACKEND=memory with several workers: a job is only visible to the worker that "
+            "accepted it, so polling other workers returns 404. Use LLM_JOB_BACKEND=db."
+        )
+    return InMemoryGenerationJobRepo()
+
+
+@lru_cache()
+def get_job_worker_pool() -> GenerationWorkerPool:
+    return GenerationWorkerPool(
+        get_job_repo(),
+        _run_generation_job,
+        workers=settings.LLM_JOB_WORKERS,
+        poll_interval=settings.LLM_JOB_POLL_SECONDS,
+        lease_seconds=settings.LLM_JOB_LEASE_SECONDS,
+        max_attempts=settings.LLM_JOB_MAX_ATTEMPTS
+    )
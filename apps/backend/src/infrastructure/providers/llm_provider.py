@@ -0,0 +1,83 @@
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from ...LLMs.LLMs import LLMProviderManager
+from ...LLMs.usage import UsageRecorder
+from ...config.config import settings
+from ...config.model import get_embedding_model
+from ...database.database import SessionLocal
+from ...database.vector_index import ensure_vector_index
+from ...core.entities.llm_usage_entities import LLMUsageCreate
+from ..repo.llm_usage_repo import SQLLLMUsageRepo
+from ..repo.exam_paper_repo import SQLExamPaperRepo
+
+logger = logging.getLogger(__name__)
+
+
+def _write_usage(rows: List[Dict[str, Any]]) -> None:
+    # Runs in a worker thread with its own session, outside any request
+    db = SessionLocal()
+    try:
+        SQLLLMUsageRepo(db).add_usage_batch([LLMUsageCreate(**row) for row in rows])
+    finally:
+        db.close()
+
+
+def persist_generated_papers(user_id: UUID, papers: List[Dict[str, Any]]) -> None:
+    """
+    Save generated papers to the user's history. Runs after the response has
+    gone out (BackgroundTasks threadpool, or a job worker thread) with its own
+    session; a failure is logged and never reaches the user.
+    """
+    if not settings.LLM_PERSIST_GENERATED_PAPERS or not papers:
+        return
+    db = SessionLocal()
+    try:
+        local_model = get_embedding_model()
+        # Nothing is embedded; the model only satisfies the repo's constructor
+        if settings.VECTOR_MODEL == False:
+            exam_paper_repo = SQLExamPaperRepo(db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
+        else:
+            exam_paper_repo = SQLExamPaperRepo(db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY)
+        exam_paper_repo.save_generated_papers(user_id, papers)
+    except Exception as e:
+        logger.warning(f"Saving {len(papers)} generated paper(s) failed: {e}")
+    finally:
+        db.close()
+
+
+def backfill_retrieval_subparts() -> int:
+    """Fill retrieval_subparts for papers saved before it existed (admin command); returns rows added"""
+    db = SessionLocal()
+    try:
+        # Nothing is embedded; the stored vectors are copied as they are
+        return SQLExamPaperRepo(db).backfill_retrieval_subparts()
+    finally:
+        db.close()
+
+
+def ensure_retrieval_index() -> None:
+    """Create the retrieval vector index if missing (startup, background thread)"""
+    try:
+        ensure_vector_index()
+    except Exception as e:
+        logger.warning(f"Creating the retrieval vector index failed; queries scan the table: {e}")
+
+
+@lru_cache()
+def get_usage_recorder() -> Optional[UsageRecorder]:
+    if not settings.LLM_USAGE_TRACKING:
+        return None
+    return UsageRecorder(
+        _write_usage,
+        batch_size=settings.LLM_USAGE_BATCH_SIZE,
+        flush_interval=settings.LLM_USAGE_FLUSH_SECONDS
+    )
+
+
+@lru_cache()
+def get_llm_manager() -> LLMProviderManager:
+    # One manager per worker process, so learned provider health survives across requests
+    return LLMProviderManager(usage_recorder=get_usage_recorder())
@@ -0,0 +1,72 @@
+import logging
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from ...config.config import settings
+from ...config.model import get_embedding_model
+from ...database.database import SessionLocal
+from ...core.entities.paper_pool_entities import PaperPoolTarget
+from ...core.repo.paper_pool_repo import PaperPoolRepo
+from ...core.services.ICSE_exam_paper_llm_service import LLMService
+from ...core.services.paper_pool_service import PaperPoolRefiller
+from ...LLMs.usage import usage_tags
+from ...utils.deadline import Deadline
+from ..repo.paper_pool_repo import SQLPaperPoolRepo
+from ..repo.ICSE_exam_paper_llm_repo import SQLLMRepo
+from ..repo.exam_paper_repo import SQLExamPaperRepo
+from .llm_provider import get_llm_manager
+
+logger = logging.getLogger(__name__)
+
+
+async def _generate_pool_paper(target: PaperPoolTarget) -> Optional[Dict[str, Any]]:
+    # Runs in the refiller outside any request, so it opens its own session
+    db = SessionLocal()
+    try:
+        local_model = get_embedding_model()
+        if settings.VECTOR_MODEL == False:
+            llm_repo = SQLLMRepo(db=db, model=None, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=get_llm_manager())
+            exam_paper_repo = SQLExamPaperRepo(db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
+        else:
+            llm_repo = SQLLMRepo(db=db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=get_llm_manager())
+            exam_paper_repo = SQLExamPaperRepo(db, model=settings.VECTOR_MODEL, cohere_api_keys=settings.COHERE_API_KEY)
+
+        llm_service = LLMService(llm_repo=llm_repo, subject=target.subject, exam_paper_repo=exam_paper_repo)
+        with usage_tags(subject=target.subject):
+            exam_paper = await llm_service.gen_question_paper(
+                subject=target.subject,
+                board=target.board,
+                paper=target.paper,
+                code=target.code,
+                year=target.year or datetime.now(timezone.utc).year,
+                deadline=Deadline(settings.LLM_REQUEST_BUDGET_SECONDS)
+            )
+    finally:
+        db.close()
+
+    exam_paper_dict = exam_paper.model_dump(mode="json")
+    # A live request may hand out a best-effort paper; the pool only keeps clean ones
+    has_placeholders, locations = llm_repo._has_placeholder_content(exam_paper_dict)
+    if has_placeholders:
+        logger.info(f"Discarding pre-generated {target.subject} paper with placeholders at {locations[:3]}")
+        return None
+    return exam_paper_dict
+
+
+@lru_cache()
+def get_paper_pool_repo() -> PaperPoolRepo:
+    return SQLPaperPoolRepo(SessionLocal)
+
+
+@lru_cache()
+def get_paper_pool_refiller() -> PaperPoolRefiller:
+    return PaperPoolRefiller(
+        get_paper_pool_repo(),
+        _generate_pool_paper,
+        targets=[PaperPoolTarget(**target) for target in settings.LLM_POOL_TARGETS],
+        stock_size=settings.LLM_POOL_SIZE,
+        refill_hours=settings.LLM_POOL_REFILL_HOURS,
+        interval=settings.LLM_POOL_REFILL_INTERVAL_SECONDS,
+        has_headroom=get_llm_manager().has_headroom
+    )
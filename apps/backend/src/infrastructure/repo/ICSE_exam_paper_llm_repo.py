@@ -1,16 +1,46 @@
 import numpy as np
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional, Set, Tuple
 import asyncio
 import json
+import logging
+import random
+import time
 from uuid import uuid4
 import re
 
-from ..models.exam_paper_models import SubPartModel, QuestionPartModel, QuestionModel, SectionModel, ExamPaperModel
+from fastapi import HTTPException
+
+from ..models.exam_paper_models import (
+    SubPartModel, QuestionPartModel, QuestionModel, SectionModel, ExamPaperModel, RetrievalSubPartModel
+)
 from ...LLMs.LLMs import LLMProviderManager
-from ...core.entities.exam_paper_entities import ExamInfo, ExamPaperCreate, Section
-from ...prompts.ICSE_questions import PERFECT_SECTION_A, PERFECT_SECTION_B, SECTION_A_PROMPT, SECTION_B_PROMPT
+from ...LLMs.json_stream import StreamingArrayExtractor
+from ...LLMs.usage import usage_tags
+from ...core.entities.exam_paper_entities import (
+    ExamInfo, ExamPaperCreate, Question, QuestionPart, Section, normalize_subject
+)
+from ...prompts.ICSE_questions import (
+    PERFECT_SECTION_A, PERFECT_SECTION_B, SECTION_A_PROMPT, SECTION_B_PROMPT,
+    QUESTION_PROMPT, SECTION_A_QUESTION_BRIEFS, SECTION_B_QUESTION_BRIEF, PART_REPAIR_PROMPT
+)
+from ...config.config import settings
 from ...config.cohere_api_client import CohereEmbeddingClient
+from ...config.embedding_cache import embedding_model_id, get_query_embedding_cache
+from ...database.vector_index import apply_search_settings
+from ...utils.deadline import Deadline
+from ...utils.exceptions import GatewayTimeoutException
+from ...utils.stage_timer import timed_stage
+from ...utils.metrics import SECTION_ATTEMPT_OUTCOMES, SECTION_GENERATION_ATTEMPTS, SECTION_REPAIRS, observe_embedding
+
+logger = logging.getLogger(__name__)
+
+# Until retrieval_subparts holds every embedded sub-part (the backfill admin
+# command has not run), retrieval uses the join; recounted at most this often
+RETRIEVAL_RECHECK_SECONDS = 300
+_retrieval_complete = False
+_retrieval_checked_at: Optional[float] = None
 
 ROMAN_NUMERALS = ["i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x", "xi", "xii", "xiii", "xiv", "xv"]
 
@@ -25,9 +55,45 @@ PLACEHOLDER_PATTERNS = [
     r'sample\s+\w+',
 ]
 
+# The schema block is identical in every section prompt; serialize it once
+SECTION_SCHEMA_JSON = {
+    True: json.dumps(PERFECT_SECTION_A, indent=2),
+    False: json.dumps(PERFECT_SECTION_B, indent=2),
+}
+
+# Per-question mode: the template of every question, serialized once
+QUESTION_SCHEMA_JSON = {
+    (is_section_a, index): json.dumps(question, indent=2)
+    for is_section_a, template in ((True, PERFECT_SECTION_A), (False, PERFECT_SECTION_B))
+    for index, question in enumerate(template["questions"])
+}
+
+# JSON schemas handed to providers in structured output mode
+SECTION_RESPONSE_SCHEMA = Section.model_json_schema()
+QUESTION_RESPONSE_SCHEMA = Question.model_json_schema()
+PART_RESPONSE_SCHEMA = QuestionPart.model_json_schema()
+
+# Placeholder location (see _has_placeholder_content) -> question and part index
+PLACEHOLDER_PATH = re.compile(r"^root(?:\.questions\[(\d+)\])?(?:\.parts\[(\d+)\])?")
+
+
+async def _drain_events(events: asyncio.Queue, tasks: List[asyncio.Task]) -> AsyncIterator[Dict]:
+    """Yield queued events until every producer task is done and the queue is empty."""
+    while not all(task.done() for task in tasks) or not events.empty():
+        getter = asyncio.ensure_future(events.get())
+        done, _ = await asyncio.wait(
+            [getter, *[t for t in tasks if not t.done()]],
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        if getter in done:
+            yield getter.result()
+        else:
+            getter.cancel()
+
 
 class SQLLMRepo:
-    def __init__(self, db: Session, model=None, cohere_api_keys=None):
+    def __init__(self, db: Session, model=None, cohere_api_keys=None, llm_manager: LLMProviderManager = None,
+                 section_mode: Optional[str] = None):
         self.db = db
         self.model = model
         self.cohere_client = None
@@ -35,26 +101,43 @@ class SQLLMRepo:
         if model is None:
             self.cohere_client = CohereEmbeddingClient(api_keys=cohere_api_keys)
 
-        self.llm_manager = LLMProviderManager()
+        # Shared per-worker manager; a private one only when used outside the app
+        self.llm_manager = llm_manager or LLMProviderManager()
         self.max_retrieval_limit = 300
         self.context_per_section = 50
+        self.context_per_repair = 10
+        # "section": one LLM call per section; "question": one call per question
+        self.section_mode = section_mode or settings.LLM_SECTION_GENERATION_MODE
 
     def _get_query_embedding(self, query: str) -> List[float]:
         if not query or not query.strip():
             raise ValueError("Query string cannot be empty")
 
+        cache = get_query_embedding_cache()
+        if cache is None:
+            return self._embed_query(query)[0]
+        # Both branches of _embed_query use the default "search_document" input type
+        model_id = embedding_model_id(self.model if self.model is not None else self.cohere_client)
+        return cache.get_or_embed(model_id, "search_document", query, lambda: self._embed_query(query))
+
+    def _embed_query(self, query: str) -> Tuple[List[float], bool]:
+        """The query vector and whether it may be cached (not a Cohere hash fallback)"""
         if self.model is not None:
-            embedding = self.model.encode(query)
+            backend = "cohere" if isinstance(self.model, CohereEmbeddingClient) else "local"
+            with observe_embedding(backend, "query", 1):
+                embedding = self.model.encode(query)
             embedding = embedding / np.linalg.norm(embedding)
-            return embedding.tolist()
+            return embedding.tolist(), not (backend == "cohere" and self.model.used_fallback())
         elif self.cohere_client is not None:
-            embedding = self.cohere_client.encode(query, input_type="search_document", normalize=True)
+            with observe_embedding("cohere", "query", 1):
+                embedding = self.cohere_client.encode(query, input_type="search_document", normalize=True)
+            cacheable = not self.cohere_client.used_fallback()
             if isinstance(embedding, np.ndarray):
-                return embedding.tolist()
+                return embedding.tolist(), cacheable
             elif isinstance(embedding, list):
-                return embedding
+                return embedding, cacheable
             else:
-                return list(embedding)
+                return list(embedding), cacheable
         else:
             raise Exception("No embedding model or Cohere client available")
         
@@ -90,7 +173,7 @@ class SQLLMRepo:
                 continue
             
             context_item = {
-                "sub_id": str(getattr(sp, "id", uuid4())),
+                "sub_id": str(getattr(sp, "sub_part_id", None) or getattr(sp, "id", uuid4())),
                 "text": question_text,
                 "marks": getattr(sp, "marks", 1),
                 "choices_given": getattr(sp, "choices_given", []) or [],
@@ -107,12 +190,72 @@ class SQLLMRepo:
                 if question:
                     context_item["question_type"] = getattr(question, "type", None)
                     context_item["question_title"] = getattr(question, "title", None)
+            elif isinstance(sp, RetrievalSubPartModel):
+                # Denormalized rows carry the part and question attributes themselves
+                context_item["part_type"] = sp.part_type
+                context_item["part_marks"] = sp.part_marks
+                context_item["question_type"] = sp.question_type
+                context_item["question_title"] = sp.question_title
             
             retrieval_context.append(context_item)
         
         return retrieval_context
 
+    def _retrieval_table_complete(self) -> bool:
+        """
+        Whether retrieval_subparts has a row for every embedded sub-part. Once
+        it has, that holds for the life of the process (rows are written with
+        their sub-parts); until then it is recounted at most every
+        RETRIEVAL_RECHECK_SECONDS, with a warning each time.
+        """
+        global _retrieval_complete, _retrieval_checked_at
+        if _retrieval_complete:
+            return True
+        now = time.monotonic()
+        if _retrieval_checked_at is not None and now - _retrieval_checked_at < RETRIEVAL_RECHECK_SECONDS:
+            return False
+        _retrieval_checked_at = now
+        embedded = (
+            self.db.query(func.count(SubPartModel.id))
+            .filter(SubPartModel.embedding.isnot(None), func.trim(SubPartModel.question_text) != "")
+            .scalar()
+        )
+        indexed = (
+            self.db.query(func.count(RetrievalSubPartModel.sub_part_id))
+            .filter(RetrievalSubPartModel.embedding.isnot(None))
+            .scalar()
+        )
+        if embedded > indexed:
+            logger.warning(
+                f"retrieval_subparts lacks {embedded - indexed} embedded sub-part(s); retrieval uses the "
+                f"join until `python -m src.database.vector_index backfill` has run"
+            )
+            return False
+        _retrieval_complete = True
+        return True
+
     def _get_subparts_by_subject(self, subject: str, query_embedding: List[float]):
+        """
+        Nearest embedded sub-parts for the subject: one vector query on
+        retrieval_subparts filtered by the normalized subject (equality, so
+        ix_retrieval_subparts_subject_board applies), or the original join
+        while the table is incomplete or has nothing for the subject.
+        """
+        if not self._retrieval_table_complete():
+            return self._get_subparts_by_subject_joined(subject, query_embedding)
+        apply_search_settings(self.db, self.max_retrieval_limit)
+        rows = (
+            self.db.query(RetrievalSubPartModel)
+            .filter(RetrievalSubPartModel.subject == normalize_subject(subject))
+            .order_by(RetrievalSubPartModel.embedding.cosine_distance(query_embedding))
+            .limit(self.max_retrieval_limit)
+            .all()
+        )
+        if rows:
+            return rows
+        return self._get_subparts_by_subject_joined(subject, query_embedding)
+
+    def _get_subparts_by_subject_joined(self, subject: str, query_embedding: List[float]):
         subparts = (
             self.db.query(SubPartModel)
             .join(QuestionPartModel, SubPartModel.part_id == QuestionPartModel.id)
@@ -183,184 +326,508 @@ class SQLLMRepo:
             else:
                 q = template["questions"][min(i, len(template["questions"])-1)].copy()
             
-            question = {
-                "number": int(q.get("number", i + 1)),
-                "title": q.get("title"),
-                "type": str(q.get("type", "short_answer")),
-                "total_marks": int(q.get("total_marks", 10)),
-                "instruction": q.get("instruction"),
-                "parts": [],
-                "question_text": q.get("question_text"),
+            result["questions"].append(self._enforce_question_schema(q, i))
+        
+        return result
+
+    def _enforce_question_schema(self, q: Dict, i: int) -> Dict:
+        """Normalize a single question (its parts, options and sub-parts) to the schema."""
+        question = {
+            "number": int(q.get("number", i + 1)),
+            "title": q.get("title"),
+            "type": str(q.get("type", "short_answer")),
+            "total_marks": int(q.get("total_marks", 10)),
+            "instruction": q.get("instruction"),
+            "parts": [],
+            "question_text": q.get("question_text"),
+            "options": [],
+            "diagram": q.get("diagram")
+        }
+        
+        parts = q.get("parts", [])
+        for p_idx, part in enumerate(parts):
+            if not isinstance(part, dict):
+                continue
+            
+            # Handle missing_parts field
+            missing_parts = part.get("missing_parts")
+            if isinstance(missing_parts, list):
+                missing_parts = {f"item_{i+1}": str(item) for i, item in enumerate(missing_parts)}
+            elif missing_parts is not None and not isinstance(missing_parts, dict):
+                missing_parts = None
+            
+            # Handle choices_for_blanks
+            choices_for_blanks = part.get("choices_for_blanks")
+            if choices_for_blanks is not None and not isinstance(choices_for_blanks, list):
+                choices_for_blanks = None
+            elif isinstance(choices_for_blanks, list):
+                fixed_choices = []
+                for choice in choices_for_blanks:
+                    if isinstance(choice, list):
+                        fixed_choices.append(choice)
+                    else:
+                        fixed_choices.append([str(choice)])
+                choices_for_blanks = fixed_choices
+            
+            # Handle constants_given
+            constants_given = part.get("constants_given")
+            if isinstance(constants_given, list):
+                constants_given = {f"constant_{i+1}": str(item) for i, item in enumerate(constants_given)}
+            elif constants_given is not None and not isinstance(constants_given, dict):
+                constants_given = None
+                
+            validated_part = {
+                "number": self._get_roman_numeral(p_idx + 1),
+                "type": str(part.get("type", "short_answer")),
+                "marks": int(part.get("marks", 1)),
+                "question_text": part.get("question_text"),
+                "description": part.get("description"),
+                "sub_parts": [],
                 "options": [],
-                "diagram": q.get("diagram")
+                "diagram": part.get("diagram"),
+                "formula_given": part.get("formula_given"),
+                "constants_given": constants_given,
+                "column_a": part.get("column_a"),
+                "column_b": part.get("column_b"),
+                "items_to_arrange": part.get("items_to_arrange"),
+                "sequence_type": part.get("sequence_type"),
+                "statement_with_blanks": part.get("statement_with_blanks"),
+                "choices_for_blanks": choices_for_blanks,
+                "equation_template": part.get("equation_template"),
+                "missing_parts": missing_parts
             }
             
-            parts = q.get("parts", [])
-            for p_idx, part in enumerate(parts):
-                if not isinstance(part, dict):
-                    continue
-                
-                # Handle missing_parts field
-                missing_parts = part.get("missing_parts")
-                if isinstance(missing_parts, list):
-                    missing_parts = {f"item_{i+1}": str(item) for i, item in enumerate(missing_parts)}
-                elif missing_parts is not None and not isinstance(missing_parts, dict):
-                    missing_parts = None
-                
-                # Handle choices_for_blanks
-                choices_for_blanks = part.get("choices_for_blanks")
-                if choices_for_blanks is not None and not isinstance(choices_for_blanks, list):
-                    choices_for_blanks = None
-                elif isinstance(choices_for_blanks, list):
-                    fixed_choices = []
-                    for choice in choices_for_blanks:
-                        if isinstance(choice, list):
-                            fixed_choices.append(choice)
-                        else:
-                            fixed_choices.append([str(choice)])
-                    choices_for_blanks = fixed_choices
-                
-                # Handle constants_given
-                constants_given = part.get("constants_given")
-                if isinstance(constants_given, list):
-                    constants_given = {f"constant_{i+1}": str(item) for i, item in enumerate(constants_given)}
-                elif constants_given is not None and not isinstance(constants_given, dict):
-                    constants_given = None
+            # Process options for MCQ
+            if part.get("type") == "multiple_choice":
+                options = part.get("options", [])
+                for o_idx, option in enumerate(options):
+                    if isinstance(option, dict):
+                        validated_part["options"].append({
+                            "option_letter": option.get("option_letter", f"({chr(97+o_idx)})"),
+                            "text": str(option.get("text", f"Option {chr(65+o_idx)}"))
+                        })
+            
+            # Process sub-parts
+            sub_parts = part.get("sub_parts", [])
+            for s_idx, sub in enumerate(sub_parts):
+                if isinstance(sub, dict):
+                    sub_constants = sub.get("constants_given")
+                    if isinstance(sub_constants, list):
+                        sub_constants = {f"constant_{i+1}": str(item) for i, item in enumerate(sub_constants)}
+                    elif sub_constants is not None and not isinstance(sub_constants, dict):
+                        sub_constants = None
                     
-                validated_part = {
-                    "number": self._get_roman_numeral(p_idx + 1),
-                    "type": str(part.get("type", "short_answer")),
-                    "marks": int(part.get("marks", 1)),
-                    "question_text": part.get("question_text"),
-                    "description": part.get("description"),
-                    "sub_parts": [],
-                    "options": [],
-                    "diagram": part.get("diagram"),
-                    "formula_given": part.get("formula_given"),
-                    "constants_given": constants_given,
-                    "column_a": part.get("column_a"),
-                    "column_b": part.get("column_b"),
-                    "items_to_arrange": part.get("items_to_arrange"),
-                    "sequence_type": part.get("sequence_type"),
-                    "statement_with_blanks": part.get("statement_with_blanks"),
-                    "choices_for_blanks": choices_for_blanks,
-                    "equation_template": part.get("equation_template"),
-                    "missing_parts": missing_parts
-                }
-                
-                # Process options for MCQ
-                if part.get("type") == "multiple_choice":
-                    options = part.get("options", [])
-                    for o_idx, option in enumerate(options):
-                        if isinstance(option, dict):
-                            validated_part["options"].append({
-                                "option_letter": option.get("option_letter", f"({chr(97+o_idx)})"),
-                                "text": str(option.get("text", f"Option {chr(65+o_idx)}"))
-                            })
-                
-                # Process sub-parts
-                sub_parts = part.get("sub_parts", [])
-                for s_idx, sub in enumerate(sub_parts):
-                    if isinstance(sub, dict):
-                        sub_constants = sub.get("constants_given")
-                        if isinstance(sub_constants, list):
-                            sub_constants = {f"constant_{i+1}": str(item) for i, item in enumerate(sub_constants)}
-                        elif sub_constants is not None and not isinstance(sub_constants, dict):
-                            sub_constants = None
+                    choices_given = sub.get("choices_given")
+                    if choices_given is not None and not isinstance(choices_given, list):
+                        choices_given = None
                         
-                        choices_given = sub.get("choices_given")
-                        if choices_given is not None and not isinstance(choices_given, list):
-                            choices_given = None
-                            
-                        validated_part["sub_parts"].append({
-                            "letter": f"({chr(97+s_idx)})",
-                            "question_text": str(sub.get("question_text", "")),
-                            "marks": sub.get("marks"),
-                            "diagram": sub.get("diagram"),
-                            "formula_given": sub.get("formula_given"),
-                            "constants_given": sub_constants,
-                            "equation_template": sub.get("equation_template"),
-                            "choices_given": choices_given
-                        })
-                
-                question["parts"].append(validated_part)
+                    validated_part["sub_parts"].append({
+                        "letter": f"({chr(97+s_idx)})",
+                        "question_text": str(sub.get("question_text", "")),
+                        "marks": sub.get("marks"),
+                        "diagram": sub.get("diagram"),
+                        "formula_given": sub.get("formula_given"),
+                        "constants_given": sub_constants,
+                        "equation_template": sub.get("equation_template"),
+                        "choices_given": choices_given
+                    })
             
-            result["questions"].append(question)
+            question["parts"].append(validated_part)
         
-        return result
+        return question
+
+    def _build_section_prompt(self, context_items: List[Dict], subject: str, board: str, paper: str,
+                              code: str, year: int, is_section_a: bool = True, attempt: int = 0) -> str:
+        prompt_template = SECTION_A_PROMPT if is_section_a else SECTION_B_PROMPT
+        
+        prompt = prompt_template.safe_substitute(
+            board=board,
+            subject=subject,
+            paper=paper,
+            code=code,
+            year=year,
+            perfect_schema=SECTION_SCHEMA_JSON[is_section_a],
+            retrieval_context=json.dumps(context_items[:50], indent=2)
+        )
+        
+        if attempt > 0:
+            prompt += f"\n\n⚠️ RETRY ATTEMPT {attempt+1}: Previous generation contained placeholder text. Generate REAL {subject} questions with actual content!"
+        return prompt
 
     async def _generate_perfect_section(self, context_items: List[Dict], subject: str, board: str,
                                        paper: str, code: str, year: int, is_section_a: bool = True,
-                                       max_retries: int = 3) -> Dict:
-        """Generate section with placeholder detection and retry."""
+                                       max_retries: int = 3, deadline: Optional[Deadline] = None) -> Dict:
+        """
+        Generate section with placeholder detection and retry. Questions or parts
+        with placeholders are regenerated on their own first; the whole section
+        is only asked for again when that repair fails. When the deadline runs
+        out, the best well-formed attempt so far is returned (504 if none).
+        """
         template = PERFECT_SECTION_A if is_section_a else PERFECT_SECTION_B
-        prompt_template = SECTION_A_PROMPT if is_section_a else SECTION_B_PROMPT
         
         section_name = "Section A" if is_section_a else "Section B"
+        stage = "generate_a" if is_section_a else "generate_b"
+        mode = "structured" if self.llm_manager.structured_output else "plain"
+        best = None
+        attempts_used = 0
         
-        for attempt in range(max_retries):
-            prompt = prompt_template.safe_substitute(
-                board=board,
-                subject=subject,
-                paper=paper,
-                code=code,
-                year=year,
-                perfect_schema=json.dumps(template, indent=2),
-                retrieval_context=json.dumps(context_items[:50], indent=2)
-            )
-            
-            if attempt > 0:
-                prompt += f"\n\n⚠️ RETRY ATTEMPT {attempt+1}: Previous generation contained placeholder text. Generate REAL {subject} questions with actual content!"
-            
-            llm_response = await self.llm_manager.safe_generate(prompt=prompt)
-            raw_output = getattr(llm_response, 'content', getattr(llm_response, 'text', str(llm_response)))
-            
-            try:
-                section_json = self.llm_manager.safe_json_parse(raw_output)
+        try:
+            for attempt in range(max_retries):
+                attempts_used = attempt + 1
+                prompt = self._build_section_prompt(
+                    context_items, subject, board, paper, code, year, is_section_a, attempt
+                )
                 
-                if isinstance(section_json, dict) and "name" in section_json and "questions" in section_json:
-                    # Check for placeholders
-                    has_placeholders, placeholder_locations = self._has_placeholder_content(section_json)
+                try:
+                    with timed_stage(stage), usage_tags(section=section_name, attempt=attempt + 1):
+                        llm_response = await self.llm_manager.safe_generate(
+                            prompt=prompt, deadline=deadline, response_schema=SECTION_RESPONSE_SCHEMA
+                        )
+                except GatewayTimeoutException:
+                    if best is not None:
+                        return best
+                    raise
+                raw_output = getattr(llm_response, 'content', getattr(llm_response, 'text', str(llm_response)))
+                
+                try:
+                    with timed_stage("parse"):
+                        section_json = self.llm_manager.safe_json_parse(raw_output)
                     
-                    if has_placeholders:
-                        for loc in placeholder_locations[:5]:  # Show first 5
-                            pass
+                    if isinstance(section_json, dict) and "name" in section_json and "questions" in section_json:
+                        # Check for placeholders
+                        with timed_stage("parse"):
+                            has_placeholders, placeholder_locations = self._has_placeholder_content(section_json)
                         
-                        if attempt < max_retries - 1:
-                            continue
+                        if has_placeholders:
+                            SECTION_ATTEMPT_OUTCOMES.labels(mode, "placeholder").inc()
+                            self.llm_manager.forget_cached(prompt, SECTION_RESPONSE_SCHEMA)
+                            
+                            # Regenerate only the defective questions/parts, keep the rest
+                            with usage_tags(section=section_name, attempt=attempt + 1):
+                                best = await self._repair_section(
+                                    self._enforce_perfect_schema(section_json, is_section_a),
+                                    context_items, subject, board, year, is_section_a, deadline=deadline
+                                )
+                            if not self._has_placeholder_content(best)[0]:
+                                return best
+                            if attempt < max_retries - 1:
+                                continue
+                            return best
                         else:
-                            ...
+                            SECTION_ATTEMPT_OUTCOMES.labels(mode, "valid").inc()
+                        
+                        return self._enforce_perfect_schema(section_json, is_section_a)
                     else:
-                        ...
-                    
-                    return self._enforce_perfect_schema(section_json, is_section_a)
-                else:
+                        SECTION_ATTEMPT_OUTCOMES.labels(mode, "malformed").inc()
+                        self.llm_manager.forget_cached(prompt, SECTION_RESPONSE_SCHEMA)
+                        if attempt < max_retries - 1:
+                            continue
+                        return self._enforce_perfect_schema(template, is_section_a)
+                        
+                except Exception as e:
+                    SECTION_ATTEMPT_OUTCOMES.labels(mode, "malformed").inc()
+                    self.llm_manager.forget_cached(prompt, SECTION_RESPONSE_SCHEMA)
                     if attempt < max_retries - 1:
                         continue
                     return self._enforce_perfect_schema(template, is_section_a)
-                    
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    continue
-                return self._enforce_perfect_schema(template, is_section_a)
+            
+            return self._enforce_perfect_schema(template, is_section_a)
+        finally:
+            SECTION_GENERATION_ATTEMPTS.labels(mode).observe(attempts_used)
+
+    # ---------------- Per-question generation ---------------- #
+    def _slice_question_contexts(self, context_items: List[Dict], count: int) -> List[List[Dict]]:
+        """Deal the section's context out round-robin, so every question gets its own slice"""
+        return [context_items[i::count] for i in range(count)]
+
+    def _build_question_prompt(self, context_items: List[Dict], subject: str, board: str, year: int,
+                               is_section_a: bool, index: int, attempt: int = 0) -> str:
+        template = PERFECT_SECTION_A if is_section_a else PERFECT_SECTION_B
+        prompt = QUESTION_PROMPT.safe_substitute(
+            board=board,
+            subject=subject,
+            year=year,
+            section_name=template["name"],
+            question_number=template["questions"][index]["number"],
+            question_brief=SECTION_A_QUESTION_BRIEFS[index] if is_section_a else SECTION_B_QUESTION_BRIEF,
+            perfect_schema=QUESTION_SCHEMA_JSON[(is_section_a, index)],
+            retrieval_context=json.dumps(context_items, indent=2)
+        )
         
-        return self._enforce_perfect_schema(template, is_section_a)
+        if attempt > 0:
+            prompt += f"\n\n⚠️ RETRY ATTEMPT {attempt+1}: Previous generation contained placeholder text. Generate a REAL {subject} question with actual content!"
+        return prompt
 
-    async def gen_new_exam_paper(self, subject: str, board: str, paper: str, code: str, year: int) -> ExamPaperCreate:
-        query_embedding = self._get_query_embedding(f"{subject} exam questions")
-        similar_subparts = self._get_subparts_by_subject(subject, query_embedding)
-        context_items = self._prepare_retrieval_context(similar_subparts)
+    def _extract_question(self, data: Any) -> Optional[Dict]:
+        """The question object from an answer that may wrap it in a list or a section"""
+        if isinstance(data, list):
+            data = data[0] if data else None
+        if not isinstance(data, dict):
+            return None
+        if "parts" in data or "question_text" in data:
+            return data
+        for key in ("question", "questions"):
+            if key in data:
+                return self._extract_question(data[key])
+        return None
+
+    async def _generate_question(self, context_items: List[Dict], subject: str, board: str, year: int,
+                                 is_section_a: bool, index: int, max_retries: int = 3,
+                                 deadline: Optional[Deadline] = None) -> Dict:
+        """
+        One question with its own placeholder check and retries, so a bad
+        question only costs a call for that question.
+        """
+        template = PERFECT_SECTION_A if is_section_a else PERFECT_SECTION_B
+        section_name = template["name"]
+        stage = "generate_a" if is_section_a else "generate_b"
+        best = None
         
-        mid = min(self.context_per_section, len(context_items) // 2) if context_items else 0
-        sec_a_ctx = context_items[:mid] if context_items else []
-        sec_b_ctx = context_items[mid:mid+self.context_per_section] if context_items else []
+        for attempt in range(max_retries):
+            prompt = self._build_question_prompt(context_items, subject, board, year, is_section_a, index, attempt)
+            
+            try:
+                with timed_stage(stage), usage_tags(section=section_name, attempt=attempt + 1):
+                    llm_response = await self.llm_manager.safe_generate(
+                        prompt=prompt, deadline=deadline, response_schema=QUESTION_RESPONSE_SCHEMA
+                    )
+            except GatewayTimeoutException:
+                if best is not None:
+                    return best
+                raise
+            raw_output = getattr(llm_response, 'content', getattr(llm_response, 'text', str(llm_response)))
+            
+            try:
+                with timed_stage("parse"):
+                    question = self._extract_question(self.llm_manager.safe_json_parse(raw_output))
+                    has_placeholders = question is not None and self._has_placeholder_content(question)[0]
+                    # Unenforced providers may answer e.g. "number": "1.", which int() rejects
+                    enforced = self._enforce_question_schema(question, index) if question is not None else None
+            except Exception:
+                enforced = None
+            
+            if enforced is None:
+                self.llm_manager.forget_cached(prompt, QUESTION_RESPONSE_SCHEMA)
+                continue
+            
+            best = enforced
+            if not has_placeholders:
+                return best
+            self.llm_manager.forget_cached(prompt, QUESTION_RESPONSE_SCHEMA)
+            
+            # Only some parts affected: rewrite those instead of the whole question
+            _, locations = self._has_placeholder_content(best, f"root.questions[{index}]")
+            part_indices = self._locate_placeholders(locations)[1].get(index)
+            if part_indices is not None:
+                with usage_tags(section=section_name, attempt=attempt + 1):
+                    best = await self._repair_question(
+                        best, part_indices, context_items, subject, board, year, is_section_a, index, deadline
+                    )
+                if not self._has_placeholder_content(best)[0]:
+                    return best
         
-        section_a_task = self._generate_perfect_section(sec_a_ctx, subject, board, paper, code, year, True)
+        return best if best is not None else self._enforce_question_schema(template["questions"][index], index)
+
+    async def _generate_section_by_question(self, context_items: List[Dict], subject: str, board: str,
+                                            year: int, is_section_a: bool, deadline: Optional[Deadline] = None,
+                                            on_question=None) -> Dict:
+        """
+        Generate every question of a section as its own concurrent call, each
+        with a separate slice of the context. `on_question(index, question)`,
+        if given, is awaited as each question finishes.
+        """
+        template = PERFECT_SECTION_A if is_section_a else PERFECT_SECTION_B
+        count = len(template["questions"])
+        slices = self._slice_question_contexts(context_items, count)
         
-        section_b_task = self._generate_perfect_section(sec_b_ctx, subject, board, paper, code, year, False)
+        async def run(index: int) -> Dict:
+            question = await self._generate_question(
+                slices[index], subject, board, year, is_section_a, index, deadline=deadline
+            )
+            if on_question is not None:
+                await on_question(index, question)
+            return question
         
-        section_a, section_b = await asyncio.gather(section_a_task, section_b_task)
+        questions = await asyncio.gather(*(run(index) for index in range(count)))
+        section = {key: template[key] for key in ("name", "marks", "instruction", "is_compulsory")}
+        section["questions"] = list(questions)
+        return self._enforce_perfect_schema(section, is_section_a)
+
+    async def _generate_section(self, context_items: List[Dict], subject: str, board: str, paper: str,
+                                code: str, year: int, is_section_a: bool = True,
+                                deadline: Optional[Deadline] = None) -> Dict:
+        """One section in the configured mode (see section_mode)"""
+        if self.section_mode == "question":
+            return await self._generate_section_by_question(
+                context_items, subject, board, year, is_section_a, deadline=deadline
+            )
+        return await self._generate_perfect_section(
+            context_items, subject, board, paper, code, year, is_section_a, deadline=deadline
+        )
+
+    # ---------------- Targeted repair ---------------- #
+    def _locate_placeholders(self, locations: List[str]) -> Tuple[bool, Dict[int, Optional[Set[int]]]]:
+        """
+        Map placeholder locations to what has to be regenerated: whether a
+        section-level field is affected, and per question index the defective
+        part indices (None when the question's own fields are affected).
+        """
+        section_level = False
+        defects: Dict[int, Optional[Set[int]]] = {}
+        for location in locations:
+            match = PLACEHOLDER_PATH.match(location)
+            if match is None or match.group(1) is None:
+                section_level = True
+                continue
+            question_idx = int(match.group(1))
+            if match.group(2) is None:
+                defects[question_idx] = None
+            elif defects.get(question_idx, set()) is not None:
+                defects.setdefault(question_idx, set()).add(int(match.group(2)))
+        return section_level, defects
+
+    async def _repair_part(self, question: Dict, part_idx: int, context_items: List[Dict], subject: str,
+                           board: str, year: int, is_section_a: bool, index: int,
+                           deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """One small call rewriting a single defective part; None if the answer is still unusable"""
+        template = PERFECT_SECTION_A if is_section_a else PERFECT_SECTION_B
+        part = question["parts"][part_idx]
+        prompt = PART_REPAIR_PROMPT.safe_substitute(
+            board=board,
+            subject=subject,
+            year=year,
+            section_name=template["name"],
+            question_number=template["questions"][index]["number"],
+            part_number=part["number"],
+            part_json=json.dumps(part, indent=2),
+            question_json=json.dumps(question, indent=2),
+            retrieval_context=json.dumps(context_items[:self.context_per_repair], indent=2)
+        )
         
+        try:
+            with timed_stage("repair"):
+                llm_response = await self.llm_manager.safe_generate(
+                    prompt=prompt, deadline=deadline, response_schema=PART_RESPONSE_SCHEMA
+                )
+            raw_output = getattr(llm_response, 'content', getattr(llm_response, 'text', str(llm_response)))
+            repaired = self.llm_manager.safe_json_parse(raw_output)
+        except Exception:
+            # Best effort: the caller falls back to a full retry, which surfaces real errors
+            repaired = None
+        
+        if isinstance(repaired, list):
+            repaired = repaired[0] if repaired else None
+        if not isinstance(repaired, dict) or self._has_placeholder_content(repaired)[0]:
+            self.llm_manager.forget_cached(prompt, PART_RESPONSE_SCHEMA)
+            SECTION_REPAIRS.labels("part", "failed").inc()
+            return None
+        
+        SECTION_REPAIRS.labels("part", "repaired").inc()
+        # Marks are fixed by the paper structure, whatever the model answered
+        return {**repaired, "marks": part["marks"], "type": repaired.get("type", part["type"])}
+
+    async def _repair_question(self, question: Dict, part_indices: Optional[Set[int]], context_items: List[Dict],
+                               subject: str, board: str, year: int, is_section_a: bool, index: int,
+                               deadline: Optional[Deadline] = None) -> Dict:
+        """
+        Regenerate the defective pieces of one question and merge them back:
+        the listed parts with one call each, or the whole question when its
+        own fields are affected (part_indices None).
+        """
+        if part_indices is None:
+            prompt = self._build_question_prompt(context_items, subject, board, year, is_section_a, index, attempt=1)
+            try:
+                with timed_stage("repair"):
+                    llm_response = await self.llm_manager.safe_generate(
+                        prompt=prompt, deadline=deadline, response_schema=QUESTION_RESPONSE_SCHEMA
+                    )
+                raw_output = getattr(llm_response, 'content', getattr(llm_response, 'text', str(llm_response)))
+                repaired = self._extract_question(self.llm_manager.safe_json_parse(raw_output))
+                if repaired is not None:
+                    repaired = self._enforce_question_schema(repaired, index)
+            except Exception:
+                repaired = None
+            
+            if repaired is None or self._has_placeholder_content(repaired)[0]:
+                self.llm_manager.forget_cached(prompt, QUESTION_RESPONSE_SCHEMA)
+                SECTION_REPAIRS.labels("question", "failed").inc()
+                return question
+            SECTION_REPAIRS.labels("question", "repaired").inc()
+            return repaired
+        
+        parts = list(question["parts"])
+        indices = sorted(idx for idx in part_indices if idx < len(parts))
+        results = await asyncio.gather(*(
+            self._repair_part(question, idx, context_items, subject, board, year, is_section_a, index, deadline)
+            for idx in indices
+        ))
+        for idx, part in zip(indices, results):
+            if part is not None:
+                parts[idx] = part
+        return self._enforce_question_schema({**question, "parts": parts}, index)
+
+    async def _repair_section(self, section: Dict, context_items: List[Dict], subject: str, board: str,
+                              year: int, is_section_a: bool, deadline: Optional[Deadline] = None) -> Dict:
+        """
+        Regenerate only what failed the placeholder check in an enforced
+        section, concurrently, and merge it into the accepted questions.
+        Section-level fields fall back to the template.
+        """
+        template = PERFECT_SECTION_A if is_section_a else PERFECT_SECTION_B
+        _, locations = self._has_placeholder_content(section)
+        section_level, defects = self._locate_placeholders(locations)
+        
+        section = dict(section)
+        if section_level:
+            for key in ("name", "marks", "instruction", "is_compulsory"):
+                section[key] = template[key]
+        
+        questions = list(section["questions"])
+        slices = self._slice_question_contexts(context_items, len(questions))
+        indices = sorted(idx for idx in defects if idx < len(questions))
+        repaired = await asyncio.gather(*(
+            self._repair_question(
+                questions[idx], defects[idx], slices[idx], subject, board, year, is_section_a, idx, deadline
+            )
+            for idx in indices
+        ))
+        for idx, question in zip(indices, repaired):
+            questions[idx] = question
+        section["questions"] = questions
+        return section
+
+    async def get_context_pool(self, subject: str) -> List[Dict]:
+        """Embed the subject query and retrieve up to max_retrieval_limit similar past sub-parts."""
+        with timed_stage("embedding"):
+            query_embedding = self._get_query_embedding(f"{subject} exam questions")
+        with timed_stage("retrieval"):
+            similar_subparts = self._get_subparts_by_subject(subject, query_embedding)
+            return self._prepare_retrieval_context(similar_subparts)
+
+    def _split_section_contexts(self, context_items: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        mid = min(self.context_per_section, len(context_items) // 2) if context_items else 0
+        sec_a_ctx = context_items[:mid] if context_items else []
+        sec_b_ctx = context_items[mid:mid+self.context_per_section] if context_items else []
+        return sec_a_ctx, sec_b_ctx
+
+    def _variant_section_contexts(self, context_pool: List[Dict], variant: int,
+                                  seed: int) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Variant 0 gets the closest matches (same as a single paper); every other
+        variant draws its own reproducible sample from the whole pool.
+        """
+        if variant == 0:
+            return self._split_section_contexts(context_pool)
+        rng = random.Random(seed * 1000 + variant)
+        sample = rng.sample(context_pool, min(len(context_pool), 2 * self.context_per_section))
+        return self._split_section_contexts(sample)
+
+    async def get_section_contexts(self, subject: str) -> Tuple[List[Dict], List[Dict]]:
+        """Retrieve similar past sub-parts and split them into Section A / Section B context."""
+        return self._split_section_contexts(await self.get_context_pool(subject))
+
+    def _assemble_exam_paper(self, section_a: Dict, section_b: Dict, subject: str, board: str,
+                             paper: str, code: str, year: int) -> ExamPaperCreate:
         # Ensure we have valid dictionaries
         if not isinstance(section_a, dict) or "questions" not in section_a:
             section_a = self._enforce_perfect_schema(PERFECT_SECTION_A, True)
@@ -387,8 +854,226 @@ class SQLLMRepo:
             fallback_b = self._enforce_perfect_schema(PERFECT_SECTION_B, False)
             validated_section_b = Section.model_validate(fallback_b)
 
-        exam_paper = ExamPaperCreate(
+        return ExamPaperCreate(
             exam=self._create_exam_info(subject, board, paper, code, year),
             sections=[validated_section_a, validated_section_b]
         )
-        return exam_paper
\ No newline at end of file
+
+    async def gen_new_exam_paper(self, subject: str, board: str, paper: str, code: str, year: int,
+                                 deadline: Optional[Deadline] = None) -> ExamPaperCreate:
+        sec_a_ctx, sec_b_ctx = await self.get_section_contexts(subject)
+        
+        section_a_task = self._generate_section(
+            sec_a_ctx, subject, board, paper, code, year, True, deadline=deadline
+        )
+        
+        section_b_task = self._generate_section(
+            sec_b_ctx, subject, board, paper, code, year, False, deadline=deadline
+        )
+        
+        section_a, section_b = await asyncio.gather(section_a_task, section_b_task)
+        
+        with timed_stage("assemble"):
+            return self._assemble_exam_paper(section_a, section_b, subject, board, paper, code, year)
+
+    # ---------------- Streaming ---------------- #
+    async def _stream_section(self, context_items: List[Dict], subject: str, board: str, paper: str,
+                              code: str, year: int, is_section_a: bool, events: asyncio.Queue,
+                              deadline: Optional[Deadline] = None) -> Dict:
+        """
+        Stream one section, pushing a "question" event for every question as soon
+        as it is complete and schema-valid. The full section still goes through
+        the usual placeholder check; if it fails, the regular retry loop produces
+        a replacement and a "section" event carries the final questions.
+        In per-question mode every question is its own call, and its event goes
+        out as soon as that call is done.
+        """
+        section_name = "Section A" if is_section_a else "Section B"
+        number_offset = 0 if is_section_a else len(PERFECT_SECTION_A["questions"])
+        
+        if self.section_mode == "question":
+            async def on_question(index: int, question: Dict) -> None:
+                try:
+                    validated = Question.model_validate({**question, "number": number_offset + index + 1})
+                except Exception:
+                    return
+                await events.put({
+                    "event": "question",
+                    "section": section_name,
+                    "index": index,
+                    "question": validated.model_dump()
+                })
+            
+            section = await self._generate_section_by_question(
+                context_items, subject, board, year, is_section_a, deadline=deadline, on_question=on_question
+            )
+            for idx, question in enumerate(section["questions"]):
+                question["number"] = number_offset + idx + 1
+            await events.put({"event": "section", "section": section_name, "retried": False})
+            return section
+        
+        prompt = self._build_section_prompt(context_items, subject, board, paper, code, year, is_section_a)
+        extractor = StreamingArrayExtractor("questions")
+        index = 0
+        
+        try:
+            with usage_tags(section=section_name, attempt=1):
+                async for chunk in self.llm_manager.safe_stream(
+                    prompt, deadline=deadline, response_schema=SECTION_RESPONSE_SCHEMA
+                ):
+                    for raw_question in extractor.feed(chunk):
+                        try:
+                            question = self._enforce_question_schema(
+                                self.llm_manager.safe_json_parse(raw_question), index
+                            )
+                            question["number"] = number_offset + index + 1
+                            validated = Question.model_validate(question)
+                        except Exception:
+                            index += 1
+                            continue
+                    
+                        await events.put({
+                            "event": "question",
+                            "section": section_name,
+                            "index": index,
+                            "question": validated.model_dump()
+                        })
+                        index += 1
+            
+            section_json = self.llm_manager.safe_json_parse(extractor.text)
+            has_placeholders, _ = self._has_placeholder_content(section_json)
+            if isinstance(section_json, dict) and "questions" in section_json:
+                section = self._enforce_perfect_schema(section_json, is_section_a)
+                if not has_placeholders:
+                    await events.put({"event": "section", "section": section_name, "retried": False})
+                    return section
+                
+                with usage_tags(section=section_name, attempt=1):
+                    section = await self._repair_section(
+                        section, context_items, subject, board, year, is_section_a, deadline=deadline
+                    )
+                if not self._has_placeholder_content(section)[0]:
+                    for idx, question in enumerate(section["questions"]):
+                        question["number"] = number_offset + idx + 1
+                    await events.put({
+                        "event": "section",
+                        "section": section_name,
+                        "retried": True,
+                        "questions": section["questions"]
+                    })
+                    return section
+        except HTTPException:
+            # Out of time (504) or every provider failed (503): a non-streamed
+            # retry on the same spent budget would only make the client wait twice
+            raise
+        except Exception:
+            # Broken stream or unparseable answer
+            pass
+
+        # Streamed answer unusable: fall back to the regular (non-streamed) retry loop
+        section = await self._generate_perfect_section(
+            context_items, subject, board, paper, code, year, is_section_a, deadline=deadline
+        )
+        for idx, question in enumerate(section["questions"]):
+            question["number"] = number_offset + idx + 1
+        await events.put({
+            "event": "section",
+            "section": section_name,
+            "retried": True,
+            "questions": section["questions"]
+        })
+        return section
+
+    async def stream_new_exam_paper(self, subject: str, board: str, paper: str, code: str, year: int,
+                                    section_contexts: Tuple[List[Dict], List[Dict]] = None,
+                                    deadline: Optional[Deadline] = None) -> AsyncIterator[Dict]:
+        """
+        Generate both sections concurrently and yield events as they happen:
+        "question" (one validated question), "section" (a section is final) and
+        finally "complete" with the assembled ExamPaperCreate.
+        """
+        if section_contexts is None:
+            section_contexts = await self.get_section_contexts(subject)
+        sec_a_ctx, sec_b_ctx = section_contexts
+        
+        events: asyncio.Queue = asyncio.Queue()
+        section_tasks = [
+            asyncio.create_task(self._stream_section(
+                sec_a_ctx, subject, board, paper, code, year, True, events, deadline
+            )),
+            asyncio.create_task(self._stream_section(
+                sec_b_ctx, subject, board, paper, code, year, False, events, deadline
+            )),
+        ]
+        
+        try:
+            async for event in _drain_events(events, section_tasks):
+                yield event
+            
+            section_a, section_b = [task.result() for task in section_tasks]
+        finally:
+            for task in section_tasks:
+                task.cancel()
+        
+        exam_paper = self._assemble_exam_paper(section_a, section_b, subject, board, paper, code, year)
+        yield {"event": "complete", "exam_paper": exam_paper.model_dump()}
+
+    # ---------------- Batch generation ---------------- #
+    async def stream_batch_exam_papers(self, subject: str, board: str, paper: str, code: str, year: int,
+                                       variants: int, context_pool: Optional[List[Dict]] = None,
+                                       seed: Optional[int] = None, concurrency: int = 3,
+                                       variant_budget: Optional[float] = None) -> AsyncIterator[Dict]:
+        """
+        Generate `variants` papers from a single retrieval, yielding progress events:
+        "variant_started", "variant_complete" (with the exam paper) or "variant_failed",
+        then "complete". At most `concurrency` variants generate at once, and each
+        gets its own `variant_budget` deadline from the moment it starts.
+        """
+        if context_pool is None:
+            context_pool = await self.get_context_pool(subject)
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        events: asyncio.Queue = asyncio.Queue()
+        
+        async def run_variant(variant: int) -> bool:
+            sec_a_ctx, sec_b_ctx = self._variant_section_contexts(context_pool, variant, seed)
+            async with semaphore:
+                await events.put({"event": "variant_started", "variant": variant})
+                started = time.perf_counter()
+                deadline = Deadline(variant_budget) if variant_budget else None
+                try:
+                    section_a, section_b = await asyncio.gather(
+                        self._generate_section(
+                            sec_a_ctx, subject, board, paper, code, year, True, deadline=deadline
+                        ),
+                        self._generate_section(
+                            sec_b_ctx, subject, board, paper, code, year, False, deadline=deadline
+                        ),
+                    )
+                    exam_paper = self._assemble_exam_paper(section_a, section_b, subject, board, paper, code, year)
+                except Exception as e:
+                    detail = e.detail if isinstance(e, HTTPException) else str(e)
+                    await events.put({"event": "variant_failed", "variant": variant, "detail": detail})
+                    return False
+                
+                await events.put({
+                    "event": "variant_complete",
+                    "variant": variant,
+                    "seconds": round(time.perf_counter() - started, 2),
+                    "exam_paper": exam_paper.model_dump()
+                })
+                return True
+        
+        yield {"event": "batch_started", "variants": variants, "context_items": len(context_pool), "seed": seed}
+        variant_tasks = [asyncio.create_task(run_variant(variant)) for variant in range(variants)]
+        try:
+            async for event in _drain_events(events, variant_tasks):
+                yield event
+            completed = sum(task.result() for task in variant_tasks)
+        finally:
+            for task in variant_tasks:
+                task.cancel()
+        
+        yield {"event": "complete", "variants": variants, "completed": completed, "failed": variants - completed}
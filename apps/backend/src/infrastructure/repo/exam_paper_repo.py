@@ -1,10 +1,39 @@
-from typing import List
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 import numpy as np
+from pydantic_core import to_jsonable_python
 
-from ..models.exam_paper_models import ExamPaperModel, QuestionPartModel, SubPartModel, QuestionModel, SectionModel
-from ...core.entities.exam_paper_entities import ExamPaperCreate, ExamPaper
+from ..models.exam_paper_models import (
+    ExamPaperModel, QuestionPartModel, SubPartModel, QuestionModel, SectionModel,
+    GeneratedPaperModel, UserGeneratedPaperModel, RetrievalSubPartModel
+)
+from ...core.entities.exam_paper_entities import (
+    ExamPaperCreate, ExamPaper, GeneratedPaperSummary, Subject, normalize_subject
+)
 from ...config.cohere_api_client import CohereEmbeddingClient
+from ...utils.metrics import observe_embedding
+
+
+def paper_content_hash(paper: Dict[str, Any]) -> str:
+    """
+    SHA-256 of the paper's canonical JSON. Values go through pydantic's JSON
+    conversion first, so model_dump() and model_dump(mode="json") of the same
+    ExamPaperCreate hash alike (enums, dates, UUIDs).
+    """
+    canonical = json.dumps(
+        to_jsonable_python(paper), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
 
 
 class SQLExamPaperRepo:
@@ -24,16 +53,19 @@ class SQLExamPaperRepo:
 
         # ① Local model 🐺
         if self.model is not None:
-            embeddings = self.model.encode(texts)
+            backend = "cohere" if isinstance(self.model, CohereEmbeddingClient) else "local"
+            with observe_embedding(backend, "document", len(texts)):
+                embeddings = self.model.encode(texts)
             embeddings = [(e / np.linalg.norm(e)).tolist() for e in embeddings]
 
         # ② Cohere fallback 👍
         elif self.cohere_client is not None:
-            embeddings = self.cohere_client.encode(
-                texts,
-                input_type="search_document",
-                normalize=True
-            )
+            with observe_embedding("cohere", "document", len(texts)):
+                embeddings = self.cohere_client.encode(
+                    texts,
+                    input_type="search_document",
+                    normalize=True
+                )
             if isinstance(embeddings, np.ndarray):
                 embeddings = [row.tolist() for row in embeddings]
 
@@ -44,6 +76,7 @@ class SQLExamPaperRepo:
     async def create_exam_paper(self, exam_paper_data: ExamPaperCreate) -> bool:
         try:
             exam = ExamPaperModel(
+                id=uuid4(),
                 board=exam_paper_data.exam.board,
                 subject=exam_paper_data.exam.subject,
                 paper_name=exam_paper_data.exam.paper_name,
@@ -58,6 +91,7 @@ class SQLExamPaperRepo:
 
             subpart_texts = []
             subpart_refs = []
+            retrieval_rows = []
 
             for sec_data in exam_paper_data.sections:
                 section = SectionModel(
@@ -106,7 +140,7 @@ class SQLExamPaperRepo:
                             if sp_data.choices_given:
                                 text_to_embed += " " + " ".join(sp_data.choices_given)
 
-                            subpart_refs.append((part, sp_data))
+                            subpart_refs.append((q_data, part, sp_data))
                             subpart_texts.append(text_to_embed)
 
                         question.parts.append(part)
@@ -126,8 +160,9 @@ class SQLExamPaperRepo:
                         f"for {len(subpart_refs)} subparts"
                     )
                 
-                for (part, sp_data), emb in zip(subpart_refs, embeddings):
+                for (q_data, part, sp_data), emb in zip(subpart_refs, embeddings):
                     subpart = SubPartModel(
+                        id=uuid4(),
                         letter=sp_data.letter,
                         question_text=sp_data.question,
                         marks=sp_data.marks,
@@ -139,8 +174,31 @@ class SQLExamPaperRepo:
                         embedding=emb,  # This should be a list of floats
                     )
                     part.sub_parts.append(subpart)
+                    if sp_data.question and sp_data.question.strip():
+                        retrieval_rows.append(RetrievalSubPartModel(
+                            sub_part_id=subpart.id,
+                            exam_id=exam.id,
+                            subject=normalize_subject(_enum_value(exam_paper_data.exam.subject)),
+                            board=exam_paper_data.exam.board,
+                            year=exam_paper_data.exam.year,
+                            question_type=q_data.type,
+                            question_title=q_data.title,
+                            part_type=part.type,
+                            part_marks=part.marks,
+                            question_text=sp_data.question,
+                            marks=sp_data.marks,
+                            choices_given=sp_data.choices_given,
+                            formula_given=sp_data.formula_given,
+                            constants_given=sp_data.constants_given,
+                            embedding=emb,
+                        ))
 
             self.db.add(exam)
+            if retrieval_rows:
+                # Sub-parts first (the rows reference them); same transaction, so
+                # retrieval never sees half a paper
+                self.db.flush()
+                self.db.add_all(retrieval_rows)
             self.db.commit()
             print(f"✓ Successfully created exam paper with {len(subpart_texts)} embedded subparts")
             return True
@@ -161,7 +219,8 @@ class SQLExamPaperRepo:
             )
             .filter(
                 ExamPaperModel.subject == subject,
-                ExamPaperModel.year == year
+                ExamPaperModel.year == year,
+                ExamPaperModel.ai_generated.is_(False)
             )
             .first()
         )
@@ -208,3 +267,247 @@ class SQLExamPaperRepo:
             return None
 
         return ExamPaper.model_validate(exam)
+
+    # ---------------- Retrieval table ---------------- #
+    def backfill_retrieval_subparts(self) -> int:
+        """
+        Copy embedded sub-parts saved before retrieval_subparts existed into it,
+        in one INSERT ... SELECT; returns the number of rows added. The
+        anti-join reads every sub-part, so this is a one-off admin step
+        (python -m src.database.vector_index backfill), not part of startup.
+        Running it again only adds what is still missing.
+        """
+        columns = [
+            "sub_part_id", "exam_id", "subject", "board", "year", "question_type", "question_title",
+            "part_type", "part_marks", "question_text", "marks", "choices_given", "formula_given",
+            "constants_given", "embedding",
+        ]
+        # normalize_subject() in SQL
+        lowered = func.lower(func.trim(ExamPaperModel.subject))
+        subject = case(
+            *[(lowered.contains(value.value, autoescape=True), value.value) for value in Subject],
+            else_=lowered
+        )
+        missing = (
+            select(
+                SubPartModel.id, ExamPaperModel.id, subject, ExamPaperModel.board,
+                ExamPaperModel.year, QuestionModel.type, QuestionModel.title, QuestionPartModel.type,
+                QuestionPartModel.marks, SubPartModel.question_text, SubPartModel.marks,
+                SubPartModel.choices_given, SubPartModel.formula_given, SubPartModel.constants_given,
+                SubPartModel.embedding,
+            )
+            .select_from(SubPartModel)
+            .join(QuestionPartModel, SubPartModel.part_id == QuestionPartModel.id)
+            .join(QuestionModel, QuestionPartModel.question_id == QuestionModel.id)
+            .join(SectionModel, QuestionModel.section_id == SectionModel.id)
+            .join(ExamPaperModel, SectionModel.exam_id == ExamPaperModel.id)
+            .outerjoin(RetrievalSubPartModel, RetrievalSubPartModel.sub_part_id == SubPartModel.id)
+            .where(
+                RetrievalSubPartModel.sub_part_id.is_(None),
+                SubPartModel.embedding.isnot(None),
+                func.trim(SubPartModel.question_text) != "",
+            )
+        )
+        stmt = (
+            pg_insert(RetrievalSubPartModel)
+            .from_select(columns, missing)
+            .on_conflict_do_nothing(index_elements=["sub_part_id"])
+        )
+        try:
+            added = self.db.execute(stmt).rowcount
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return added
+
+    # ---------------- Generated paper history ---------------- #
+    def _generated_paper_rows(self, paper: Dict[str, Any]) -> Dict[Any, List[Dict[str, Any]]]:
+        """Insert mappings for one paper, per table, with the ids set up front"""
+        exam_data = paper["exam"]
+        exam_id = uuid4()
+        rows = {model: [] for model in (ExamPaperModel, SectionModel, QuestionModel, QuestionPartModel, SubPartModel)}
+        rows[ExamPaperModel].append({
+            "id": exam_id,
+            "board": exam_data.get("board", "ICSE"),
+            "subject": _enum_value(exam_data["subject"]),
+            "paper_name": exam_data["paper_name"],
+            "paper_code": exam_data["paper_code"],
+            "year": exam_data["year"],
+            "maximum_marks": exam_data["maximum_marks"],
+            "time_allowed": exam_data["time_allowed"],
+            "reading_time": exam_data.get("reading_time", "15 minutes"),
+            "additional_instructions": exam_data.get("additional_instructions", []),
+            "ai_generated": True,
+        })
+
+        for sec_data in paper["sections"]:
+            section_id = uuid4()
+            rows[SectionModel].append({
+                "id": section_id,
+                "exam_id": exam_id,
+                "name": sec_data["name"],
+                "marks": sec_data["marks"],
+                "instruction": sec_data["instruction"],
+                "is_compulsory": sec_data["is_compulsory"],
+            })
+            for q_data in sec_data["questions"]:
+                question_id = uuid4()
+                rows[QuestionModel].append({
+                    "id": question_id,
+                    "section_id": section_id,
+                    "number": q_data["number"],
+                    "title": q_data.get("title"),
+                    "type": q_data["type"],
+                    "total_marks": q_data["total_marks"],
+                    "instruction": q_data.get("instruction"),
+                    "question_text": q_data.get("question_text"),
+                    "options": q_data.get("options") or [],
+                    "diagram": q_data.get("diagram"),
+                })
+                for part_data in q_data.get("parts", []):
+                    part_id = uuid4()
+                    rows[QuestionPartModel].append({
+                        "id": part_id,
+                        "question_id": question_id,
+                        "number": part_data["number"],
+                        "type": part_data["type"],
+                        "marks": part_data["marks"],
+                        "question_text": part_data.get("question"),
+                        "description": part_data.get("description"),
+                        "options": part_data.get("options") or [],
+                        "diagram": part_data.get("diagram"),
+                        "formula_given": part_data.get("formula_given"),
+                        "constants_given": part_data.get("constants_given"),
+                        "column_a": part_data.get("column_a"),
+                        "column_b": part_data.get("column_b"),
+                        "items_to_arrange": part_data.get("items_to_arrange"),
+                        "sequence_type": part_data.get("sequence_type"),
+                        "statement_with_blanks": part_data.get("statement_with_blanks"),
+                        "choices_for_blanks": part_data.get("choices_for_blanks"),
+                        "equation_template": part_data.get("equation_template"),
+                        "missing_parts": part_data.get("missing_parts"),
+                    })
+                    # No embedding: generated sub-parts stay out of retrieval
+                    for sp_data in part_data.get("sub_parts", []):
+                        rows[SubPartModel].append({
+                            "id": uuid4(),
+                            "part_id": part_id,
+                            "letter": sp_data["letter"],
+                            "question_text": sp_data.get("question") or "",
+                            "marks": sp_data.get("marks"),
+                            "diagram": sp_data.get("diagram"),
+                            "formula_given": sp_data.get("formula_given"),
+                            "constants_given": sp_data.get("constants_given"),
+                            "equation_template": sp_data.get("equation_template"),
+                            "choices_given": sp_data.get("choices_given"),
+                        })
+        return rows
+
+    def _store_generated_papers(self, user_id: UUID, papers: List[Dict[str, Any]], hashes: List[str]) -> Dict[str, UUID]:
+        known = dict(
+            self.db.query(GeneratedPaperModel.content_hash, GeneratedPaperModel.id)
+            .filter(GeneratedPaperModel.content_hash.in_(set(hashes)))
+            .all()
+        )
+
+        rows = {model: [] for model in (ExamPaperModel, SectionModel, QuestionModel, QuestionPartModel, SubPartModel)}
+        generated_rows = []
+        for paper, content_hash in zip(papers, hashes):
+            if content_hash in known:
+                continue
+            paper_rows = self._generated_paper_rows(paper)
+            for model, model_rows in paper_rows.items():
+                rows[model].extend(model_rows)
+            known[content_hash] = uuid4()
+            generated_rows.append({
+                "id": known[content_hash],
+                "exam_id": paper_rows[ExamPaperModel][0]["id"],
+                "content_hash": content_hash,
+            })
+
+        # One multi-row INSERT per table, parents first
+        for model, model_rows in rows.items():
+            if model_rows:
+                self.db.bulk_insert_mappings(model, model_rows)
+        if generated_rows:
+            self.db.bulk_insert_mappings(GeneratedPaperModel, generated_rows)
+
+        self.db.execute(
+            pg_insert(UserGeneratedPaperModel)
+            .values([
+                {"id": uuid4(), "user_id": user_id, "generated_paper_id": generated_paper_id}
+                for generated_paper_id in {known[content_hash] for content_hash in hashes}
+            ])
+            .on_conflict_do_nothing(index_elements=["user_id", "generated_paper_id"])
+        )
+        return known
+
+    def save_generated_papers(self, user_id: UUID, papers: List[Dict[str, Any]]) -> List[UUID]:
+        """
+        Store AI-generated papers (ExamPaperCreate dumps, python or JSON mode) and add
+        them to the user's history. Papers already stored under the same content
+        hash are only linked. Returns the generated paper ids in input order.
+        """
+        if not papers:
+            return []
+        hashes = [paper_content_hash(paper) for paper in papers]
+        for attempt in range(2):
+            try:
+                known = self._store_generated_papers(user_id, papers, hashes)
+                self.db.commit()
+                return [known[content_hash] for content_hash in hashes]
+            except IntegrityError:
+                # Someone stored the same paper in the meantime; the retry links to it
+                self.db.rollback()
+                if attempt:
+                    raise
+        return []
+
+    async def get_generated_papers(self, user_id: UUID, skip: int, limit: int) -> Tuple[int, List[GeneratedPaperSummary]]:
+        base = self.db.query(UserGeneratedPaperModel).filter(UserGeneratedPaperModel.user_id == user_id)
+        total = base.count()
+        rows = (
+            self.db.query(
+                GeneratedPaperModel.id,
+                GeneratedPaperModel.exam_id,
+                ExamPaperModel.subject,
+                ExamPaperModel.board,
+                ExamPaperModel.paper_name,
+                ExamPaperModel.paper_code,
+                ExamPaperModel.year,
+                ExamPaperModel.maximum_marks,
+                UserGeneratedPaperModel.created_at,
+            )
+            .join(GeneratedPaperModel, UserGeneratedPaperModel.generated_paper_id == GeneratedPaperModel.id)
+            .join(ExamPaperModel, GeneratedPaperModel.exam_id == ExamPaperModel.id)
+            .filter(UserGeneratedPaperModel.user_id == user_id)
+            .order_by(UserGeneratedPaperModel.created_at.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return total, [GeneratedPaperSummary.model_validate(dict(row._mapping)) for row in rows]
+
+    async def get_generated_paper(self, user_id: UUID, generated_paper_id: UUID) -> Optional[ExamPaper]:
+        exam = (
+            self.db.query(ExamPaperModel)
+            .options(
+                joinedload(ExamPaperModel.sections)
+                .joinedload(SectionModel.questions)
+                .joinedload(QuestionModel.parts)
+                .joinedload(QuestionPartModel.sub_parts)
+            )
+            .join(GeneratedPaperModel, GeneratedPaperModel.exam_id == ExamPaperModel.id)
+            .join(UserGeneratedPaperModel, UserGeneratedPaperModel.generated_paper_id == GeneratedPaperModel.id)
+            .filter(
+                GeneratedPaperModel.id == generated_paper_id,
+                UserGeneratedPaperModel.user_id == user_id
+            )
+            .first()
+        )
+
+        if not exam:
+            return None
+
+        return ExamPaper.model_validate(exam)
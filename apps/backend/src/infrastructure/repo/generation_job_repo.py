@@ -0,0 +1,244 @@
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional
+from uuid import UUID, uuid4
+from sqlalchemy.orm import Session
+from ...core.repo.generation_job_repo import GenerationJobRepo
+from ...core.entities.generation_job_entities import GenerationJob, GenerationJobCreate, GenerationJobResult
+from ...infrastructure.models.generation_job_models import GenerationJobModel
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SQLGenerationJobRepo(GenerationJobRepo):
+    """
+    Jobs in the generation_jobs table, shared by every worker process.
+
+    Used from routes and from the background workers alike, so each call opens
+    its own short session from `session_factory` instead of holding a request's.
+    Claiming uses SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers
+    never pick the same job.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    async def enqueue(self, job: GenerationJobCreate) -> GenerationJob:
+        with self.session_factory() as db:
+            db_job = GenerationJobModel(**job.model_dump(), status="queued")
+            db.add(db_job)
+            db.commit()
+            db.refresh(db_job)
+            return GenerationJob.model_validate(db_job)
+
+    async def get_job(self, job_id: UUID) -> Optional[GenerationJob]:
+        with self.session_factory() as db:
+            db_job = db.get(GenerationJobModel, job_id)
+            return GenerationJob.model_validate(db_job) if db_job else None
+
+    async def get_result(self, job_id: UUID) -> Optional[GenerationJobResult]:
+        with self.session_factory() as db:
+            db_job = db.get(GenerationJobModel, job_id)
+            return GenerationJobResult.model_validate(db_job) if db_job else None
+
+    async def claim_next(self, worker_id: str, lease_seconds: float) -> Optional[GenerationJob]:
+        with self.session_factory() as db:
+            db_job = (
+                db.query(GenerationJobModel)
+                .filter(GenerationJobModel.status == "queued")
+                .order_by(GenerationJobModel.created_at)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if db_job is None:
+                db.rollback()
+                return None
+            now = _utcnow()
+            db_job.status = "running"
+            db_job.worker_id = worker_id
+            db_job.attempts = (db_job.attempts or 0) + 1
+            db_job.started_at = now
+            db_job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+            db.commit()
+            db.refresh(db_job)
+            return GenerationJob.model_validate(db_job)
+
+    async def extend_leases(self, job_ids: List[UUID], worker_id: str, lease_seconds: float) -> None:
+        if not job_ids:
+            return
+        with self.session_factory() as db:
+            db.query(GenerationJobModel).filter(
+                GenerationJobModel.id.in_(job_ids),
+                GenerationJobModel.worker_id == worker_id,
+                GenerationJobModel.status == "running"
+            ).update(
+                {GenerationJobModel.lease_expires_at: _utcnow() + timedelta(seconds=lease_seconds)},
+                synchronize_session=False
+            )
+            db.commit()
+
+    def _finish(self, job_id: UUID, worker_id: str, values: Dict[str, Any]) -> None:
+        # Only the worker still holding the job may finish it; a job requeued
+        # after a lost lease belongs to whoever claimed it next
+        with self.session_factory() as db:
+            db.query(GenerationJobModel).filter(
+                GenerationJobModel.id == job_id,
+                GenerationJobModel.worker_id == worker_id,
+                GenerationJobModel.status == "running"
+            ).update(values, synchronize_session=False)
+            db.commit()
+
+    async def complete(self, job_id: UUID, worker_id: str, result: Dict[str, Any]) -> None:
+        self._finish(job_id, worker_id, {
+            GenerationJobModel.status: "succeeded",
+            GenerationJobModel.result: result,
+            GenerationJobModel.error: None,
+            GenerationJobModel.finished_at: _utcnow(),
+            GenerationJobModel.lease_expires_at: None,
+        })
+
+    async def fail(self, job_id: UUID, worker_id: str, error: str) -> None:
+        self._finish(job_id, worker_id, {
+            GenerationJobModel.status: "failed",
+            GenerationJobModel.error: error,
+            GenerationJobModel.finished_at: _utcnow(),
+            GenerationJobModel.lease_expires_at: None,
+        })
+
+    async def release(self, job_id: UUID, worker_id: str) -> None:
+        self._finish(job_id, worker_id, {
+            GenerationJobModel.status: "queued",
+            GenerationJobModel.worker_id: None,
+            GenerationJobModel.lease_expires_at: None,
+        })
+
+    async def requeue_expired(self, max_attempts: int) -> int:
+        with self.session_factory() as db:
+            expired = (
+                db.query(GenerationJobModel)
+                .filter(
+                    GenerationJobModel.status == "running",
+                    GenerationJobModel.lease_expires_at < _utcnow()
+                )
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for db_job in expired:
+                db_job.worker_id = None
+                db_job.lease_expires_at = None
+                if db_job.attempts >= max_attempts:
+                    db_job.status = "failed"
+                    db_job.error = "Worker stopped responding"
+                    db_job.finished_at = _utcnow()
+                else:
+                    db_job.status = "queued"
+            db.commit()
+            return sum(1 for db_job in expired if db_job.status == "queued")
+
+
+class InMemoryGenerationJobRepo(GenerationJobRepo):
+    """
+    Per-process job queue for single-worker deployments and development.
+    Jobs are lost on restart and invisible to other worker processes; use the
+    SQL backend (LLM_JOB_BACKEND=db) when that matters.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[UUID, Dict[str, Any]] = {}
+        self._queue: Deque[UUID] = deque()
+        self._lock = threading.Lock()
+
+    async def enqueue(self, job: GenerationJobCreate) -> GenerationJob:
+        record = {
+            **job.model_dump(),
+            "id": uuid4(),
+            "status": "queued",
+            "attempts": 0,
+            "error": None,
+            "result": None,
+            "worker_id": None,
+            "lease_expires_at": None,
+            "created_at": _utcnow(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[record["id"]] = record
+            self._queue.append(record["id"])
+        return GenerationJob.model_validate(record)
+
+    async def get_job(self, job_id: UUID) -> Optional[GenerationJob]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return GenerationJob.model_validate(record) if record else None
+
+    async def get_result(self, job_id: UUID) -> Optional[GenerationJobResult]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return GenerationJobResult.model_validate(record) if record else None
+
+    async def claim_next(self, worker_id: str, lease_seconds: float) -> Optional[GenerationJob]:
+        with self._lock:
+            while self._queue:
+                record = self._jobs.get(self._queue.popleft())
+                if record is None or record["status"] != "queued":
+                    continue
+                now = _utcnow()
+                record.update(
+                    status="running",
+                    worker_id=worker_id,
+                    attempts=record["attempts"] + 1,
+                    started_at=now,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds)
+                )
+                return GenerationJob.model_validate(record)
+        return None
+
+    async def extend_leases(self, job_ids: List[UUID], worker_id: str, lease_seconds: float) -> None:
+        with self._lock:
+            for job_id in job_ids:
+                record = self._jobs.get(job_id)
+                if record and record["worker_id"] == worker_id and record["status"] == "running":
+                    record["lease_expires_at"] = _utcnow() + timedelta(seconds=lease_seconds)
+
+    def _finish(self, job_id: UUID, owner: str, **values) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record and record["worker_id"] == owner and record["status"] == "running":
+                record.update(values)
+                return record
+        return None
+
+    async def complete(self, job_id: UUID, worker_id: str, result: Dict[str, Any]) -> None:
+        self._finish(job_id, worker_id, status="succeeded", result=result, error=None,
+                     finished_at=_utcnow(), lease_expires_at=None)
+
+    async def fail(self, job_id: UUID, worker_id: str, error: str) -> None:
+        self._finish(job_id, worker_id, status="failed", error=error,
+                     finished_at=_utcnow(), lease_expires_at=None)
+
+    async def release(self, job_id: UUID, worker_id: str) -> None:
+        if self._finish(job_id, worker_id, status="queued", worker_id=None, lease_expires_at=None):
+            with self._lock:
+                self._queue.appendleft(job_id)
+
+    async def requeue_expired(self, max_attempts: int) -> int:
+        requeued = 0
+        now = _utcnow()
+        with self._lock:
+            for job_id, record in self._jobs.items():
+                if record["status"] != "running" or record["lease_expires_at"] is None:
+                    continue
+                if record["lease_expires_at"] >= now:
+                    continue
+                record.update(worker_id=None, lease_expires_at=None)
+                if record["attempts"] >= max_attempts:
+                    record.update(status="failed", error="Worker stopped responding", finished_at=now)
+                else:
+                    record["status"] = "queued"
+                    self._queue.append(job_id)
+                    requeued += 1
+        return requeued
@@ -0,0 +1,62 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from ...core.repo.llm_usage_repo import LLMUsageRepo
+from ...core.entities.llm_usage_entities import LLMUsageCreate, LLMUsageSummary
+from ...infrastructure.models.llm_usage_models import LLMUsageModel
+
+USAGE_GROUP_COLUMNS = {
+    "user": LLMUsageModel.user_id,
+    "subject": LLMUsageModel.subject,
+    "section": LLMUsageModel.section,
+    "attempt": LLMUsageModel.attempt,
+    "provider": LLMUsageModel.provider,
+    "model": LLMUsageModel.model,
+    "day": func.date(LLMUsageModel.created_at),
+}
+
+
+class SQLLLMUsageRepo(LLMUsageRepo):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_usage_batch(self, records: List[LLMUsageCreate]) -> int:
+        # One multi-row INSERT per batch
+        self.db.bulk_insert_mappings(
+            LLMUsageModel,
+            [record.model_dump(exclude_none=True) for record in records]
+        )
+        self.db.commit()
+        return len(records)
+
+    async def get_usage_summary(self, group_by: List[str], since: Optional[datetime] = None,
+                                until: Optional[datetime] = None) -> List[LLMUsageSummary]:
+        columns = [USAGE_GROUP_COLUMNS[name].label(name) for name in group_by]
+        query = self.db.query(
+            *columns,
+            func.count(LLMUsageModel.id).label("calls"),
+            func.coalesce(func.sum(LLMUsageModel.prompt_tokens), 0).label("prompt_tokens"),
+            func.coalesce(func.sum(LLMUsageModel.completion_tokens), 0).label("completion_tokens"),
+            func.coalesce(func.sum(case((LLMUsageModel.estimated, 1), else_=0)), 0).label("estimated_calls"),
+            func.coalesce(func.sum(LLMUsageModel.cost_usd), 0.0).label("cost_usd"),
+        )
+        if since is not None:
+            query = query.filter(LLMUsageModel.created_at >= since)
+        if until is not None:
+            query = query.filter(LLMUsageModel.created_at < until)
+        if columns:
+            query = query.group_by(*columns).order_by(func.sum(LLMUsageModel.prompt_tokens).desc())
+
+        return [
+            LLMUsageSummary(
+                group={name: row._mapping[name] for name in group_by},
+                calls=row.calls,
+                prompt_tokens=row.prompt_tokens,
+                completion_tokens=row.completion_tokens,
+                total_tokens=row.prompt_tokens + row.completion_tokens,
+                estimated_calls=row.estimated_calls,
+                cost_usd=round(row.cost_usd, 6),
+            )
+            for row in query.all()
+        ]
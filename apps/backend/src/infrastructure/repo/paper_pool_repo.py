@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ...core.repo.paper_pool_repo import PaperPoolRepo
+from ...core.entities.paper_pool_entities import pool_key
+from ...infrastructure.models.paper_pool_models import PooledPaperModel
+
+
+class SQLPaperPoolRepo(PaperPoolRepo):
+    """
+    Pre-generated papers in the pooled_papers table, shared by every worker
+    process. Like SQLGenerationJobRepo each call opens its own short session;
+    claims use SELECT ... FOR UPDATE SKIP LOCKED so a paper is handed out once.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    async def stock(self) -> Dict[Tuple[str, str, str], int]:
+        with self.session_factory() as db:
+            rows = (
+                db.query(
+                    PooledPaperModel.board,
+                    PooledPaperModel.subject,
+                    PooledPaperModel.paper_code,
+                    func.count(PooledPaperModel.id)
+                )
+                .filter(PooledPaperModel.claimed_at.is_(None))
+                .group_by(PooledPaperModel.board, PooledPaperModel.subject, PooledPaperModel.paper_code)
+                .all()
+            )
+            return {(board, subject, code): count for board, subject, code, count in rows}
+
+    async def add(self, board: str, subject: str, code: str, paper: Dict[str, Any]) -> None:
+        board, subject, code = pool_key(board, subject, code)
+        with self.session_factory() as db:
+            db.add(PooledPaperModel(board=board, subject=subject, paper_code=code, paper=paper))
+            db.commit()
+
+    async def claim(self, board: str, subject: str, code: str, user_id: UUID) -> Optional[Dict[str, Any]]:
+        board, subject, code = pool_key(board, subject, code)
+        with self.session_factory() as db:
+            pooled = (
+                db.query(PooledPaperModel)
+                .filter(
+                    PooledPaperModel.board == board,
+                    PooledPaperModel.subject == subject,
+                    PooledPaperModel.paper_code == code,
+                    PooledPaperModel.claimed_at.is_(None)
+                )
+                .order_by(PooledPaperModel.created_at)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if pooled is None:
+                db.rollback()
+                return None
+            pooled.claimed_by = user_id
+            pooled.claimed_at = datetime.now(timezone.utc)
+            paper = pooled.paper
+            db.commit()
+            return paper
@@ -1,19 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 
 from ..schemas.response_schemas import APIResponseSchema
-from ..schemas.ICSE_exam_paper_llm_schemas import LLMGenICSEQuestionSchema
+from ..schemas.ICSE_exam_paper_llm_schemas import LLMGenICSEQuestionSchema, LLMGenICSEBatchSchema
 from ..dependencies.dependencies import get_current_user,admin_or_super_admin_only
 
 from ...database.database import get_DB
 from ...infrastructure.repo.user_repo import SQLUserRepo
 from ...infrastructure.repo.ICSE_exam_paper_llm_repo import SQLLMRepo
 from ...infrastructure.repo.exam_paper_repo import SQLExamPaperRepo
+from ...infrastructure.repo.llm_usage_repo import SQLLLMUsageRepo
 from ...infrastructure.providers.auth_provider import get_security_manager
+from ...infrastructure.providers.llm_provider import get_llm_manager, persist_generated_papers
+from ...infrastructure.providers.job_provider import get_job_repo, get_job_worker_pool
+from ...infrastructure.providers.paper_pool_provider import get_paper_pool_repo
+from ...LLMs.LLMs import LLMProviderManager
+from ...LLMs.usage import usage_tags
 from ...utils.security import SecurityManager
+from ...utils.deadline import Deadline
+from ...utils.stage_timer import start_stage_timer, timed_stage
+from ...utils.metrics import USAGE_LIMIT_REJECTIONS
 from ...core.services.ICSE_exam_paper_llm_service import LLMService
 from ...core.entities.user_entities import User, UserUpdate
 from ...core.services.user_service import UserService
+from ...core.services.llm_usage_service import LLMUsageService
+from ...core.services.generation_job_service import GenerationJobService, GenerationWorkerPool
+from ...core.repo.generation_job_repo import GenerationJobRepo
+from ...core.repo.paper_pool_repo import PaperPoolRepo
+from ...core.services.paper_pool_service import PaperPoolService
+from ...core.entities.generation_job_entities import GenerationJobCreate
 
 from ...config.config import settings
 from ...config.model import get_embedding_model
@@ -24,18 +46,24 @@ llm_router = APIRouter(prefix="/llm", tags=["llm"])
 @llm_router.post('/gen-question-paper',dependencies=[Depends(get_current_user)])
 async def generate_question_paper(
     llm_gen_data : LLMGenICSEQuestionSchema,
+    response: Response,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_DB),
     current_user: User = Depends(get_current_user),
-    security_manager:SecurityManager = Depends(get_security_manager)
+    security_manager:SecurityManager = Depends(get_security_manager),
+    llm_manager: LLMProviderManager = Depends(get_llm_manager),
+    pool_repo: PaperPoolRepo = Depends(get_paper_pool_repo)
 ):
+    deadline = Deadline(settings.LLM_REQUEST_BUDGET_SECONDS)
+    timer = start_stage_timer()
     try:
         local_model = get_embedding_model()
         
         if settings.VECTOR_MODEL==False:
-            llm_repo = SQLLMRepo(db=db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
+            llm_repo = SQLLMRepo(db=db, model=None, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=llm_manager)
             exam_paper_repo = SQLExamPaperRepo(db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
         else:
-            llm_repo = SQLLMRepo(db=db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY)
+            llm_repo = SQLLMRepo(db=db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=llm_manager)
             exam_paper_repo = SQLExamPaperRepo(db, model=settings.VECTOR_MODEL, cohere_api_keys=settings.COHERE_API_KEY)
         user_repo = SQLUserRepo(db=db)
         user_service = UserService(user_repo, security_manager)
@@ -48,6 +76,99 @@ async def generate_question_paper(
         max_limit_reached = current_user.model_hit_count >= limit
 
         if max_limit_reached:
+            USAGE_LIMIT_REJECTIONS.labels("gen-question-paper").inc()
+            raise HTTPException(status_code=400, detail="Maximum usage limit reached")
+
+        # A paper pre-generated off-peak, when the pool has one for this request
+        exam_paper_dict = None
+        if settings.LLM_POOL_TARGETS:
+            with timed_stage("pool"):
+                exam_paper_dict = await PaperPoolService(pool_repo).claim(
+                    board=llm_gen_data.board,
+                    subject=llm_gen_data.subject,
+                    paper=llm_gen_data.paper,
+                    code=llm_gen_data.code,
+                    year=llm_gen_data.year,
+                    user_id=current_user.id
+                )
+
+        if exam_paper_dict is None:
+            llm_service = LLMService(
+                llm_repo=llm_repo, 
+                subject=llm_gen_data.subject, 
+                exam_paper_repo=exam_paper_repo
+            )
+
+            with usage_tags(user_id=current_user.id, subject=llm_gen_data.subject):
+                exam_paper = await llm_service.gen_question_paper(
+                    subject=llm_gen_data.subject,
+                    board=llm_gen_data.board,
+                    paper=llm_gen_data.paper,
+                    code=llm_gen_data.code,
+                    year=llm_gen_data.year,
+                    deadline=deadline
+                )
+            
+            # Convert to dict explicitly to ensure proper serialization
+            exam_paper_dict = exam_paper.model_dump()
+        # Saved to the user's history after the response is sent
+        background_tasks.add_task(persist_generated_papers, current_user.id, [exam_paper_dict])
+        
+        with timed_stage("usage_update"):
+            await user_service.update_user(
+                current_user.id,
+                UserUpdate(model_hit_count=current_user.model_hit_count + 1)
+            )
+        
+        # Per-stage durations, read by benchmarks/bench_generation_load.py
+        response.headers["Server-Timing"] = timer.server_timing()
+        return APIResponseSchema(
+            success=True,
+            data={"exam_paper": exam_paper_dict},  
+            message="Exam Paper has been generated"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+    
+
+@llm_router.post('/gen-question-paper/stream',dependencies=[Depends(get_current_user)])
+async def stream_question_paper(
+    llm_gen_data : LLMGenICSEQuestionSchema,
+    db: Session = Depends(get_DB),
+    current_user: User = Depends(get_current_user),
+    security_manager:SecurityManager = Depends(get_security_manager),
+    llm_manager: LLMProviderManager = Depends(get_llm_manager)
+):
+    """
+    Same paper as /gen-question-paper, streamed as NDJSON: one "question" event per
+    validated question as soon as it is generated, "section" events when a section
+    is final, then a "complete" event with the assembled exam paper.
+    """
+    deadline = Deadline(settings.LLM_REQUEST_BUDGET_SECONDS)
+    try:
+        local_model = get_embedding_model()
+        
+        if settings.VECTOR_MODEL==False:
+            llm_repo = SQLLMRepo(db=db, model=None, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=llm_manager)
+            exam_paper_repo = SQLExamPaperRepo(db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
+        else:
+            llm_repo = SQLLMRepo(db=db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=llm_manager)
+            exam_paper_repo = SQLExamPaperRepo(db, model=settings.VECTOR_MODEL, cohere_api_keys=settings.COHERE_API_KEY)
+        user_repo = SQLUserRepo(db=db)
+        user_service = UserService(user_repo, security_manager)
+        
+        if current_user.role in ["admin", "superAdmin"]:
+            limit = settings.MAX_COUNT_FOR_PREVILEGED
+        else:
+            limit = settings.MAX_COUNT_FOR_USER
+
+        if current_user.model_hit_count >= limit:
+            USAGE_LIMIT_REJECTIONS.labels("gen-question-paper/stream").inc()
             raise HTTPException(status_code=400, detail="Maximum usage limit reached")
 
         llm_service = LLMService(
@@ -56,35 +177,261 @@ async def generate_question_paper(
             exam_paper_repo=exam_paper_repo
         )
 
-        exam_paper = await llm_service.gen_question_paper(
-            subject=llm_gen_data.subject,
-            board=llm_gen_data.board,
-            paper=llm_gen_data.paper,
-            code=llm_gen_data.code,
-            year=llm_gen_data.year
+        # The DB session is released before the body streams, so all DB work
+        # (retrieval and the usage count) happens up front.
+        section_contexts = await llm_service.get_section_contexts(llm_gen_data.subject)
+
+        await user_service.update_user(
+            current_user.id,
+            UserUpdate(model_hit_count=current_user.model_hit_count + 1)
+        )
+
+        # Filled while streaming, saved once the stream has finished
+        generated_papers = []
+
+        async def ndjson_events():
+            # Tags are set here: the body runs after this handler has returned
+            with usage_tags(user_id=current_user.id, subject=llm_gen_data.subject):
+                async for event in llm_service.stream_question_paper(
+                    subject=llm_gen_data.subject,
+                    board=llm_gen_data.board,
+                    paper=llm_gen_data.paper,
+                    code=llm_gen_data.code,
+                    year=llm_gen_data.year,
+                    section_contexts=section_contexts,
+                    deadline=deadline
+                ):
+                    if event.get("event") == "complete":
+                        generated_papers.append(event["exam_paper"])
+                    yield json.dumps(event, default=str) + "\n"
+
+        return StreamingResponse(
+            ndjson_events(),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            background=BackgroundTask(persist_generated_papers, current_user.id, generated_papers)
         )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@llm_router.post('/gen-question-paper/batch',dependencies=[Depends(get_current_user)])
+async def batch_question_papers(
+    llm_gen_data : LLMGenICSEBatchSchema,
+    db: Session = Depends(get_DB),
+    current_user: User = Depends(get_current_user),
+    security_manager:SecurityManager = Depends(get_security_manager),
+    llm_manager: LLMProviderManager = Depends(get_llm_manager)
+):
+    """
+    Several variants of one paper from a single embedding + retrieval, streamed as
+    NDJSON: "batch_started", then per variant "variant_started" and
+    "variant_complete" (with its exam paper) or "variant_failed", then "complete".
+    Each variant counts as one generation against the usage limit.
+    """
+    try:
+        if llm_gen_data.variants > settings.LLM_BATCH_MAX_VARIANTS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"At most {settings.LLM_BATCH_MAX_VARIANTS} variants per batch"
+            )
+
+        local_model = get_embedding_model()
         
+        if settings.VECTOR_MODEL==False:
+            llm_repo = SQLLMRepo(db=db, model=None, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=llm_manager)
+            exam_paper_repo = SQLExamPaperRepo(db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
+        else:
+            llm_repo = SQLLMRepo(db=db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY, llm_manager=llm_manager)
+            exam_paper_repo = SQLExamPaperRepo(db, model=settings.VECTOR_MODEL, cohere_api_keys=settings.COHERE_API_KEY)
+        user_repo = SQLUserRepo(db=db)
+        user_service = UserService(user_repo, security_manager)
         
-        # Convert to dict explicitly to ensure proper serialization
-        exam_paper_dict = exam_paper.model_dump()
+        if current_user.role in ["admin", "superAdmin"]:
+            limit = settings.MAX_COUNT_FOR_PREVILEGED
+        else:
+            limit = settings.MAX_COUNT_FOR_USER
+
+        if current_user.model_hit_count + llm_gen_data.variants > limit:
+            USAGE_LIMIT_REJECTIONS.labels("gen-question-paper/batch").inc()
+            raise HTTPException(status_code=400, detail="Maximum usage limit reached")
+
+        llm_service = LLMService(
+            llm_repo=llm_repo, 
+            subject=llm_gen_data.subject, 
+            exam_paper_repo=exam_paper_repo
+        )
+
+        # As with streaming, all DB work happens before the body starts
+        context_pool = await llm_service.get_context_pool(llm_gen_data.subject)
+
+        await user_service.update_user(
+            current_user.id,
+            UserUpdate(model_hit_count=current_user.model_hit_count + llm_gen_data.variants)
+        )
+
+        generated_papers = []
+
+        async def ndjson_events():
+            with usage_tags(user_id=current_user.id, subject=llm_gen_data.subject):
+                async for event in llm_service.stream_batch_question_papers(
+                    subject=llm_gen_data.subject,
+                    board=llm_gen_data.board,
+                    paper=llm_gen_data.paper,
+                    code=llm_gen_data.code,
+                    year=llm_gen_data.year,
+                    variants=llm_gen_data.variants,
+                    context_pool=context_pool,
+                    seed=llm_gen_data.seed,
+                    concurrency=settings.LLM_BATCH_CONCURRENCY,
+                    variant_budget=settings.LLM_REQUEST_BUDGET_SECONDS
+                ):
+                    if event.get("event") == "variant_complete":
+                        generated_papers.append(event["exam_paper"])
+                    yield json.dumps(event, default=str) + "\n"
+
+        return StreamingResponse(
+            ndjson_events(),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            # All variants in one bulk insert after the stream
+            background=BackgroundTask(persist_generated_papers, current_user.id, generated_papers)
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@llm_router.post('/jobs', dependencies=[Depends(get_current_user)], status_code=202)
+async def enqueue_generation_job(
+    llm_gen_data : LLMGenICSEQuestionSchema,
+    db: Session = Depends(get_DB),
+    current_user: User = Depends(get_current_user),
+    security_manager:SecurityManager = Depends(get_security_manager),
+    job_repo: GenerationJobRepo = Depends(get_job_repo),
+    worker_pool: GenerationWorkerPool = Depends(get_job_worker_pool)
+):
+    """
+    Queue a paper generation and return its job id right away. Poll
+    GET /llm/jobs/{job_id} for the status and fetch GET /llm/jobs/{job_id}/result
+    once it has succeeded. The job counts against the usage limit when queued.
+    """
+    try:
+        user_repo = SQLUserRepo(db=db)
+        user_service = UserService(user_repo, security_manager)
         
+        if current_user.role in ["admin", "superAdmin"]:
+            limit = settings.MAX_COUNT_FOR_PREVILEGED
+        else:
+            limit = settings.MAX_COUNT_FOR_USER
+
+        if current_user.model_hit_count >= limit:
+            USAGE_LIMIT_REJECTIONS.labels("jobs").inc()
+            raise HTTPException(status_code=400, detail="Maximum usage limit reached")
+
+        job_service = GenerationJobService(job_repo)
+        job = await job_service.enqueue(
+            GenerationJobCreate(user_id=current_user.id, **llm_gen_data.model_dump())
+        )
+        worker_pool.notify()
+
         await user_service.update_user(
             current_user.id,
             UserUpdate(model_hit_count=current_user.model_hit_count + 1)
         )
-        
+
         return APIResponseSchema(
             success=True,
-            data={"exam_paper": exam_paper_dict},  
+            data={"job": job.model_dump(mode="json")},
+            message="Generation job queued"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@llm_router.get('/jobs/{job_id}', dependencies=[Depends(get_current_user)])
+async def get_generation_job(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    job_repo: GenerationJobRepo = Depends(get_job_repo)
+):
+    try:
+        job_service = GenerationJobService(job_repo)
+        job = await job_service.get_job(
+            job_id, current_user.id, is_admin=current_user.role in ["admin", "superAdmin"]
+        )
+        return APIResponseSchema(
+            success=True,
+            data={"job": job.model_dump(mode="json")},
+            message=f"Job is {job.status}"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@llm_router.get('/jobs/{job_id}/result', dependencies=[Depends(get_current_user)])
+async def get_generation_job_result(
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    job_repo: GenerationJobRepo = Depends(get_job_repo)
+):
+    """The generated exam paper; 409 while the job is queued or running, or if it failed."""
+    try:
+        job_service = GenerationJobService(job_repo)
+        exam_paper = await job_service.get_result(
+            job_id, current_user.id, is_admin=current_user.role in ["admin", "superAdmin"]
+        )
+        return APIResponseSchema(
+            success=True,
+            data={"exam_paper": exam_paper},
             message="Exam Paper has been generated"
         )
-        
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
-    
+
 
 @llm_router.post("model-change",dependencies=[Depends(admin_or_super_admin_only)])   
 async def change_model():
     return True
+
+
+@llm_router.get('/usage', dependencies=[Depends(admin_or_super_admin_only)])
+async def get_llm_usage(
+    group_by: str = "provider,model",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_DB)
+):
+    """
+    Token and cost totals from the llm_usage table, grouped by a comma-separated
+    list of user, subject, section, attempt, provider, model, day.
+    """
+    try:
+        usage_service = LLMUsageService(SQLLLMUsageRepo(db))
+        groups = [name.strip() for name in group_by.split(",") if name.strip()]
+        summary = await usage_service.get_usage_summary(groups, since=since, until=until)
+        return APIResponseSchema(
+            success=True,
+            data={"usage": [row.model_dump(mode="json") for row in summary]},
+            message="LLM usage fetched"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
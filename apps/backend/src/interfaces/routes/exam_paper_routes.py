@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends
+from uuid import UUID
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 
 
@@ -8,6 +9,7 @@ from ..schemas.response_schemas import APIResponseSchema
 
 from ...core.services.exam_paper_service import ExamPaperService
 from ...core.entities.exam_paper_entities import ExamPaper
+from ...core.entities.user_entities import User
 from ...infrastructure.repo.exam_paper_repo import SQLExamPaperRepo
 from ...database.database import get_DB
 from ...config.model import get_embedding_model
@@ -163,3 +165,66 @@ async def get_prev_exam_paper(
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@exam_paper_router.get("/generated",dependencies=[Depends(get_current_user)])
+async def get_generated_papers(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    db : Session = Depends(get_DB),
+    current_user: User = Depends(get_current_user),
+):
+    """The current user's generated papers, newest first."""
+    try:
+        local_model = get_embedding_model()
+        if settings.VECTOR_MODEL==False:
+            exam_paper_repo = SQLExamPaperRepo(db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
+        else:
+            exam_paper_repo = SQLExamPaperRepo(db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY)
+        exam_paper_service = ExamPaperService(exam_paper_repo=exam_paper_repo)
+
+        total, papers = await exam_paper_service.get_generated_papers(user_id=current_user.id, skip=skip, limit=limit)
+
+        return APIResponseSchema(
+            success=True,
+            data={"papers": [paper.model_dump(mode="json") for paper in papers], "total": total, "skip": skip, "limit": limit},
+            message="Generated papers have been fetched"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@exam_paper_router.get("/generated/{paper_id}",dependencies=[Depends(get_current_user)])
+async def get_generated_paper(
+    paper_id: UUID,
+    db : Session = Depends(get_DB),
+    current_user: User = Depends(get_current_user),
+):
+    """One paper from the current user's history, in the same shape as a fresh generation."""
+    try:
+        local_model = get_embedding_model()
+        if settings.VECTOR_MODEL==False:
+            exam_paper_repo = SQLExamPaperRepo(db, model=None, cohere_api_keys=settings.COHERE_API_KEY)
+        else:
+            exam_paper_repo = SQLExamPaperRepo(db, model=local_model, cohere_api_keys=settings.COHERE_API_KEY)
+        exam_paper_service = ExamPaperService(exam_paper_repo=exam_paper_repo)
+
+        exam_paper = await exam_paper_service.get_generated_paper(user_id=current_user.id, generated_paper_id=paper_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not exam_paper:
+        raise HTTPException(status_code=404, detail="Generated paper not found")
+
+    exam_dict = exam_paper.model_dump()
+    # Rows come back unordered; restore the paper's section and question order
+    exam_dict["sections"].sort(key=lambda section: section["name"])
+    for section in exam_dict["sections"]:
+        section["questions"].sort(key=lambda question: question["number"])
+
+    return APIResponseSchema(
+        success=True,
+        data={"exam_paper": {
+            "exam": {k: v for k, v in exam_dict.items() if k != "sections"},
+            "sections": exam_dict["sections"]
+        }},
+        message="Exam Paper has been fetched"
+    )
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Union
+from pydantic import BaseModel, Field
+from typing import Optional, Union
 
 class FileSchema(BaseModel):
     url : str
@@ -9,4 +9,8 @@ class LLMGenICSEQuestionSchema(BaseModel):
     board: str
     paper: str
     code: str
-    year: int
\ No newline at end of file
+    year: int
+
+class LLMGenICSEBatchSchema(LLMGenICSEQuestionSchema):
+    variants: int = Field(default=5, ge=1)
+    seed: Optional[int] = None
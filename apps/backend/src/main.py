@@ -1,10 +1,13 @@
 import os
+import threading
+from contextlib import asynccontextmanager
 
 from fastapi.responses import JSONResponse
 from fastapi import FastAPI
 
 from .database.database import Base, engine
 from .utils.middleware import setup_middleware
+from .utils.metrics import instrument_engine, metrics_response
 
 from .interfaces.routes.auth_routes import auth_router
 from .interfaces.routes.ICSE_exam_paper_llm_routes import llm_router
@@ -14,13 +17,49 @@ from .interfaces.routes.user_routes import user_router
 from .interfaces.routes.feedback_routes import feedback_router
 from .interfaces.routes.issues_routes import issue_router
 from .config.config import settings
+from .infrastructure.providers.llm_provider import (
+    ensure_retrieval_index, get_llm_manager, get_usage_recorder
+)
+from .infrastructure.providers.job_provider import get_job_worker_pool
+from .infrastructure.providers.paper_pool_provider import get_paper_pool_refiller
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the per-worker LLM manager up front so the first request doesn't pay for it
+    llm_manager = get_llm_manager()
+    # Ollama model warm-up and health probes run in the background
+    llm_manager.start_background_tasks()
+    # Vector index on retrieval_subparts: the first build can take minutes, so it
+    # runs in a daemon thread (one worker builds, the others skip) and neither
+    # startup nor shutdown waits for it
+    threading.Thread(target=ensure_retrieval_index, name="retrieval-index", daemon=True).start()
+    usage_recorder = get_usage_recorder()
+    if usage_recorder:
+        usage_recorder.start()
+    # Background generation jobs; with the DB backend this also requeues
+    # jobs a previous (crashed) worker left running
+    job_pool = get_job_worker_pool()
+    await job_pool.start()
+    # Off-peak pre-generation for the paper pool (off without LLM_POOL_TARGETS)
+    pool_refiller = get_paper_pool_refiller()
+    pool_refiller.start()
+    yield
+    await pool_refiller.close()
+    # Running jobs go back to the queue
+    await job_pool.close()
+    # Write out whatever token usage is still buffered
+    if usage_recorder:
+        await usage_recorder.close()
+    await llm_manager.stop_background_tasks()
 
 
 # main APP initiation 🎌
 app = FastAPI(
     title="Doclin Note Generator",
     description="Doclin note generator is an app which will make your notes and question making easy with advanced AI.",
-    version="1.1.1"
+    version="1.1.1",
+    lifespan=lifespan
 )
 
 # Setup middleware important for CORS error
@@ -29,6 +68,9 @@ setup_middleware(app)
 # CREATE the actual table 🔢
 Base.metadata.create_all(bind=engine)
 
+# Count SQL statements per request for /metrics
+instrument_engine(engine)
+
 # Parent route for prefix added
 # all routes
 app.include_router(auth_router, prefix="/api")
@@ -44,6 +86,10 @@ app.include_router(issue_router,prefix="/api")
 async def health_check():
     return JSONResponse(content={"status": "healthy"})
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return metrics_response()
+
 @app.get("/", dependencies=[])
 async def root():
     return {"message": "Doclin Note generator Backend running 👍"}
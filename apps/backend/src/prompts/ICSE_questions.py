@@ -570,3 +570,96 @@ Return ONLY valid JSON, no markdown fences.
 
 BEGIN GENERATION NOW:
 """)
+
+# ---------------- Per-question generation ---------------- #
+# Used when LLM_SECTION_GENERATION_MODE="question": one LLM call per question,
+# indexed like PERFECT_SECTION_A/B["questions"].
+SECTION_A_QUESTION_BRIEFS = [
+    """Multiple Choice (15 marks)
+- 15 parts (i through xv), 1 mark each, type "multiple_choice"
+- Each with 4 plausible options labeled (a), (b), (c), (d)
+- Spread the parts across different topics of the syllabus""",
+    """Short Answer (15 marks)
+- 5 parts (i through v), 3 marks each
+- Can have sub-parts (a), (b), (c)
+- Examples: define terms, explain phenomena, state laws, describe processes""",
+    """Short Answer (10 marks)
+- 5 parts (i through v), 2 marks each
+- Can have sub-parts (a), (b)
+- Examples: identify components, state differences, name instruments""",
+]
+
+SECTION_B_QUESTION_BRIEF = """Long Answer (10 marks)
+- 3 parts (i), (ii), (iii) that build on one realistic scenario
+- Mark distribution: 3+3+4 or 2+3+5 or 4+3+3
+- Use one of: a diagram-based question (describe the diagram in detail),
+  a calculation problem (given values, constants and units) or a
+  theory/conceptual question"""
+
+QUESTION_PROMPT = Template("""You are writing ONE question of a REAL ${board} ${subject} exam paper for year ${year}.
+
+====== CRITICAL: GENERATE AN ACTUAL QUESTION, NOT PLACEHOLDERS ======
+
+FORBIDDEN WORDS/PHRASES (DO NOT USE):
+❌ "Sample question", "Sample MCQ question"
+❌ "Question with diagram", "Description of diagram", "Ray diagram description"
+❌ "Sub-question text"
+❌ "Option A", "Option B", "Option C", "Option D"
+❌ "element1", "element2"
+❌ Any generic placeholder text
+
+====== THIS QUESTION: ${section_name}, QUESTION ${question_number} ======
+${question_brief}
+
+The other questions of the paper are written separately from different
+reference questions, so base this one on ITS OWN reference context below.
+
+====== YOUR REFERENCE CONTEXT ======
+${retrieval_context}
+
+====== EXACT JSON SCHEMA TO FOLLOW (one question object) ======
+${perfect_schema}
+
+====== INSTRUCTIONS ======
+1. Return ONE question object exactly like the schema, not a whole section
+2. Use proper ${subject} terminology, real values and units
+3. Use "question_text" field for questions (not "question")
+4. Return ONLY valid JSON, no markdown fences
+
+BEGIN GENERATION NOW:
+""")
+
+# ---------------- Targeted repair ---------------- #
+# Rewrites one part that failed the placeholder check; the rest of the
+# question is shown for context and kept as it is.
+PART_REPAIR_PROMPT = Template("""You are fixing ONE part of a question in a REAL ${board} ${subject} exam paper for year ${year}.
+
+====== REPAIR: ${section_name}, QUESTION ${question_number}, PART ${part_number} ======
+The part below was rejected because it contains placeholder text instead of
+real content. Rewrite it as a real ${subject} exam part.
+
+FORBIDDEN WORDS/PHRASES (DO NOT USE):
+❌ "Sample question", "Sample MCQ question"
+❌ "Question with diagram", "Description of diagram", "Ray diagram description"
+❌ "Sub-question text"
+❌ "Option A", "Option B", "Option C", "Option D"
+❌ "element1", "element2"
+❌ Any generic placeholder text
+
+====== PART TO REWRITE ======
+${part_json}
+
+====== THE WHOLE QUESTION (other parts are final, do not repeat them) ======
+${question_json}
+
+====== YOUR REFERENCE CONTEXT ======
+${retrieval_context}
+
+====== INSTRUCTIONS ======
+1. Keep the same "type" and "marks", and the same structure (options, sub_parts, columns)
+2. Use proper ${subject} terminology, real values and units
+3. Use "question_text" field for questions (not "question")
+4. Return ONLY the JSON object of the rewritten part, no markdown fences
+
+BEGIN REPAIR NOW:
+""")
@@ -0,0 +1,35 @@
+import time
+from typing import Callable, Optional
+
+from .exceptions import GatewayTimeoutException
+
+
+class Deadline:
+    """
+    Time budget for one request, created at the route and passed down the
+    generation pipeline. Each layer asks how much is left instead of using its
+    own fixed timeout.
+    """
+
+    def __init__(self, budget_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.budget_seconds = budget_seconds
+        self._clock = clock
+        self._expires_at = clock() + budget_seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - self._clock())
+
+    def expired(self, margin: float = 0.0) -> bool:
+        """True when less than `margin` seconds are left"""
+        return self.remaining() <= margin
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Remaining budget, capped at `cap` seconds"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def check(self, margin: float = 0.0, what: str = "Request") -> None:
+        if self.expired(margin):
+            raise GatewayTimeoutException(
+                f"{what} exceeded its {self.budget_seconds:g}s time budget"
+            )
@@ -26,4 +26,8 @@ class InternelServerException(HTTPException):
 
 class LargePayloadException(HTTPException):
     def __init__(self, detail : str = "Payload is too large"):
-        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail = detail)
\ No newline at end of file
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail = detail)
+
+class GatewayTimeoutException(HTTPException):
+    def __init__(self, detail : str = "Request timed out"):
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail = detail)
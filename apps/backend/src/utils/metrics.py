@@ -0,0 +1,163 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from fastapi import Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Buckets sized for this app: fast API calls up to multi-minute paper generation
+HTTP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 90, 120, 180, 300)
+EMBEDDING_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response starts",
+    ["method", "route", "status"], buckets=HTTP_BUCKETS
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed while handling one request",
+    ["route"], buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250)
+)
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds", "LLM provider call latency by outcome",
+    ["provider", "model", "outcome"], buckets=LLM_BUCKETS
+)
+LLM_CALLS_SKIPPED = Counter(
+    "llm_calls_skipped_total", "Chain entries skipped without a call (open breaker, local rate limit)",
+    ["provider", "reason"]
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "llm_queue_depth", "Calls waiting for a provider concurrency slot",
+    ["provider"], multiprocess_mode="livesum"
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "llm_queue_wait_seconds", "Time spent waiting for a provider concurrency slot, by outcome",
+    ["provider", "outcome"], buckets=(0, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+)
+LLM_STRUCTURED_FALLBACKS = Counter(
+    "llm_structured_output_fallbacks_total", "Models that rejected JSON/schema output and fell back to plain text",
+    ["provider", "model"]
+)
+SECTION_ATTEMPT_OUTCOMES = Counter(
+    "section_generation_attempt_outcomes_total",
+    "Section generation attempts by output mode and result (valid, placeholder, malformed)",
+    ["mode", "outcome"]
+)
+SECTION_GENERATION_ATTEMPTS = Histogram(
+    "section_generation_attempts", "LLM attempts used per generated section (1 = no retry)",
+    ["mode"], buckets=(1, 2, 3, 4, 5)
+)
+SECTION_REPAIRS = Counter(
+    "section_repairs_total",
+    "Targeted regenerations of defective questions or parts (scope: question, part; outcome: repaired, failed)",
+    ["scope", "outcome"]
+)
+EMBEDDING_SECONDS = Histogram(
+    "embedding_duration_seconds", "Embedding call latency", ["backend", "kind"], buckets=EMBEDDING_BUCKETS
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size", "Texts per embedding call", ["backend", "kind"],
+    buckets=(1, 2, 5, 10, 25, 50, 96, 250, 500, 1000)
+)
+EMBEDDING_FALLBACKS = Counter(
+    "embedding_fallbacks_total", "Texts embedded with the hash fallback after every Cohere key failed"
+)
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "query_embedding_cache_total", "Query embedding cache lookups (outcome: hit, miss)", ["outcome"]
+)
+USAGE_LIMIT_REJECTIONS = Counter(
+    "usage_limit_rejections_total", "Generation requests refused by the per-user usage limit", ["route"]
+)
+GENERATION_JOBS = Counter(
+    "generation_jobs_total", "Background generation jobs by outcome (enqueued, succeeded, failed, requeued)",
+    ["outcome"]
+)
+GENERATION_JOB_SECONDS = Histogram(
+    "generation_job_duration_seconds", "Time from enqueue to finish of a background generation job",
+    ["outcome"], buckets=HTTP_BUCKETS
+)
+PAPER_POOL_REQUESTS = Counter(
+    "paper_pool_requests_total", "Paper requests served from the pre-generated pool (outcome: hit, miss, error)",
+    ["outcome"]
+)
+PAPER_POOL_REFILLS = Counter(
+    "paper_pool_refills_total",
+    "Pool refill attempts (outcome: stocked, rejected, failed, deferred)",
+    ["outcome"]
+)
+
+# Statement counter of the current request; a mutable holder so sync
+# endpoints running in the threadpool (a copied context) update the same one
+_db_queries: ContextVar[Optional[List[int]]] = ContextVar("db_queries", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany) -> None:
+    counter = _db_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _count_query)
+
+
+def observe_llm_call(provider: str, model: str, outcome: str, seconds: float) -> None:
+    LLM_CALL_SECONDS.labels(provider, model, outcome).observe(seconds)
+
+
+@contextmanager
+def observe_embedding(backend: str, kind: str, batch_size: int) -> Iterator[None]:
+    """Time one embedding call; kind is "query" or "document" """
+    EMBEDDING_BATCH_SIZE.labels(backend, kind).observe(batch_size)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        EMBEDDING_SECONDS.labels(backend, kind).observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    """
+    Per-route latency and DB statement count. Routes are labelled by their
+    template (/api/x/{id}), unmatched paths share one label, so label
+    cardinality stays bounded. Streaming responses are timed until headers.
+    """
+
+    def __init__(self, app, excluded_paths: list[str] = None):
+        super().__init__(app)
+        self.excluded_paths = set(excluded_paths or [])
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path in self.excluded_paths:
+            return await call_next(request)
+
+        counter = [0]
+        token = _db_queries.set(counter)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(request.method, route, str(status)).observe(time.perf_counter() - start)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(counter[0])
+            _db_queries.reset(token)
+
+
+def metrics_response() -> Response:
+    """Prometheus text exposition; aggregates workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -12,6 +12,7 @@ from datetime import datetime, timedelta, timezone
 from ..config.config import settings
 from ..utils.security import SecurityManager
 from ..infrastructure.providers.auth_provider import get_security_manager
+from .metrics import MetricsMiddleware
 
 
 class TokenRefreshMiddleware(BaseHTTPMiddleware):
@@ -124,6 +125,13 @@ def setup_middleware(app: FastAPI):
             "/api/otp/generate",
             "/api/feedback/all",
             "/api/auth/logout",
-            "/api/auth/exchange"
+            "/api/auth/exchange",
+            "/metrics"
         ]
     )
+
+    # Outermost, so rejected (401) requests are measured too
+    app.add_middleware(
+        MetricsMiddleware,
+        excluded_paths=["/metrics", "/health"]
+    )
@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+
+class StageTimer:
+    """
+    Wall-clock time per pipeline stage for one request, rendered as a
+    Server-Timing header. Stages that run more than once (retries) or
+    concurrently add up.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        metrics = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.durations.items()]
+        metrics.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+def start_stage_timer() -> StageTimer:
+    """Attach a fresh timer to the current request context (tasks it spawns inherit it)"""
+    timer = StageTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Time a block into the request's StageTimer; a no-op outside a timed request"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(stage, time.perf_counter() - start)
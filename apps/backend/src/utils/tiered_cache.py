@@ -0,0 +1,148 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional local SQLite tier.
+
+    Values must be JSON-serializable. Entries expire after ``ttl_seconds`` in
+    both tiers; each tier is also capped by entry count (LRU in memory, oldest
+    first on disk). Several caches can share one SQLite file through distinct
+    namespaces. Thread-safe; SQLite calls are short local reads/writes.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_memory_entries: int = 256,
+        sqlite_path: Optional[str] = None,
+        max_disk_entries: int = 5000,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.namespace = namespace
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if sqlite_path:
+            directory = os.path.dirname(sqlite_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._disk.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_entries_created ON cache_entries (namespace, created_at)"
+            )
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and self._clock() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, value: Any) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                created_at, value = cached
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is not None:
+                    value, created_at = json.loads(row[0]), row[1]
+                    if not self._expired(created_at):
+                        self._remember(key, created_at, value)
+                        self.disk_hits += 1
+                        return value
+                    self._disk.execute(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+                    )
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        now = self._clock()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._disk is None:
+                return
+            self._disk.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now),
+            )
+            self._disk_writes += 1
+            if self._disk_writes % 50 == 0:
+                self._evict_disk(now)
+
+    def _evict_disk(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            self._disk.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND created_at < ?",
+                (self.namespace, now - self.ttl_seconds),
+            )
+        self._disk.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+            " SELECT key FROM cache_entries WHERE namespace = ?"
+            " ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_disk_entries),
+        )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._disk is not None:
+                self._disk.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                "persistent": self._disk is not None,
+            }
@@ -2,7 +2,8 @@ CREATE EXTENSION IF NOT EXISTS vector;
 CREATE EXTENSION IF NOT EXISTS pg_cron;
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
-CREATE INDEX ON topics USING ivfflat (embedding vector_l2_ops) WITH (lists = 100);
+-- Tables are created by the backend on startup, which also builds the vector
+-- index on retrieval_subparts (see apps/backend/src/database/vector_index.py)
 SELECT cron.schedule(
   'delete_expired_otps',
   '*/15 * * * *',